@@ -0,0 +1,72 @@
+"""
+Benchmark for generate_recap_pdf: render time per row count, to confirm linear scaling.
+
+    python benchmarks/bench_recap_pdf.py [--rows 1000 5000 10000 25000 50000] [--json out.json]
+
+Per-row time should stay roughly flat as the row count grows; the script exits with
+status 1 if the largest run costs more than --max-ratio times the smallest per row.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from penomoran.exports import generate_recap_pdf  # noqa: E402
+
+
+def synthetic_letters(n, jenis="Surat Keluar", seed=0):
+    rng = np.random.default_rng(seed)
+    tanggal = [date(2024, 1, 1) + timedelta(days=int(d)) for d in rng.integers(0, 365, n)]
+    no = np.arange(1, n + 1)
+    return pd.DataFrame({
+        "No": no,
+        "Jenis": jenis,
+        "Tanggal": tanggal,
+        "Bulan": [t.month for t in tanggal],
+        "Tahun": 2024,
+        "Kode_Klasifikasi": "005",
+        "Kepada": rng.choice(["Dinas Kesehatan Kabupaten Bogor", "BPJS", "RSUD Cibinong"], n),
+        "Perihal": rng.choice(["Undangan rapat koordinasi", "Permohonan data pelayanan pasien rawat inap " * 3], n),
+        "Keterangan": "-",
+        "Nomor_Surat": [f"005/{i:03d}-KURIP" for i in no],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 5000, 10000, 25000, 50000])
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--max-ratio', type=float, default=2.0)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.rows:
+        df = synthetic_letters(n)
+        best = min(_timed(df) for _ in range(args.repeat))
+        results.append({'rows': n, 'seconds': round(best, 4), 'us_per_row': round(best / n * 1e6, 2)})
+        print(f"{n:>7} rows  {best:8.3f} s  {best / n * 1e6:8.1f} us/row")
+
+    ratio = results[-1]['us_per_row'] / results[0]['us_per_row']
+    print(f"per-row cost ratio largest/smallest: {ratio:.2f}")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'benchmark': 'recap_pdf', 'results': results, 'ratio': ratio}, fh, indent=2)
+    return 0 if ratio <= args.max_ratio else 1
+
+
+def _timed(df):
+    start = time.perf_counter()
+    generate_recap_pdf(df, date(2024, 1, 1), date(2024, 12, 31), "Surat Keluar")
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Start-up benchmark of the Streamlit app: what a fresh process pays before the first element
+reaches the browser, and what every later rerun costs. Every round runs in a new interpreter,
+so nothing is shared with earlier rounds.
+
+    python benchmarks/bench_startup.py [--letters 10000] [--engine csv] [--rounds 5] [--reruns 10]
+                                       [--repo . /tmp/sebelum] [--json results.json]
+
+Measured per checkout (seconds, median over --rounds processes):
+  import_app     import app_surat in a fresh interpreter; outside `streamlit run` the script runs
+                 once in bare mode, so this is the imports plus one render without a browser
+  first_paint    from the start of the first script run until the first element (the title) is sent
+  first_run      the whole first script run of a fresh process
+  rerun          one rerun of an already warm process (median of --reruns)
+and which heavy export modules (fpdf, xlsxwriter) were imported by the first run.
+
+Pass several --repo directories to compare versions on the same archive, e.g. a worktree of
+an older commit made with `git worktree add /tmp/sebelum HEAD~1`. Only app_surat.py is loaded
+by name, so checkouts from before the penomoran package split can be measured as well.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from penomoran.storage import BACKENDS  # noqa: E402
+from synthetic import synthetic_archive, write_archive  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('fpdf', 'xlsxwriter')
+
+# Kedua skrip dijalankan di interpreter baru dengan argv: repo, jumlah rerun
+_IMPORT_CHILD = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import app_surat
+print(json.dumps({'import_app': time.perf_counter() - start}))
+"""
+
+_APP_CHILD = """
+import json, os, statistics, sys, time
+sys.path.insert(0, sys.argv[1])
+from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+from streamlit.testing.v1 import AppTest
+
+# Elemen pertama yang dikirim ke browser menandai first paint
+first_delta = []
+enqueue = ScriptRunContext.enqueue
+
+
+def _enqueue(self, msg):
+    if not first_delta and msg.HasField('delta'):
+        first_delta.append(time.perf_counter())
+    return enqueue(self, msg)
+
+
+ScriptRunContext.enqueue = _enqueue
+at = AppTest.from_file(os.path.join(sys.argv[1], 'app_surat.py'), default_timeout=600)
+start = time.perf_counter()
+at.run()
+first_run = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(str(at.exception))
+heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+reruns = []
+for _ in range(int(sys.argv[2])):
+    t = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - t)
+print(json.dumps({'first_paint': first_delta[0] - start, 'first_run': first_run,
+                  'rerun': statistics.median(reruns), 'heavy_loaded': heavy}))
+""".replace('HEAVY_MODULES', repr(HEAVY_MODULES))
+
+METRICS = ['import_app', 'first_paint', 'first_run', 'rerun']
+
+
+def _child(code, repo, reruns, cwd):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    env.pop('PENOMORAN_METRICS_FILE', None)
+    out = subprocess.run([sys.executable, '-c', code, repo, str(reruns)], cwd=cwd, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run_startup(repos, letters, engine, rounds=5, reruns=10, seed=0, log=print):
+    """Median start-up timings per repo over rounds fresh processes; returns a list of result dicts."""
+    work_dir = tempfile.mkdtemp(prefix='bench_startup_')
+    cwd = os.getcwd()
+    try:
+        os.environ['PENOMORAN_STORAGE'] = engine
+        write_archive(engine, work_dir, *synthetic_archive(letters, seed=seed))
+        os.chdir(cwd)
+        results = []
+        for repo in repos:
+            repo = os.path.abspath(repo)
+            samples = {name: [] for name in METRICS}
+            heavy = []
+            for _ in range(rounds):
+                samples['import_app'].append(_child(_IMPORT_CHILD, repo, reruns, work_dir)['import_app'])
+                app = _child(_APP_CHILD, repo, reruns, work_dir)
+                for name in METRICS[1:]:
+                    samples[name].append(app[name])
+                heavy = app['heavy_loaded']
+            result = {'repo': repo, 'engine': engine, 'letters': letters, 'rounds': rounds, 'heavy_loaded': heavy}
+            result.update({name: statistics.median(values) for name, values in samples.items()})
+            results.append(result)
+            log(f"{repo}\n  " + "  ".join(f"{name} {result[name] * 1e3:8.1f} ms" for name in METRICS)
+                + f"  heavy: {', '.join(heavy) or '-'}")
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--letters', type=int, default=10000)
+    parser.add_argument('--engine', choices=list(BACKENDS), default='csv')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--reruns', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repo', nargs='+', default=[REPO_DIR], help="checkouts to measure")
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    results = run_startup(args.repo, args.letters, args.engine, args.rounds, args.reruns, args.seed)
+    if len(results) > 1:
+        base = results[-1]
+        for result in results[:-1]:
+            print(f"{result['repo']} vs {base['repo']}: "
+                  + "  ".join(f"{name} x{result[name] / base[name]:.2f}" for name in METRICS))
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'benchmark': 'startup', 'results': results}, fh, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Benchmark suite for the hot paths of the numbering app, run headless (no Streamlit) against
+synthetic archives (benchmarks/synthetic.py) of every requested size and storage engine.
+
+    python benchmarks/bench_suite.py [--letters 1000 10000 100000 1000000] [--engines csv sqlite]
+                                     [--ops load_data process_form ...] [--json results.json]
+                                     [--baseline previous.json --max-regression 1.5]
+
+Timed operations (seconds per call, best and median over --repeat rounds):
+  load_data                  parse the whole archive with a cold cache
+  allocator_build            first numbering lookup after start-up (builds the allocator index)
+  get_next_number_continuous / get_next_number_fill_gaps
+                             next-number preview with a warm index
+  process_form               issue one letter (allocation + write)
+  add_skipped_number         reserve one number
+  generate_excel / generate_recap_pdf
+                             exports of the largest (Jenis, Tahun) series
+  generate_single_pdf        proof PDF of one letter
+
+With --json the results are written as machine-readable JSON; with --baseline the run is
+compared against an earlier JSON file and the script exits with status 1 if any operation
+became slower than --max-regression times its baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from penomoran import core  # noqa: E402
+from penomoran.exports import generate_excel, generate_recap_pdf, generate_single_pdf  # noqa: E402
+from penomoran.storage import BACKENDS, get_storage  # noqa: E402
+from synthetic import synthetic_archive, write_archive  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _reset_process_state():
+    """Forget every per-process cache, as after a restart of the app."""
+    from penomoran import allocator, storage
+    core.flush_stats()
+    with storage._instances_lock:
+        storage._instances.clear()
+    for holder, keys in ((allocator._ALLOCATOR, ('signature', 'index')), (core._SEARCH, ('signature', 'indexes')),
+                         (core._STATS, ('key', 'stats'))):
+        with holder['lock']:
+            for key in keys:
+                holder[key] = None
+    with core._EXPIRY['lock']:
+        core._EXPIRY['checked'].clear()
+
+
+def _largest_series(df):
+    jenis, tahun = df.groupby(['Jenis', 'Tahun']).size().idxmax()
+    return jenis, int(tahun)
+
+
+# Setiap operasi: fn(ctx) -> jumlah pemanggilan yang diukur dalam satu ronde
+def _op_load_data(ctx):
+    storage = BACKENDS[ctx['engine']]()
+    start = time.perf_counter()
+    storage.load_data()
+    return time.perf_counter() - start, 1
+
+
+def _op_allocator_build(ctx):
+    _reset_process_state()
+    get_storage(ctx['engine'])
+    start = time.perf_counter()
+    core.get_next_number(None, ctx['tanggal'], ctx['jenis'])
+    return time.perf_counter() - start, 1
+
+
+def _next_number(mode):
+    def op(ctx):
+        core.get_next_number(None, ctx['tanggal'], ctx['jenis'], mode=mode)
+        calls = ctx['calls'] * 100
+        start = time.perf_counter()
+        for _ in range(calls):
+            core.get_next_number(None, ctx['tanggal'], ctx['jenis'], mode=mode)
+        return time.perf_counter() - start, calls
+    return op
+
+
+def _op_process_form(ctx):
+    core.get_allocator()
+    elapsed = 0.0
+    for i in range(ctx['calls']):
+        start = time.perf_counter()
+        _, error, pdf_future = core.process_form(ctx['jenis'], '800', ctx['tanggal'], 'Penerima', f'Benchmark {i}', '-', None)
+        elapsed += time.perf_counter() - start
+        if error:
+            raise RuntimeError(error)
+        # PDF bukti dirender di latar belakang; tunggu di luar pengukuran agar tidak mengganggu ronde berikutnya
+        pdf_future.result()
+    return elapsed, ctx['calls']
+
+
+def _op_add_skipped_number(ctx):
+    series = core.get_allocator().series(ctx['jenis'], ctx['tanggal'].year)
+    first = series.next_continuous() + 10
+    start = time.perf_counter()
+    for i in range(ctx['calls']):
+        core.add_skipped_number(ctx['jenis'], ctx['tanggal'].year, first + 2 * i)
+    return time.perf_counter() - start, ctx['calls']
+
+
+def _export(render):
+    def op(ctx):
+        start = time.perf_counter()
+        render(ctx['series_df'], ctx)
+        return time.perf_counter() - start, 1
+    return op
+
+
+def _op_generate_single_pdf(ctx):
+    start = time.perf_counter()
+    for i in range(ctx['calls']):
+        generate_single_pdf(f'800/{i:03d}-KURIP', 'Undangan rapat koordinasi', ctx['tanggal'], 'Direktur', '-', ctx['jenis'])
+    return time.perf_counter() - start, ctx['calls']
+
+
+OPERATIONS = {
+    'load_data': _op_load_data,
+    'allocator_build': _op_allocator_build,
+    'get_next_number_continuous': _next_number('continuous'),
+    'get_next_number_fill_gaps': _next_number('fill_gaps'),
+    'process_form': _op_process_form,
+    'add_skipped_number': _op_add_skipped_number,
+    'generate_excel': _export(lambda df, ctx: generate_excel(df)),
+    'generate_recap_pdf': _export(lambda df, ctx: generate_recap_pdf(df, date(ctx['tahun'], 1, 1), date(ctx['tahun'], 12, 31), ctx['jenis'])),
+    'generate_single_pdf': _op_generate_single_pdf,
+}
+
+
+def run_suite(letters_list, engines, ops, repeat=3, calls=10, seed=0, work_dir=None, log=print):
+    """Run every op for every (engine, archive size); returns a list of result dicts."""
+    results = []
+    cwd = os.getcwd()
+    root = work_dir or tempfile.mkdtemp(prefix='bench_penomoran_')
+    try:
+        for letters in letters_list:
+            df, df_skipped = synthetic_archive(letters, seed=seed)
+            jenis, tahun = _largest_series(df)
+            series_df = df[(df['Jenis'] == jenis) & (df['Tahun'] == tahun)]
+            for engine in engines:
+                directory = os.path.join(root, f'{engine}_{letters}')
+                os.environ['PENOMORAN_STORAGE'] = engine
+                write_archive(engine, directory, df, df_skipped)
+                _reset_process_state()
+                ctx = {'engine': engine, 'jenis': jenis, 'tahun': tahun, 'tanggal': date(tahun, 12, 31),
+                       'series_df': series_df, 'calls': calls}
+                for op in ops:
+                    rounds = [OPERATIONS[op](ctx) for _ in range(repeat)]
+                    per_call = [seconds / n for seconds, n in rounds]
+                    result = {'engine': engine, 'letters': letters, 'op': op, 'seconds': min(per_call),
+                              'median': statistics.median(per_call), 'calls': rounds[0][1], 'repeat': repeat}
+                    results.append(result)
+                    log(f"{engine:>8} {letters:>8} {op:<28} {result['seconds'] * 1e3:10.3f} ms/call")
+                shutil.rmtree(directory, ignore_errors=True)
+    finally:
+        os.chdir(cwd)
+        if work_dir is None:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'pandas': pd.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count(), 'timestamp': datetime.now().isoformat(timespec='seconds')}
+
+
+def compare(results, baseline, max_regression):
+    """(ratio rows, regressions) of results against a baseline result list, matched on (engine, letters, op)."""
+    before = {(r['engine'], r['letters'], r['op']): r['seconds'] for r in baseline}
+    rows = []
+    for r in results:
+        old = before.get((r['engine'], r['letters'], r['op']))
+        if old:
+            rows.append((r['engine'], r['letters'], r['op'], old, r['seconds'], r['seconds'] / old))
+    return rows, [row for row in rows if row[-1] > max_regression]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--letters', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--engines', nargs='+', choices=list(BACKENDS), default=['csv'])
+    parser.add_argument('--ops', nargs='+', choices=list(OPERATIONS), default=list(OPERATIONS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--calls', type=int, default=10, help="calls per round for per-call operations")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', help="JSON file of an earlier run to compare against")
+    parser.add_argument('--max-regression', type=float, default=1.5)
+    args = parser.parse_args()
+
+    results = run_suite(args.letters, args.engines, args.ops, args.repeat, args.calls, args.seed)
+    report = {'benchmark': 'suite', 'environment': _environment(), 'results': results}
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as fh:
+            rows, regressions = compare(results, json.load(fh)['results'], args.max_regression)
+        for engine, letters, op, old, new, ratio in rows:
+            flag = '  REGRESSION' if ratio > args.max_regression else ''
+            print(f"{engine:>8} {letters:>8} {op:<28} {old * 1e3:10.3f} -> {new * 1e3:10.3f} ms  x{ratio:.2f}{flag}")
+        status = 1 if regressions else 0
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Synthetic clinic archives for benchmarks: letters of all four Jenis over many years, with
+realistic gaps and reserved numbers, written into any storage engine.
+
+    python benchmarks/synthetic.py --letters 100000 --engine sqlite --dir /tmp/arsip
+
+The same (letters, years, seed) always gives the same archive, so runs on different
+versions of the app measure the same data.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from penomoran.core import JENIS_SURAT, format_nomor_surat  # noqa: E402
+from penomoran.storage import BACKENDS, LETTER_COLUMNS, SKIP_COLUMNS  # noqa: E402
+
+# Perkiraan porsi tiap jenis pada arsip klinik: surat masuk/keluar jauh lebih banyak dari SK/MOU
+JENIS_SHARE = [0.45, 0.35, 0.12, 0.08]
+KODES = ['005', '800', '445.1', '094', 'ADM', '440']
+KEPADA = ['Dinas Kesehatan Kabupaten Bogor', 'BPJS Kesehatan', 'RSUD Cibinong', 'Puskesmas Parung', 'Direktur']
+PERIHAL = ['Undangan rapat koordinasi', 'Permohonan data pelayanan pasien rawat inap', 'Laporan bulanan',
+           'Surat tugas pelatihan', 'Perjanjian kerja sama rujukan', 'Pemberitahuan jadwal jaga']
+
+
+def synthetic_archive(letters, years=10, last_year=2025, seed=0, gap_ratio=0.02, reserved_ratio=0.25):
+    """
+    (df, df_skipped) in the stored format: LETTER_COLUMNS and SKIP_COLUMNS.
+    Letters are spread over years ending at last_year; within each (Jenis, Tahun) they are
+    numbered by date, and gap_ratio of the numbers are left out. reserved_ratio of those
+    gaps are reserved, as single numbers and as short ranges.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(letters / (1 - gap_ratio)) + 1
+    jenis = rng.choice(np.array(JENIS_SURAT, dtype=object), total, p=JENIS_SHARE)
+    tahun = rng.integers(last_year - years + 1, last_year + 1, total)
+    tanggal = (pd.to_datetime(pd.Series(tahun).astype(str) + '-01-01')
+               + pd.to_timedelta(rng.integers(0, 365, total), unit='D'))
+    df = pd.DataFrame({'Jenis': jenis, 'Tahun': tahun, 'Tanggal': tanggal}).sort_values('Tanggal', kind='stable')
+    df['No'] = df.groupby(['Jenis', 'Tahun']).cumcount() + 1
+
+    # Sebagian nomor tidak pernah terbit; sebagian celah itu di-reserve
+    top = df[df['Tahun'] == last_year].groupby('Jenis')['No'].max()
+    keep = np.ones(len(df), dtype=bool)
+    keep[rng.choice(len(df), len(df) - letters, replace=False)] = False
+    gaps = df[~keep]
+    df = df[keep].reset_index(drop=True)
+
+    n = len(df)
+    df['Bulan'] = df['Tanggal'].dt.month
+    df['Tanggal'] = df['Tanggal'].dt.date
+    df['Kode_Klasifikasi'] = rng.choice(np.array(KODES, dtype=object), n)
+    df['Kepada'] = rng.choice(np.array(KEPADA, dtype=object), n)
+    df['Perihal'] = rng.choice(np.array(PERIHAL, dtype=object), n)
+    df['Keterangan'] = '-'
+    df['Nomor_Surat'] = [format_nomor_surat(j, k, no, t) for j, k, no, t in
+                         zip(df['Jenis'], df['Kode_Klasifikasi'], df['No'], df['Tahun'])]
+
+    reserved = gaps.sample(frac=reserved_ratio, random_state=seed).sort_values(['Jenis', 'Tahun', 'No'])
+    df_skipped = pd.DataFrame({'Jenis': reserved['Jenis'].to_numpy(), 'Tahun': reserved['Tahun'].to_numpy(),
+                               'No': reserved['No'].to_numpy(), 'No_Akhir': reserved['No'].to_numpy(),
+                               'Created': reserved['Tanggal'].dt.date.astype(str).to_numpy(), 'Expires': ''})
+    # Beberapa rentang di atas nomor tertinggi tahun terakhir, seperti hasil "Lewati Nomor" berjumlah banyak
+    ranges = pd.DataFrame({'Jenis': top.index, 'Tahun': last_year, 'No': top.to_numpy() + 1,
+                           'No_Akhir': top.to_numpy() + 5, 'Created': f'{last_year}-12-31', 'Expires': ''})
+    df_skipped = pd.concat([df_skipped, ranges], ignore_index=True)
+    return df[LETTER_COLUMNS], df_skipped[SKIP_COLUMNS]
+
+
+def write_archive(engine, directory, df, df_skipped):
+    """Store an archive with a fresh engine instance in directory (engines use relative paths); returns it."""
+    os.makedirs(directory, exist_ok=True)
+    os.chdir(directory)
+    storage = BACKENDS[engine]()
+    storage.save_data(df)
+    storage.save_skipped(df_skipped)
+    return storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--letters', type=int, default=10000)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=list(BACKENDS), default='csv')
+    parser.add_argument('--dir', required=True)
+    args = parser.parse_args()
+    df, df_skipped = synthetic_archive(args.letters, args.years, seed=args.seed)
+    write_archive(args.engine, os.path.abspath(args.dir), df, df_skipped)
+    print(f"Wrote {len(df)} letters and {len(df_skipped)} reserved ranges ({args.engine}) to {args.dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
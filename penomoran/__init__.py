@@ -0,0 +1 @@
+"""Core modules of the Klinik Utama Rawat Inap Parung letter numbering app."""
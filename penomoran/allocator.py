@@ -0,0 +1,238 @@
+"""
+Per-(Jenis, Tahun) allocator index: issued and reserved numbers with their free intervals,
+kept once per process and rebuilt only when the storage changed outside this process.
+"""
+import bisect
+import functools
+import threading
+from collections import Counter
+
+import pandas as pd
+
+from penomoran.metrics import span
+from penomoran.storage import expand_skipped, get_storage
+
+
+class _SeriesIndex:
+    """
+    Numbering state of a single (Jenis, Tahun) series.
+    used     : Counter of issued numbers (old data may contain duplicates)
+    reserved : set of skipped/reserved numbers
+    high     : high-water mark, max(used U reserved) or 0 when empty
+    _starts/_ends : sorted, disjoint intervals of free numbers below high
+    _taken   : number of distinct used or reserved numbers
+    """
+
+    def __init__(self, used=(), reserved=()):
+        self.used = Counter(int(n) for n in used if int(n) > 0)
+        self.reserved = set(int(n) for n in reserved if int(n) > 0)
+        taken = sorted(set(self.used) | self.reserved)
+        self.high = taken[-1] if taken else 0
+        self._taken = len(taken)
+        self._starts = []
+        self._ends = []
+        prev = 0
+        for n in taken:
+            if n > prev + 1:
+                self._starts.append(prev + 1)
+                self._ends.append(n - 1)
+            prev = n
+
+    def is_used(self, n):
+        return self.used[int(n)] > 0
+
+    def is_taken(self, n):
+        n = int(n)
+        return self.used[n] > 0 or n in self.reserved
+
+    def next_continuous(self):
+        return self.high + 1
+
+    def smallest_free(self):
+        return self._starts[0] if self._starts else self.high + 1
+
+    def reserved_numbers(self):
+        return sorted(self.reserved)
+
+    def unused_count(self):
+        """Numbers below the high-water mark that are neither issued nor reserved."""
+        return self.high - self._taken
+
+    def add_used(self, n):
+        n = int(n)
+        was_taken = self.is_taken(n)
+        self.used[n] += 1
+        if not was_taken:
+            self._take(n)
+
+    def remove_used(self, n):
+        n = int(n)
+        if self.used[n] <= 0:
+            return
+        self.used[n] -= 1
+        if self.used[n] == 0:
+            del self.used[n]
+            if n not in self.reserved:
+                self._free(n)
+
+    def add_reserved(self, n):
+        n = int(n)
+        if n in self.reserved:
+            return
+        was_taken = self.is_taken(n)
+        self.reserved.add(n)
+        if not was_taken:
+            self._take(n)
+
+    def remove_reserved(self, n):
+        n = int(n)
+        if n not in self.reserved:
+            return
+        self.reserved.discard(n)
+        if self.used[n] <= 0:
+            self._free(n)
+
+    def _take(self, n):
+        if n <= 0:
+            return
+        self._taken += 1
+        if n > self.high:
+            # Lompatan di atas high-water mark membuka satu celah baru di ujung
+            if n > self.high + 1:
+                self._starts.append(self.high + 1)
+                self._ends.append(n - 1)
+            self.high = n
+            return
+        i = bisect.bisect_right(self._starts, n) - 1
+        if i < 0 or n > self._ends[i]:
+            return
+        start, end = self._starts[i], self._ends[i]
+        if start == end:
+            del self._starts[i]
+            del self._ends[i]
+        elif n == start:
+            self._starts[i] = n + 1
+        elif n == end:
+            self._ends[i] = n - 1
+        else:
+            self._ends[i] = n - 1
+            self._starts.insert(i + 1, n + 1)
+            self._ends.insert(i + 1, end)
+
+    def _free(self, n):
+        if n <= 0 or n > self.high:
+            return
+        self._taken -= 1
+        if n == self.high:
+            # Turunkan high-water mark melewati celah yang menempel di ujung
+            if self._ends and self._ends[-1] == n - 1:
+                self.high = self._starts.pop() - 1
+                self._ends.pop()
+            else:
+                self.high = n - 1
+            return
+        i = bisect.bisect_right(self._starts, n) - 1
+        left = i >= 0 and self._ends[i] == n - 1
+        right = i + 1 < len(self._starts) and self._starts[i + 1] == n + 1
+        if left and right:
+            self._ends[i] = self._ends[i + 1]
+            del self._starts[i + 1]
+            del self._ends[i + 1]
+        elif left:
+            self._ends[i] = n
+        elif right:
+            self._starts[i + 1] = n
+        else:
+            self._starts.insert(i + 1, n)
+            self._ends.insert(i + 1, n)
+
+
+class AllocatorIndex:
+    """
+    Per-(Jenis, Tahun) numbering index built from the stored letters and skipped numbers.
+    Next-number lookups (continuous and fill_gaps) are O(1); updates are O(log n).
+    With a loader(tahun) -> (df, df_skipped), years are loaded on first use instead of up front,
+    so a partitioned storage only reads the partitions that are actually numbered.
+    """
+
+    def __init__(self, df, df_skipped, loader=None):
+        self._loader = loader
+        self._loaded_years = set()
+        self._load_lock = threading.Lock()
+        self._series = {}
+        self._add_rows(df, df_skipped)
+
+    def _add_rows(self, df, df_skipped):
+        used = {}
+        if not df.empty:
+            for (jenis, tahun), nos in df.groupby(['Jenis', 'Tahun'])['No']:
+                used[(jenis, int(tahun))] = nos.astype(int).tolist()
+        reserved = {}
+        if not df_skipped.empty:
+            for (jenis, tahun), nos in expand_skipped(df_skipped).groupby(['Jenis', 'Tahun'])['No']:
+                reserved[(jenis, int(tahun))] = nos.astype(int).tolist()
+        for key in set(used) | set(reserved):
+            self._series[key] = _SeriesIndex(used.get(key, ()), reserved.get(key, ()))
+
+    def series(self, jenis, tahun):
+        key = (jenis, int(tahun))
+        if self._loader is not None and key[1] not in self._loaded_years:
+            with self._load_lock:
+                if key[1] not in self._loaded_years:
+                    self._add_rows(*self._loader(key[1]))
+                    self._loaded_years.add(key[1])
+        if key not in self._series:
+            self._series[key] = _SeriesIndex()
+        return self._series[key]
+
+
+def _storage_signature():
+    storage = get_storage()
+    return storage, storage.signature()
+
+
+# Satu indeks per proses: bertahan lintas rerun & sesi Streamlit maupun permintaan API;
+# dibangun ulang hanya jika data diubah dari luar
+_ALLOCATOR = {'lock': threading.Lock(), 'signature': None, 'index': None}
+
+
+def _allocator_holder():
+    return _ALLOCATOR
+
+
+def get_allocator():
+    """Return the allocator index, rebuilding it if the stored data changed outside this process."""
+    holder = _allocator_holder()
+    with holder['lock']:
+        sig = _storage_signature()
+        if holder['index'] is None or holder['signature'] != sig:
+            storage = sig[0]
+            with span('core.allocator_build'):
+                if storage.partitioned:
+                    holder['index'] = AllocatorIndex(pd.DataFrame(), pd.DataFrame(), loader=functools.partial(_year_rows, storage))
+                else:
+                    holder['index'] = AllocatorIndex(storage.numbering_rows(), storage.load_skipped())
+            holder['signature'] = sig
+        return holder['index']
+
+
+def _year_rows(storage, tahun):
+    df_skipped = storage.load_skipped()
+    return storage.numbering_rows(tahun), df_skipped[df_skipped['Tahun'] == tahun]
+
+
+def _allocator_synced(index):
+    """
+    Record the storage signature after index has been updated for our own write.
+    If another thread swapped in a rebuilt index meanwhile, force the next rebuild instead.
+    """
+    holder = _allocator_holder()
+    with holder['lock']:
+        holder['signature'] = _storage_signature() if holder['index'] is index else None
+
+
+def _allocator_invalidate():
+    """Force the next get_allocator() call to rebuild the index from storage."""
+    holder = _allocator_holder()
+    with holder['lock']:
+        holder['signature'] = None
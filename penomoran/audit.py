@@ -0,0 +1,264 @@
+"""
+Numbering integrity audit over the whole archive, every Jenis and every year in one pass:
+
+  - Celah              : ranges of numbers below a series' highest number that were never
+                         issued nor reserved
+  - Duplikat           : numbers issued more than once in the same (Jenis, Tahun)
+  - Reservasi Usang    : reserved numbers that were issued anyway, reserved twice or invalid
+  - Format Tidak Sesuai: Nomor_Surat that does not match Jenis, Kode_Klasifikasi, No and Tahun
+
+Every series is packed into one int64 key per number, (series << 32) | No, so gaps, duplicates
+and stale reservations are NumPy sort/diff/isin operations over the full archive instead of a
+loop per series. Nomor_Surat is checked per layout (widths of prefix, number and suffix), not
+per series and kode.
+
+    python -m penomoran.audit [--output audit_penomoran.xlsx]
+"""
+import argparse
+import io
+
+import numpy as np
+import pandas as pd
+
+from penomoran.exports import write_excel_stream
+from penomoran.metrics import timed
+from penomoran.storage import expand_skipped, get_storage
+
+AUDIT_SHEETS = ['Ringkasan', 'Celah', 'Duplikat', 'Reservasi Usang', 'Format Tidak Sesuai']
+
+_NO_BITS = 32
+_NO_MASK = (1 << _NO_BITS) - 1
+
+
+def _series_codes(jenis, tahun, categories):
+    """int64 code per row for (Jenis, Tahun); -1 where Jenis is not in categories."""
+    jenis_code = pd.Categorical(jenis, categories=categories).codes.astype(np.int64)
+    code = jenis_code * 10000 + np.asarray(tahun, dtype=np.int64)
+    return np.where(jenis_code < 0, -1, code)
+
+
+def _decode(codes, categories):
+    """(Jenis, Tahun) columns for series codes."""
+    codes = np.asarray(codes, dtype=np.int64)
+    return np.asarray(categories, dtype=object)[codes // 10000], codes % 10000
+
+
+# Nomor_Surat per jenis: <kode><pemisah><nomor, min. 3 digit><akhiran>; harus sama dengan core.format_nomor_surat
+NOMOR_SURAT_PARTS = {
+    "Surat Masuk": ("/", "-KURIP"),
+    "Surat Keluar": ("/", "-KURIP"),
+    "Surat Keputusan (SK)": ("/SK-", "/KURIP/{t}"),
+    "Perjanjian Kerjasama (MOU)": ("/", "/KURIP/{t}"),
+}
+
+# Kode angka dari CSV kehilangan nol di depannya (005 -> 5); terima hingga sekian nol tambahan
+_MAX_KODE_ZEROS = 3
+
+
+def _kode_prefix(kode, separator):
+    """Canonical Nomor_Surat prefix for one Kode_Klasifikasi value and how many extra leading zeros it may carry."""
+    if kode is None or (not isinstance(kode, str) and pd.isna(kode)):
+        return separator, 0
+    if isinstance(kode, str):
+        return kode.strip() + separator, 0
+    text = str(int(kode)) if float(kode).is_integer() else str(kode)
+    return text + separator, _MAX_KODE_ZEROS
+
+
+def _char_table(texts, code):
+    """(rows, width) character codes of texts, zero-padded, and their lengths."""
+    width = max((len(t) for t in texts), default=0)
+    table = np.zeros((len(texts), max(width, 1)), dtype=code)
+    for i, text in enumerate(texts):
+        table[i, :len(text)] = [ord(c) for c in text]
+    return table, np.array([len(t) for t in texts], dtype=np.int64)
+
+
+def _format_ok(chars, lengths, no, prefix_pos, prefixes, zeros, suffix_pos, suffixes):
+    """
+    Vectorized Nomor_Surat check of every row: '0' * z + prefix + number (min. 3 digits) + suffix,
+    with 0 <= z <= zeros of the prefix. chars: (rows, width) character codes, zero-padded; lengths:
+    text lengths; prefixes and suffixes: (table, lengths) from _char_table, chosen per row by
+    prefix_pos and suffix_pos. Rows are compared per layout (z and the part widths), where every
+    expected character sits in a fixed column; there are only a handful of layouts.
+    """
+    (prefix_table, prefix_len), (suffix_table, suffix_len) = prefixes, suffixes
+    digits = np.maximum(3, np.floor(np.log10(np.maximum(no, 1))).astype(np.int64) + 1)
+    p, s = prefix_len[prefix_pos], suffix_len[suffix_pos]
+    z = lengths - p - digits - s
+    ok = np.zeros(len(no), dtype=bool)
+    rows = np.flatnonzero((no > 0) & (z >= 0) & (z <= zeros[prefix_pos]))
+    if not len(rows):
+        return ok
+    layout = np.ravel_multi_index((z[rows], p[rows], digits[rows], s[rows]),
+                                  (zeros.max() + 1, p.max() + 1, digits.max() + 1, s.max() + 1))
+    order = np.argsort(layout, kind='stable')
+    layout = layout[order]
+    starts = np.flatnonzero(np.r_[True, layout[1:] != layout[:-1]])
+    for r in np.split(rows[order], starts[1:]):
+        zr, pr, dr, sr = z[r[0]], p[r[0]], digits[r[0]], s[r[0]]
+        start, end = zr + pr, zr + pr + dr
+        match = (chars[r, :zr] == 48).all(axis=1)
+        match &= (chars[r, zr:start] == prefix_table[prefix_pos[r], :pr]).all(axis=1)
+        match &= (chars[r, start:end] == 48 + (no[r, None] // 10 ** np.arange(dr - 1, -1, -1)) % 10).all(axis=1)
+        match &= (chars[r, end:end + sr] == suffix_table[suffix_pos[r], :sr]).all(axis=1)
+        ok[r] = match
+    return ok
+
+
+def _sorted_unique(keys):
+    """np.unique for int64 keys via one sort: (unique keys, True where a key repeats the previous one)."""
+    keys = np.sort(keys)
+    repeat = np.r_[np.zeros(min(len(keys), 1), bool), keys[1:] == keys[:-1]]
+    return keys[~repeat], keys[repeat]
+
+
+def _isin_sorted(keys, sorted_unique):
+    pos = np.searchsorted(sorted_unique, keys)
+    return sorted_unique[np.minimum(pos, len(sorted_unique) - 1)] == keys if len(sorted_unique) else np.zeros(len(keys), bool)
+
+
+def _format_mismatches(df, series, categories):
+    """Rows of df whose Nomor_Surat differs from the expected pattern, with the expected value."""
+    columns = ['Jenis', 'Tahun', 'No', 'Kode_Klasifikasi', 'Nomor_Surat']
+    if df.empty:
+        return pd.DataFrame(columns=columns + ['Seharusnya'])
+    # Nilai kosong menjadi 'nan' dan otomatis tercatat tidak sesuai
+    nomor = df['Nomor_Surat'].to_numpy(dtype=object)
+    try:
+        # ASCII (kasus umum): satu byte per karakter
+        text, code = nomor.astype('S'), np.uint8
+    except UnicodeEncodeError:
+        text, code = nomor.astype('U'), np.uint32
+    width = text.dtype.itemsize // np.dtype(code).itemsize
+    chars = text.view(code).reshape(len(text), width) if width else np.zeros((len(text), 1), code)
+    lengths = (chars != 0).sum(axis=1)
+    no = df['No'].to_numpy(dtype=np.int64)
+
+    # Awalan per (pemisah jenis, kode) dan akhiran per (Jenis, Tahun): tabel kecil, lalu satu kali per baris
+    jenis_known = np.array([j in NOMOR_SURAT_PARTS for j in categories] + [False])
+    series_codes, series_pos = np.unique(series, return_inverse=True)
+    s_jenis, s_tahun = _decode(np.maximum(series_codes, 0), categories)
+    known = jenis_known[np.where(series_codes >= 0, series_codes // 10000, -1)]
+    separators = [NOMOR_SURAT_PARTS[j][0] if k else '' for j, k in zip(s_jenis, known)]
+    suffixes = [NOMOR_SURAT_PARTS[j][1].format(t=int(t)) if k else '' for j, t, k in zip(s_jenis, s_tahun, known)]
+    sep_codes, sep_of_series = np.unique(separators, return_inverse=True)
+    sep_pos = sep_of_series[series_pos]
+    kode_codes, kodes = pd.factorize(df['Kode_Klasifikasi'])
+    kode_codes = np.where(kode_codes < 0, len(kodes), kode_codes)
+    pairs = [_kode_prefix(kode, sep) for sep in sep_codes for kode in list(kodes) + [None]]
+    prefix_pos = sep_pos * (len(kodes) + 1) + kode_codes
+    zeros = np.array([z for _, z in pairs], dtype=np.int64)
+    ok = _format_ok(chars, lengths, no, prefix_pos, _char_table([p for p, _ in pairs], code), zeros,
+                    series_pos, _char_table(suffixes, code))
+    ok &= known[series_pos]
+
+    # Teks yang seharusnya hanya dibuat untuk baris yang salah dengan jenis yang dikenal
+    expected = np.full(len(df), '', dtype=object)
+    bad = np.flatnonzero(~ok & known[series_pos])
+    expected[bad] = [f"{pairs[p][0]}{n:03d}{suffixes[s]}" for p, n, s in
+                     zip(prefix_pos[bad].tolist(), no[bad].tolist(), series_pos[bad].tolist())]
+
+    rows = df.loc[~ok, columns].copy()
+    rows['Seharusnya'] = expected[~ok]
+    return rows.sort_values(['Jenis', 'Tahun', 'No'], ignore_index=True)
+
+
+def audit_numbering(df, df_skipped):
+    """
+    Audit letters (LETTER_COLUMNS) against skipped numbers (SKIP_COLUMNS).
+    Returns {sheet name: DataFrame} for AUDIT_SHEETS.
+    """
+    categories = sorted({j for j in np.r_[pd.unique(df['Jenis']), pd.unique(df_skipped['Jenis'])] if isinstance(j, str)})
+    no = df['No'].to_numpy(dtype=np.int64)
+    series = _series_codes(df['Jenis'], df['Tahun'], categories)
+    valid = (series >= 0) & (no > 0)
+    used = (series[valid] << _NO_BITS) | no[valid]
+
+    # Reservasi disimpan per rentang; diaudit per nomor
+    df_skipped = expand_skipped(df_skipped)
+    res_no = df_skipped['No'].to_numpy(dtype=np.int64)
+    res_series = _series_codes(df_skipped['Jenis'], df_skipped['Tahun'], categories)
+    res_valid = (res_series >= 0) & (res_no > 0)
+    reserved = (res_series[res_valid] << _NO_BITS) | res_no[res_valid]
+
+    # --- Duplikat: kunci yang muncul lebih dari sekali ---
+    used_unique, repeated = _sorted_unique(used)
+    dup_rows = df.iloc[np.flatnonzero(valid)[_isin_sorted(used, np.unique(repeated))]]
+    duplicates = (dup_rows.groupby(['Jenis', 'Tahun', 'No'])['Nomor_Surat']
+                  .agg(Jumlah='size', Nomor_Surat=lambda s: ', '.join(s.astype(str)))
+                  .reset_index())
+
+    # --- Celah: selisih > 1 antara nomor terpakai (terbit atau di-reserve) yang berurutan ---
+    taken, _ = _sorted_unique(np.r_[used_unique, reserved])
+    taken_series, taken_no = taken >> _NO_BITS, taken & _NO_MASK
+    same = taken_series[1:] == taken_series[:-1]
+    inner = same & (taken_no[1:] - taken_no[:-1] > 1)
+    first = np.r_[True, ~same] & (taken_no > 1)
+    gap_series = np.r_[taken_series[:-1][inner], taken_series[first]]
+    gap_start = np.r_[taken_no[:-1][inner] + 1, np.ones(first.sum(), dtype=np.int64)]
+    gap_end = np.r_[taken_no[1:][inner] - 1, taken_no[first] - 1]
+    order = np.lexsort((gap_start, gap_series))
+    gap_jenis, gap_tahun = _decode(gap_series[order], categories)
+    gaps = pd.DataFrame({'Jenis': gap_jenis, 'Tahun': gap_tahun, 'Dari': gap_start[order], 'Sampai': gap_end[order],
+                         'Jumlah': gap_end[order] - gap_start[order] + 1})
+
+    # --- Reservasi usang: sudah terbit, tercatat ganda, atau tidak valid ---
+    reasons = np.full(len(df_skipped), '', dtype=object)
+    reasons[~res_valid] = 'Jenis atau nomor tidak valid'
+    idx = np.flatnonzero(res_valid)
+    _, first_pos = np.unique(reserved, return_index=True)
+    twice = np.ones(len(reserved), dtype=bool)
+    twice[first_pos] = False
+    reasons[idx[twice]] = 'Di-reserve lebih dari sekali'
+    reasons[idx[_isin_sorted(reserved, used_unique)]] = 'Nomor sudah terbit'
+    stale = df_skipped[reasons != ''][['Jenis', 'Tahun', 'No', 'Created']].copy()
+    stale['Alasan'] = reasons[reasons != '']
+    stale = stale.sort_values(['Jenis', 'Tahun', 'No'], ignore_index=True)
+
+    mismatches = _format_mismatches(df, series, categories)
+
+    # --- Ringkasan per (Jenis, Tahun) ---
+    letters = np.bincount(series[series >= 0])
+    summary_codes = np.flatnonzero(letters)
+    letters = letters[summary_codes]
+    s_jenis, s_tahun = _decode(summary_codes, categories)
+    summary = pd.DataFrame({'Jenis': s_jenis, 'Tahun': s_tahun, 'Surat': letters})
+    for name, frame, value in (('Nomor Kosong', gaps, 'Jumlah'), ('Duplikat', duplicates, None),
+                               ('Reservasi Usang', stale, None), ('Format Tidak Sesuai', mismatches, None)):
+        counts = frame.groupby(['Jenis', 'Tahun'])[value].sum() if value else frame.groupby(['Jenis', 'Tahun']).size()
+        summary = summary.merge(counts.rename(name).reset_index(), on=['Jenis', 'Tahun'], how='outer')
+    summary = summary.fillna(0).sort_values(['Jenis', 'Tahun'], ignore_index=True)
+    summary[summary.columns[2:]] = summary[summary.columns[2:]].astype(int)
+
+    return dict(zip(AUDIT_SHEETS, (summary, gaps, duplicates, stale, mismatches)))
+
+
+@timed
+def run_audit(storage=None):
+    """Audit the stored letters and skipped numbers of storage (default: the configured engine)."""
+    storage = storage or get_storage()
+    return audit_numbering(storage.load_data(), storage.load_skipped())
+
+
+def audit_excel(report, output=None):
+    """Write an audit report to an xlsx workbook, one sheet per part; returns bytes if output is None."""
+    target = output if output is not None else io.BytesIO()
+    write_excel_stream([(name, [report[name]]) for name in AUDIT_SHEETS], target)
+    return target.getvalue() if output is None else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Numbering integrity audit for the numbering app.")
+    parser.add_argument('--output', default='audit_penomoran.xlsx')
+    args = parser.parse_args(argv)
+    report = run_audit()
+    audit_excel(report, args.output)
+    for name in AUDIT_SHEETS[1:]:
+        print(f"{name}: {len(report[name])}")
+    print(f"Written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,711 @@
+"""
+Letter numbering core: storage helpers and the operations that issue, reserve, release and
+delete numbers on top of the allocator index (penomoran.allocator).
+Nothing here depends on Streamlit; the Streamlit UI (penomoran.ui), the local HTTP service
+and the CLI (penomoran.service) all go through these functions.
+"""
+import atexit
+import functools
+import os
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from penomoran.allocator import _allocator_invalidate, _allocator_synced, get_allocator
+from penomoran.exports import ProofRenderer
+from penomoran.metrics import span, timed
+from penomoran.search import InvertedIndex, search_text
+from penomoran.stats import STATS_FILE, load_stats, read_stats, rebuild_stats, save_stats, storage_key
+from penomoran.storage import LETTER_COLUMNS, expand_skipped, get_storage
+
+JENIS_SURAT = ["Surat Masuk", "Surat Keluar", "Surat Keputusan (SK)", "Perjanjian Kerjasama (MOU)"]
+
+# Batas jumlah nomor dalam satu reservasi rentang
+MAX_RESERVE_RANGE = 1000
+
+
+def storage_lock():
+    """
+    Exclusive lock around every read-modify-write of the letter and skipped-number storage.
+    Safe across processes and sessions; re-entrant within the same thread.
+    """
+    return get_storage().lock()
+
+
+def load_data():
+    """All letters; the frame is shared with the load cache, so copy it before changing it."""
+    return get_storage().load_data()
+
+
+def save_data(df):
+    get_storage().save_data(df)
+
+
+# Skipped numbers functions
+def load_skipped():
+    return get_storage().load_skipped()
+
+
+def save_skipped(df):
+    get_storage().save_skipped(df)
+
+
+@timed
+def load_letters_between(jenis, start, end):
+    return get_storage().letters_between(jenis, start, end)
+
+
+@timed
+def load_letters_page(jenis, start, end, offset, limit):
+    """One page of a report, highest No first: (DataFrame, total letters in range)."""
+    return get_storage().letters_page(jenis, start, end, offset, limit)
+
+
+def get_skipped_numbers(df_skipped, jenis, tahun):
+    dff = df_skipped[(df_skipped['Jenis'] == jenis) & (df_skipped['Tahun'] == tahun)]
+    return sorted(expand_skipped(dff)['No'].astype(int).tolist())
+
+
+def _free_runs(series, no, last):
+    """Maximal runs (first, last) of numbers in no..last that are neither issued nor reserved."""
+    runs = []
+    for n in range(int(no), int(last) + 1):
+        if series.is_taken(n):
+            continue
+        if runs and runs[-1][1] == n - 1:
+            runs[-1][1] = n
+        else:
+            runs.append([n, n])
+    return runs
+
+
+@timed
+def reserve_numbers(jenis, tahun, no, last=None, ttl_days=None):
+    """
+    Reserve numbers no..last (default just no) in one locked step, stored as ranges.
+    Numbers already issued or reserved are left as they are. With ttl_days the reservation
+    expires after that many days and release_expired_reservations() frees it again.
+    Returns the number of newly reserved numbers.
+    """
+    last = int(no if last is None else last)
+    if int(no) <= 0 or last < int(no) or last - int(no) >= MAX_RESERVE_RANGE:
+        raise ValueError(f"Rentang nomor tidak valid (1 sampai {MAX_RESERVE_RANGE} nomor)")
+    if ttl_days is not None and int(ttl_days) < 0:
+        raise ValueError("Masa berlaku tidak boleh negatif")
+    today = date.today()
+    expires = (today + timedelta(days=int(ttl_days))).isoformat() if ttl_days else ''
+    with storage_lock():
+        index = get_allocator()
+        series = index.series(jenis, tahun)
+        runs = _free_runs(series, no, last)
+        if not runs:
+            return 0
+        _stats_begin()
+        for first, end in runs:
+            get_storage().add_skipped(jenis, tahun, first, today.isoformat(), end, expires)
+            for n in range(first, end + 1):
+                series.add_reserved(n)
+        _allocator_synced(index)
+        added = sum(end - first + 1 for first, end in runs)
+        _stats_commit(lambda stats: stats.add_reserved(jenis, tahun, added))
+    return added
+
+
+def add_skipped_number(jenis, tahun, no, ttl_days=None):
+    """Reserve a single number; False if it was already reserved or issued."""
+    return reserve_numbers(jenis, tahun, no, ttl_days=ttl_days) > 0
+
+
+@timed
+def remove_skipped_number(jenis, tahun, no):
+    with storage_lock():
+        index = get_allocator()
+        series = index.series(jenis, tahun)
+        was_reserved = int(no) in series.reserved
+        _stats_begin()
+        get_storage().remove_skipped(jenis, tahun, no)
+        series.remove_reserved(no)
+        _allocator_synced(index)
+        _stats_commit(lambda stats: stats.add_reserved(jenis, tahun, -1 if was_reserved else 0))
+
+
+def reserve_next_numbers(jenis, tahun, count=1, ttl_days=None):
+    """
+    Reserve the next count continuous numbers atomically.
+    Returns (first, last, added); added is the number of newly reserved numbers.
+    """
+    with storage_lock():
+        first = get_allocator().series(jenis, tahun).next_continuous()
+        last = first + int(count) - 1
+        return first, last, reserve_numbers(jenis, tahun, first, last, ttl_days)
+
+
+def reserve_next_number(jenis, tahun, ttl_days=None):
+    """
+    Reserve the next continuous number atomically.
+    Returns (no, added); added is False if the number was already reserved.
+    """
+    no, _, added = reserve_next_numbers(jenis, tahun, 1, ttl_days)
+    return no, added > 0
+
+
+def _expired(df_skipped, today):
+    expires = df_skipped['Expires']
+    return ((expires != '') & (expires < today)).to_numpy()
+
+
+# Masa berlaku minimal satu hari, jadi reservasi tidak pernah kedaluwarsa pada hari dibuatnya:
+# cukup diperiksa sekali per hari untuk setiap penyimpanan
+_EXPIRY = {'lock': threading.Lock(), 'checked': {}}
+
+
+@timed
+def release_expired_reservations(today=None):
+    """
+    Release every reservation whose Expires date lies before today, so its numbers can be
+    issued again (fill_gaps, or continuous when they sit at the top). Returns how many numbers
+    were released. Storage is checked once per day per process; later calls that day return 0.
+    """
+    today = today or date.today()
+    storage = get_storage()
+    with _EXPIRY['lock']:
+        if _EXPIRY['checked'].get(storage) == today:
+            return 0
+    with storage_lock():
+        df_skipped = load_skipped()
+        expired = df_skipped[_expired(df_skipped, today.isoformat())]
+        if expired.empty:
+            with _EXPIRY['lock']:
+                _EXPIRY['checked'][storage] = today
+            return 0
+        index = get_allocator()
+        _stats_begin()
+        released = Counter()
+        for row in expired.itertuples(index=False):
+            get_storage().remove_skipped(row.Jenis, row.Tahun, row.No, row.No_Akhir)
+            series = index.series(row.Jenis, row.Tahun)
+            for n in range(row.No, row.No_Akhir + 1):
+                if n in series.reserved:
+                    series.remove_reserved(n)
+                    released[(row.Jenis, row.Tahun)] += 1
+        _allocator_synced(index)
+        _stats_commit(functools.partial(_count_released, released))
+    with _EXPIRY['lock']:
+        _EXPIRY['checked'][storage] = today
+    return sum(released.values())
+
+
+def _count_released(released, stats):
+    for (jenis, tahun), n in released.items():
+        stats.add_reserved(jenis, tahun, -n)
+
+
+@timed
+def get_next_number(df, tanggal, jenis_surat, mode='continuous'):
+    """
+    Determine the next 'No' for the given jenis_surat and tanggal.
+    mode:
+      - 'continuous' : nomor baru = max(existing U reserved) + 1 (or 1 if none)
+      - 'fill_gaps'  : isi nomor kosong / celah (ambil smallest missing positive integer
+                       yang bukan existing dan bukan reserved)
+    Reserved/skipped numbers are treated as occupied for automatic allocation so they won't be
+    assigned automatically; they must be explicitly chosen by the user from the skipped list.
+    The answer is read from the allocator index, which mirrors the stored letters and
+    skipped numbers; df is kept in the signature for existing callers.
+    """
+    release_expired_reservations()
+    series = get_allocator().series(jenis_surat, tanggal.year)
+    if mode == 'fill_gaps':
+        return series.smallest_free()
+    return series.next_continuous()
+
+
+def format_nomor(nomor):
+    return str(int(nomor)).zfill(3)
+
+
+def format_nomor_surat(jenis_surat, kode_klasifikasi, nomor, tahun):
+    """Build the Nomor_Surat string for one letter; None if jenis_surat is unknown."""
+    nomor_formatted = format_nomor(nomor)
+    if jenis_surat == "Surat Masuk":
+        return f"{kode_klasifikasi}/{nomor_formatted}-KURIP"
+    elif jenis_surat == "Surat Keluar":
+        return f"{kode_klasifikasi}/{nomor_formatted}-KURIP"
+    elif jenis_surat == "Surat Keputusan (SK)":
+        return f"{kode_klasifikasi}/SK-{nomor_formatted}/KURIP/{tahun}"
+    elif jenis_surat == "Perjanjian Kerjasama (MOU)":
+        return f"{kode_klasifikasi}/{nomor_formatted}/KURIP/{tahun}"
+    return None
+
+
+# Indeks pencarian per jenis; seperti indeks alokasi, dibangun sekali lalu hanya diselaraskan jika data
+# diubah dari luar. 'rows' berisi hash tiap baris pada penyelarasan terakhir dan 'added' surat yang sejak itu
+# ditambahkan oleh proses ini; penyelarasan berjalan di bawah 'sync_lock', dan 'lock' hanya dipegang saat
+# indeks diubah atau dibaca.
+_SEARCH = {'lock': threading.Lock(), 'sync_lock': threading.Lock(), 'signature': None, 'indexes': None,
+           'storage': None, 'rows': None, 'added': [], 'thread': None}
+
+# Di atas jumlah tambahan sendiri ini sejak penyelarasan terakhir, penyelarasan berikutnya membangun ulang indeks
+SEARCH_ADDED_LIMIT = 50000
+
+SEARCH_RESULT_COLUMNS = ['No', 'Tahun', 'Tanggal', 'Kode_Klasifikasi', 'Kepada', 'Perihal', 'Keterangan', 'Nomor_Surat']
+_SEARCH_KEY_COLUMNS = ['Jenis', 'Tahun', 'No', 'Nomor_Surat']
+
+
+def _search_key(tahun, no, nomor_surat):
+    return int(tahun), int(no), str(nomor_surat)
+
+
+def _search_items(df):
+    """(key, record, text) per row of a letters frame, as InvertedIndex.extend expects."""
+    keys = map(_search_key, df['Tahun'], df['No'], df['Nomor_Surat'])
+    records = zip(*(df[c].tolist() for c in SEARCH_RESULT_COLUMNS))
+    return zip(keys, records, search_text(df))
+
+
+def _same_record(old, new):
+    # NaN (sel kosong) tidak sama dengan dirinya sendiri
+    return old == new or (old is not None and all(a == b or (a != a and b != b) for a, b in zip(old, new)))
+
+
+def _search_add(indexes, df):
+    """Add the letters of df to indexes in bulk, skipping letters already indexed with the same record."""
+    for jenis, part in df.groupby('Jenis', sort=False):
+        index = indexes.setdefault(jenis, InvertedIndex())
+        keys = list(zip(part['Tahun'].astype(int).tolist(), part['No'].astype(int).tolist(),
+                        part['Nomor_Surat'].astype(str).tolist()))
+        records = list(zip(*(part[c].tolist() for c in SEARCH_RESULT_COLUMNS)))
+        if len(index):
+            # Tulisan sendiri sudah dimasukkan oleh _search_commit
+            changed = [i for i, (key, record) in enumerate(zip(keys, records)) if not _same_record(index.record(key), record)]
+            keys, records, part = [keys[i] for i in changed], [records[i] for i in changed], part.iloc[changed]
+        if keys:
+            index.extend_frame(keys, records, part)
+
+
+def _search_sync(storage):
+    """
+    Bring the search indexes in line with the letters of storage; the first call builds them.
+    Every row is hashed: rows whose hash is new since the last sync are added and the keys of rows
+    whose hash disappeared (or of our own additions that are gone) are removed, so unchanged letters
+    are not compared one by one. Loading, hashing and a first build run outside _SEARCH['lock'];
+    searches keep using the old index meanwhile.
+    """
+    with _SEARCH['sync_lock'], span('core.search_build'):
+        sig = (storage, storage.data_signature())
+        if _SEARCH['indexes'] is not None and _SEARCH['signature'] == sig:
+            return
+        df = storage.load_data()
+        hashes = pd.util.hash_pandas_object(df[['Jenis'] + SEARCH_RESULT_COLUMNS], index=False).to_numpy()
+        key_hashes = pd.util.hash_pandas_object(df[_SEARCH_KEY_COLUMNS], index=False).to_numpy()
+        rows = df[_SEARCH_KEY_COLUMNS].copy()
+        rows['hash'], rows['key'] = hashes, key_hashes
+        last = _SEARCH['rows']
+        with _SEARCH['lock']:
+            added = list(_SEARCH['added'])
+        if _SEARCH['indexes'] is None or last is None:
+            indexes = {}
+            _search_add(indexes, df)
+            with _SEARCH['lock']:
+                _SEARCH['indexes'] = indexes
+        else:
+            gone = last[~np.isin(last['hash'].to_numpy(), hashes)]
+            # Tambahan sendiri belum ada di 'rows': yang tidak lagi tersimpan ikut dihapus
+            stored = df[df['Nomor_Surat'].isin([row[3] for row in added])]
+            stored = set(zip(stored['Jenis'], stored['Tahun'].astype(int), stored['No'].astype(int),
+                              stored['Nomor_Surat'].astype(str)))
+            gone_added = [row for row in added if row not in stored]
+            # Data lama bisa memuat kunci ganda: baris lain dengan kunci yang dihapus dimasukkan ulang
+            fresh = df[~np.isin(hashes, last['hash'].to_numpy()) | np.isin(key_hashes, gone['key'].to_numpy())]
+            with _SEARCH['lock']:
+                indexes = _SEARCH['indexes']
+                for jenis, tahun, no, nomor_surat in gone_added + list(zip(*(gone[c].tolist() for c in _SEARCH_KEY_COLUMNS))):
+                    if jenis in indexes:
+                        indexes[jenis].remove(_search_key(tahun, no, nomor_surat))
+                _search_add(indexes, fresh)
+        with _SEARCH['lock']:
+            _SEARCH['storage'], _SEARCH['rows'] = storage, rows
+            if _SEARCH['added'][:len(added)] == added:
+                del _SEARCH['added'][:len(added)]
+            else:
+                # Daftar tambahan dikosongkan oleh _search_commit selama penyelarasan: bangun ulang berikutnya
+                _SEARCH['rows'] = None
+                _SEARCH['added'].clear()
+            # Ditulis lagi selama penyelarasan: biarkan basi agar pencarian berikutnya menyelaraskan ulang
+            _SEARCH['signature'] = sig if (storage, storage.data_signature()) == sig else None
+
+
+def warm_search_index():
+    """
+    Sync (or first build) the search index in a background thread, unless it is current or a
+    sync is already running. Returns the running thread, or None.
+    """
+    storage = get_storage()
+    with _SEARCH['lock']:
+        thread = _SEARCH['thread']
+        if thread is not None and thread.is_alive():
+            return thread
+        if _SEARCH['indexes'] is not None and _SEARCH['signature'] == (storage, storage.data_signature()):
+            return None
+        thread = _SEARCH['thread'] = threading.Thread(target=_search_sync, args=(storage,), daemon=True,
+                                                      name='penomoran-search-sync')
+        thread.start()
+    return thread
+
+
+@timed
+def search_letters(jenis, query, limit=200):
+    """
+    Letters of one jenis whose Perihal, Kepada, Keterangan or Nomor_Surat contain every word
+    of query as a word prefix, newest first. Returns (DataFrame of at most limit rows, total matches).
+    Only the first search of a storage waits for the index to be built. After a change by another
+    process the current index answers while warm_search_index() syncs the changed letters in the background.
+    """
+    storage = get_storage()
+    with _SEARCH['lock']:
+        ready = _SEARCH['indexes'] is not None and _SEARCH['storage'] is storage
+    if ready:
+        warm_search_index()
+    else:
+        _search_sync(storage)
+    with _SEARCH['lock']:
+        index = _SEARCH['indexes'].get(jenis)
+        records, total = index.search(query, limit) if index is not None else ([], 0)
+    return pd.DataFrame(records, columns=SEARCH_RESULT_COLUMNS), total
+
+
+def _search_begin():
+    """
+    Before a write (under storage_lock): if the index already missed a change from elsewhere,
+    mark it unsynced. Our own rows are still applied by _search_commit; the next search syncs the rest.
+    """
+    with _SEARCH['lock']:
+        storage = get_storage()
+        if _SEARCH['signature'] is not None and _SEARCH['signature'] != (storage, storage.data_signature()):
+            _SEARCH['signature'] = None
+
+
+def _search_commit(added=(), removed=()):
+    """After our own write: apply added rows / removed (jenis, tahun, no, nomor_surat) and re-stamp if in sync."""
+    with _SEARCH['lock']:
+        if _SEARCH['indexes'] is None:
+            return
+        for jenis, tahun, no, nomor_surat in removed:
+            if jenis in _SEARCH['indexes']:
+                _SEARCH['indexes'][jenis].remove(_search_key(tahun, no, nomor_surat))
+        if added:
+            df = pd.DataFrame(added, columns=LETTER_COLUMNS)
+            for jenis, part in df.groupby('Jenis', sort=False):
+                _SEARCH['indexes'].setdefault(jenis, InvertedIndex()).extend(_search_items(part))
+            _SEARCH['added'].extend((jenis, int(tahun), int(no), str(nomor_surat)) for jenis, tahun, no, nomor_surat
+                                    in zip(*(df[c].tolist() for c in _SEARCH_KEY_COLUMNS)))
+            if len(_SEARCH['added']) > SEARCH_ADDED_LIMIT:
+                _SEARCH['rows'] = None
+                _SEARCH['added'].clear()
+        if _SEARCH['signature'] is not None:
+            storage = get_storage()
+            _SEARCH['signature'] = (storage, storage.data_signature())
+
+
+# Statistik surat (penomoran.stats); perubahan disimpan ke STATS_FILE paling lambat STATS_SAVE_DELAY
+# detik kemudian (sekali untuk satu rentetan penulisan) dan saat proses berakhir
+STATS_SAVE_DELAY = 2.0
+_STATS = {'lock': threading.Lock(), 'key': None, 'stats': None, 'path': None, 'dirty': False, 'timer': None,
+          'thread': None}
+
+
+@timed
+def get_stats():
+    """
+    (stats, current): the letter statistics and whether they match the stored data. When they do
+    not (data changed outside this process), the last saved counters are returned with current
+    False while warm_stats() recounts them in the background; stats is None until a first count exists.
+    """
+    with _STATS['lock']:
+        key = storage_key(get_storage())
+        if _STATS['stats'] is not None and _STATS['key'] == key:
+            return _STATS['stats'], True
+        _stats_save()
+        stats, saved_key = read_stats()
+        if stats is not None and saved_key == key:
+            _STATS.update(stats=stats, key=key, path=os.path.abspath(STATS_FILE))
+            return stats, True
+    warm_stats()
+    return stats, False
+
+
+def warm_stats():
+    """Recount the statistics in a background thread unless that is already running. Returns the thread."""
+    with _STATS['lock']:
+        thread = _STATS['thread']
+        if thread is None or not thread.is_alive():
+            thread = _STATS['thread'] = threading.Thread(target=rebuild_letter_stats, daemon=True,
+                                                         name='penomoran-stats-rebuild')
+            thread.start()
+    return thread
+
+
+@timed
+def rebuild_letter_stats():
+    """Recount the statistics from storage (recovery), replacing the saved counters."""
+    with storage_lock(), _STATS['lock']:
+        storage = get_storage()
+        _stats_cancel_save()
+        _STATS['dirty'] = False
+        _STATS['stats'] = rebuild_stats(storage)
+        _STATS['key'] = storage_key(storage)
+        _STATS['path'] = os.path.abspath(STATS_FILE)
+        return _STATS['stats']
+
+
+def flush_stats():
+    """Save counter changes that are still waiting for STATS_SAVE_DELAY now."""
+    with _STATS['lock']:
+        _stats_save()
+
+
+def _stats_save():
+    # Dipanggil di bawah _STATS['lock']
+    _stats_cancel_save()
+    if _STATS['dirty']:
+        save_stats(_STATS['stats'], _STATS['key'], _STATS['path'])
+        _STATS['dirty'] = False
+
+
+def _stats_cancel_save():
+    if _STATS['timer'] is not None:
+        _STATS['timer'].cancel()
+        _STATS['timer'] = None
+
+
+def _stats_begin():
+    """Before a write (under storage_lock): make sure the counters in memory match the stored data."""
+    with _STATS['lock']:
+        key = storage_key(get_storage())
+        if _STATS['stats'] is None or _STATS['key'] != key:
+            # Tanpa rebuild di sini: penulisan tidak boleh menunggu hitung ulang seluruh riwayat
+            _stats_save()
+            _STATS['stats'] = load_stats(key)
+            _STATS['key'] = key if _STATS['stats'] is not None else None
+            _STATS['path'] = os.path.abspath(STATS_FILE)
+
+
+def _stats_commit(apply):
+    """After our own write: apply(stats) to the counters and schedule saving them with the new signature."""
+    with _STATS['lock']:
+        if _STATS['stats'] is None:
+            return
+        apply(_STATS['stats'])
+        _STATS['key'] = storage_key(get_storage())
+        _STATS['dirty'] = True
+        if _STATS['timer'] is None:
+            timer = _STATS['timer'] = threading.Timer(STATS_SAVE_DELAY, flush_stats)
+            timer.daemon = True
+            timer.start()
+
+
+atexit.register(flush_stats)
+
+
+_PROOF_RENDERER = {'lock': threading.Lock(), 'renderer': None}
+
+
+def proof_renderer():
+    """The process-wide ProofRenderer, created on first use."""
+    with _PROOF_RENDERER['lock']:
+        if _PROOF_RENDERER['renderer'] is None:
+            _PROOF_RENDERER['renderer'] = ProofRenderer()
+        return _PROOF_RENDERER['renderer']
+
+
+def _allocate_row(index, letter):
+    """Number one letter of issue_letters on index; returns the row dict or an error message."""
+    jenis_surat, tanggal, kode_klasifikasi = letter["Jenis"], letter["Tanggal"], letter["Kode_Klasifikasi"]
+    if not kode_klasifikasi:
+        return "Kode Klasifikasi wajib diisi!"
+    if jenis_surat not in JENIS_SURAT:
+        return "Jenis surat tidak valid"
+    series = index.series(jenis_surat, tanggal.year)
+
+    # If a forced number is provided (from previously skipped numbers), use it.
+    if letter.get("No") is not None:
+        try:
+            final_no_urut = int(letter["No"])
+        except (TypeError, ValueError):
+            return f"Nomor {letter['No']!r} tidak valid"
+        # Check duplicate
+        if final_no_urut <= 0 or series.is_used(final_no_urut):
+            return f"Nomor {format_nomor(final_no_urut)} sudah ada untuk jenis {jenis_surat} tahun {tanggal.year}."
+    elif letter.get("mode") == 'fill_gaps':
+        final_no_urut = series.smallest_free()
+    else:
+        final_no_urut = series.next_continuous()
+
+    row = {
+        "No": final_no_urut,
+        "Jenis": jenis_surat,
+        "Tanggal": tanggal,
+        "Bulan": tanggal.month,
+        "Tahun": tanggal.year,
+        "Kode_Klasifikasi": kode_klasifikasi,
+        "Kepada": letter.get("Kepada", ""),
+        "Perihal": letter.get("Perihal", ""),
+        "Keterangan": letter.get("Keterangan", ""),
+        "Nomor_Surat": format_nomor_surat(jenis_surat, kode_klasifikasi, final_no_urut, tanggal.year),
+    }
+    series.add_used(final_no_urut)
+    return row
+
+
+@timed
+def issue_letters(letters):
+    """
+    Allocate numbers for a batch of letters and store them in one locked transaction and one write.
+    Each letter is a dict with Jenis, Tanggal (date), Kode_Klasifikasi, Kepada, Perihal, Keterangan and
+    optionally 'mode' ('continuous' or 'fill_gaps') or 'No' (an explicit, e.g. previously skipped, number).
+    Letters are numbered in the given order. Returns one entry per letter: the stored row as a dict
+    (LETTER_COLUMNS) or an error message string; rejected letters do not affect the others.
+    """
+    results = []
+    with storage_lock():
+        release_expired_reservations()
+        index = get_allocator()
+        rows = []
+        try:
+            for letter in letters:
+                row = _allocate_row(index, letter)
+                if isinstance(row, dict):
+                    rows.append(row)
+                results.append(row)
+            if not rows:
+                return results
+            _search_begin()
+            _stats_begin()
+            if len(rows) == 1:
+                get_storage().insert_letter(rows[0])
+            else:
+                get_storage().insert_letters(pd.DataFrame(rows, columns=LETTER_COLUMNS))
+        except Exception:
+            # Indeks sudah terlanjur diubah untuk baris sebelumnya; paksa dibangun ulang dari data yang tersimpan
+            _allocator_invalidate()
+            raise
+        _allocator_synced(index)
+        _search_commit(added=rows)
+        _stats_commit(lambda stats: stats.count_letters(
+            (row["Jenis"], row["Tahun"], row["Bulan"], row["Kode_Klasifikasi"]) for row in rows))
+
+        # If a number was previously skipped, remove it from skipped list
+        for row in rows:
+            if row["No"] in index.series(row["Jenis"], row["Tahun"]).reserved:
+                remove_skipped_number(row["Jenis"], row["Tahun"], row["No"])
+    return results
+
+
+@timed
+def process_form(jenis_surat, kode_klasifikasi, tanggal, kepada, perihal, keterangan, df, mode='continuous', forced_no=None):
+    """
+    Allocate a number and append the letter in one locked transaction, then queue the proof PDF.
+    Allocation and insert happen under storage_lock so concurrent sessions never reuse a number or drop
+    each other's rows; df is kept in the signature for existing callers.
+    The third return value is a Future resolving to the PDF bytes, rendered in the background.
+    """
+    result, = issue_letters([{
+        "Jenis": jenis_surat, "Tanggal": tanggal, "Kode_Klasifikasi": kode_klasifikasi,
+        "Kepada": kepada, "Perihal": perihal, "Keterangan": keterangan, "mode": mode, "No": forced_no,
+    }])
+    if isinstance(result, str):
+        return None, result, None
+
+    pdf_future = proof_renderer().render(result["Nomor_Surat"], perihal, tanggal, kepada, keterangan, jenis_surat)
+
+    return result["Nomor_Surat"], None, pdf_future
+
+
+@timed
+def delete_letter(nomor_surat, jenis=None, tahun=None):
+    """
+    Delete the rows with the given Nomor_Surat (optionally only of one jenis and/or year)
+    and release their numbers in the allocator index.
+    """
+    with storage_lock():
+        index = get_allocator()
+        _search_begin()
+        _stats_begin()
+        removed = get_storage().delete_letter(nomor_surat, jenis, tahun)
+        keys = list(removed[['Jenis', 'Tahun', 'No']].itertuples(index=False))
+        for jenis, tahun, no in keys:
+            index.series(jenis, tahun).remove_used(no)
+            # Nomor yang sama bisa terbit lagi dengan isi lain; jangan sajikan PDF lama
+            proof_renderer().discard(jenis, tahun, nomor_surat)
+        _allocator_synced(index)
+        _search_commit(removed=[(jenis, tahun, no, nomor_surat) for jenis, tahun, no in keys])
+        _stats_commit(lambda stats: stats.count_letters(
+            removed[['Jenis', 'Tahun', 'Bulan', 'Kode_Klasifikasi']].itertuples(index=False), -1))
+    return len(removed)
+
+
+# Kolom yang wajib ada pada file impor (CSV/XLSX)
+IMPORT_COLUMNS = ["Jenis", "Tanggal", "Kode_Klasifikasi", "Kepada", "Perihal", "Keterangan"]
+
+# Format tanggal yang diterima saat impor, dicoba berurutan; sel tanggal XLSX terbaca dengan jam 00:00:00
+IMPORT_DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y']
+
+
+def read_import_file(uploaded):
+    """Read an uploaded .csv or .xlsx file into a DataFrame of strings."""
+    if uploaded.name.lower().endswith('.xlsx'):
+        return pd.read_excel(uploaded, dtype=str)
+    return pd.read_csv(uploaded, dtype=str, keep_default_na=False)
+
+
+def _validate_import(df_upload):
+    """
+    Split uploaded rows into (valid, rejected).
+    valid carries parsed Tanggal/Tahun and the original spreadsheet row number in 'Baris';
+    rejected lists Baris, the raw row and the reason ('Alasan').
+    """
+    df = df_upload.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    for col in IMPORT_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[IMPORT_COLUMNS].fillna("").astype(str).apply(lambda s: s.str.strip())
+    # Baris 1 adalah header pada file aslinya
+    df.insert(0, "Baris", range(2, len(df) + 2))
+
+    tanggal = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for fmt in IMPORT_DATE_FORMATS:
+        tanggal = tanggal.fillna(pd.to_datetime(df["Tanggal"], errors='coerce', format=fmt))
+    alasan = pd.Series("", index=df.index)
+    alasan[df["Kode_Klasifikasi"] == ""] = "Kode Klasifikasi wajib diisi"
+    alasan[tanggal.isna()] = "Tanggal tidak valid (gunakan YYYY-MM-DD atau DD/MM/YYYY)"
+    alasan[~df["Jenis"].isin(JENIS_SURAT)] = "Jenis surat tidak valid"
+
+    ok = alasan == ""
+    rejected = df.loc[~ok].assign(Alasan=alasan[~ok])
+    valid = df.loc[ok].copy()
+    valid["Tanggal"] = tanggal[ok].dt.date
+    valid["Tahun"] = tanggal[ok].dt.year.astype(int)
+    return valid, rejected
+
+
+@timed
+def import_letters(df_upload, mode='continuous'):
+    """
+    Register every valid row of an uploaded spreadsheet as a letter.
+    Rows are numbered in date order in one pass per (Jenis, Tahun) using the allocator index
+    (mode as in get_next_number; reserved numbers are never handed out) and stored in a single write.
+    Returns (imported, rejected) DataFrames; imported is empty when nothing was written.
+    """
+    valid, rejected = _validate_import(df_upload)
+    if valid.empty:
+        return pd.DataFrame(columns=["Baris"] + LETTER_COLUMNS), rejected
+
+    valid = valid.sort_values(["Tanggal", "Baris"], kind='stable')
+    letters = valid.drop(columns=["Baris", "Tahun"]).assign(mode=mode).to_dict('records')
+    new_rows = pd.DataFrame(issue_letters(letters), columns=LETTER_COLUMNS)
+    new_rows.insert(0, "Baris", valid["Baris"].values)
+    return new_rows, rejected
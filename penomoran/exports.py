@@ -0,0 +1,432 @@
+"""
+Export renderers: proof PDF per letter, recap PDF per period and streamed Excel workbooks.
+None of these depend on Streamlit, so they can be benchmarked and reused headless.
+fpdf and xlsxwriter are imported on first use, so importing this module (and penomoran.core)
+does not pay for them until someone actually exports or saves.
+"""
+import functools
+import io
+import multiprocessing as mp
+import os
+import re
+import sys
+import threading
+import types
+import zipfile
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+from penomoran.metrics import timed
+from penomoran.storage import LETTER_COLUMNS
+
+
+def _draw_letterhead(pdf):
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, "KLINIK UTAMA RAWAT INAP PARUNG", ln=True, align='C')
+    pdf.set_font("Arial", size=10)
+    pdf.cell(0, 5, "Umum dan Kepegawaian", ln=True, align='C')
+    pdf.cell(0, 5, "Dokumen ini digenerate secara otomatis", ln=True, align='C')
+    pdf.line(10, 30, 200, 30)
+    pdf.ln(20)
+
+
+@functools.lru_cache(maxsize=None)
+def _letterhead_stream():
+    """Page operators and final y of the static letterhead, rendered once per process."""
+    from fpdf import FPDF
+    scratch = FPDF()
+    scratch.add_page()
+    start = len(scratch.pages[scratch.page])
+    _draw_letterhead(scratch)
+    return scratch.pages[scratch.page][start:], scratch.y
+
+
+def _add_letterhead_page(pdf):
+    """Start a page and paste the pre-rendered letterhead instead of drawing it again."""
+    stream, y = _letterhead_stream()
+    pdf.add_page()
+    # Daftarkan font dengan urutan yang sama seperti saat pra-render agar referensi /F1, /F2 cocok;
+    # state font berakhir di Arial 10, sama seperti akhir kop surat
+    pdf.set_font("Arial", 'B', 14)
+    pdf.set_font("Arial", size=10)
+    pdf.pages[pdf.page] += stream
+    pdf.set_y(y)
+
+
+@timed
+def generate_single_pdf(nomor, perihal, tanggal, kepada, keterangan, jenis):
+    from fpdf import FPDF
+    pdf = FPDF()
+    _add_letterhead_page(pdf)
+
+    if "Keputusan" in jenis or "Perjanjian" in jenis:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 5, jenis.upper(), ln=True, align='C')
+        pdf.cell(0, 5, f"NOMOR: {nomor}", ln=True, align='C')
+        pdf.ln(10)
+
+    pdf.set_font("Arial", size=12)
+
+    # Format tanggal dd-mm-yy
+    tgl_str = tanggal.strftime('%d-%m-%y')
+    pdf.cell(0, 10, f"Tanggal: {tgl_str}", ln=True, align='R')
+
+    if "Keputusan" not in jenis and "Perjanjian" not in jenis:
+        pdf.cell(30, 8, "Nomor", 0, 0)
+        pdf.cell(5, 8, ":", 0, 0)
+        pdf.cell(0, 8, nomor, 0, 1)
+
+        pdf.cell(30, 8, "Perihal", 0, 0)
+        pdf.cell(5, 8, ":", 0, 0)
+        pdf.cell(0, 8, perihal, 0, 1)
+        pdf.ln(5)
+
+    if kepada and kepada != "-":
+        pdf.cell(0, 8, "Kepada Yth,", ln=True)
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 8, kepada, ln=True)
+        pdf.set_font("Arial", size=12)
+        pdf.ln(5)
+
+    pdf.ln(5)
+    pdf.multi_cell(0, 8, keterangan)
+
+    pdf.ln(20)
+    pdf.cell(120)
+    pdf.cell(0, 8, "( __________________ )", ln=True)
+
+    return pdf.output(dest='S').encode('latin-1', 'replace')
+
+
+class ProofRenderer:
+    """
+    Background renderer for proof PDFs.
+    render() queues generate_single_pdf on a small thread pool and returns a Future; futures are
+    kept per (jenis, tahun, Nomor_Surat) in an LRU of max_entries, so asking again for the same letter
+    reuses the pending or finished result instead of rendering twice.
+    """
+
+    def __init__(self, workers=2, max_entries=256):
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='proof-pdf')
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, nomor, perihal, tanggal, kepada, keterangan, jenis):
+        key = (jenis, tanggal.year, nomor)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._executor.submit(generate_single_pdf, nomor, perihal, tanggal, kepada, keterangan, jenis)
+                self._futures[key] = future
+                while len(self._futures) > self.max_entries:
+                    self._futures.popitem(last=False)
+            else:
+                self._futures.move_to_end(key)
+        return future
+
+    def discard(self, jenis, tahun, nomor):
+        """Forget a cached proof, e.g. after its letter was deleted."""
+        with self._lock:
+            self._futures.pop((jenis, int(tahun), nomor), None)
+
+
+def format_tanggal_series(series):
+    """Vectorized dd-mm-yy formatting; values that are not dates are kept as text."""
+    parsed = pd.to_datetime(series, errors='coerce')
+    fallback = series.where(series.notna(), '').astype(str)
+    return parsed.dt.strftime('%d-%m-%y').where(parsed.notna(), fallback)
+
+
+@timed
+def write_excel_stream(sheets, output):
+    """
+    Write letters to an xlsx workbook with xlsxwriter's constant_memory mode.
+    sheets: iterable of (sheet_name, iterable of DataFrame chunks)
+    output: file path or binary file object
+    Every chunk is written row by row as it arrives, its dates are formatted in one vectorized
+    step and column widths are tracked as running maxima, so memory is bounded by the chunk
+    size rather than by the number of rows.
+    """
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    for sheet_name, chunks in sheets:
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        columns = None
+        widths = None
+        row = 1
+        for chunk in chunks:
+            if columns is None:
+                columns = list(chunk.columns)
+                widths = [len(c) for c in columns]
+                worksheet.write_row(0, 0, columns)
+            if chunk.empty:
+                continue
+            chunk = chunk.copy()
+            if 'Tanggal' in chunk.columns:
+                chunk['Tanggal'] = format_tanggal_series(chunk['Tanggal'])
+            text_len = chunk.fillna('').astype(str).apply(lambda col: col.str.len().max())
+            widths = [max(w, int(n)) for w, n in zip(widths, text_len)]
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for record in values.itertuples(index=False, name=None):
+                worksheet.write_row(row, 0, record)
+                row += 1
+        if columns is None:
+            columns = LETTER_COLUMNS
+            widths = [len(c) for c in columns]
+            worksheet.write_row(0, 0, columns)
+        for i, width in enumerate(widths):
+            worksheet.set_column(i, i, width + 2)
+    workbook.close()
+
+
+@timed
+def generate_excel(df):
+    """Single-sheet Excel export of df as bytes."""
+    output = io.BytesIO()
+    write_excel_stream([('Data Surat', [df])], output)
+    return output.getvalue()
+
+
+# Kolom tabel rekap: (judul, lebar, perataan)
+RECAP_COLUMNS = [("No", 15, 'C'), ("Tanggal", 30, 'C'), ("Nomor Surat", 60, 'L'), ("Tujuan", 40, 'L'), ("Perihal", 130, 'L')]
+RECAP_ROW_HEIGHT = 8
+
+
+def _truncate(series, limit, suffix):
+    text = series.fillna('').astype(str)
+    return text.where(text.str.len() <= limit, text.str.slice(0, limit) + suffix)
+
+
+def recap_display_columns(df):
+    """Precompute every recap cell as text in vectorized form; returns a list of row tuples."""
+    no = pd.to_numeric(df['No'], errors='coerce')
+    no_display = no.astype('Int64').astype(str).str.zfill(3).where(no.notna(), df['No'].astype(str))
+    return list(zip(no_display,
+                    format_tanggal_series(df['Tanggal']),
+                    df['Nomor_Surat'].fillna('').astype(str),
+                    _truncate(df['Kepada'], 20, '..'),
+                    _truncate(df['Perihal'], 75, '...')))
+
+
+class _TextBuffer:
+    """
+    Append-only replacement for FPDF.buffer. fpdf 1.7 assembles the document with
+    `self.buffer += s`, which copies the whole document on every call and makes output()
+    quadratic in the number of pages; this keeps the parts in a list instead.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._len = 0
+
+    def __iadd__(self, s):
+        self._parts.append(s)
+        self._len += len(s)
+        return self
+
+    def __len__(self):
+        return self._len
+
+    def __str__(self):
+        return ''.join(self._parts)
+
+    def encode(self, *args):
+        return str(self).encode(*args)
+
+
+@functools.lru_cache(maxsize=None)
+def _recap_pdf_class():
+    """The FPDF subclass for recaps, defined on first use so fpdf is only imported when needed."""
+    from fpdf import FPDF
+
+    class _RecapPDF(FPDF):
+        """Landscape recap whose table header is repeated on every page and whose footer shows page totals."""
+
+        def __init__(self, total_rows):
+            super().__init__(orientation='L', format='A4')
+            self.buffer = _TextBuffer()
+            self.total_rows = total_rows
+            self.in_table = False
+            self.page_rows = 0
+            self.alias_nb_pages()
+            self.set_auto_page_break(True, margin=15)
+
+        def header(self):
+            self.page_rows = 0
+            if self.in_table:
+                self.table_header()
+
+        def footer(self):
+            self.set_y(-12)
+            self.set_font("Arial", 'I', 8)
+            self.cell(0, 5, f"Halaman {self.page_no()}/{{nb}}  -  {self.page_rows} dokumen di halaman ini dari total {self.total_rows}", 0, 0, 'C')
+
+        def letterhead(self, jenis_surat, start_str, end_str):
+            self.set_font("Arial", 'B', 16)
+            self.cell(0, 10, f"LAPORAN REKAPITULASI {jenis_surat.upper()}", ln=True, align='C')
+            self.set_font("Arial", 'B', 12)
+            self.cell(0, 8, "KLINIK UTAMA RAWAT INAP PARUNG", ln=True, align='C')
+            self.set_font("Arial", size=10)
+            self.cell(0, 6, "Umum dan Kepegawaian", ln=True, align='C')
+            self.cell(0, 10, f"Periode: {start_str} s.d {end_str}", ln=True, align='C')
+            self.ln(10)
+
+        def table_header(self):
+            self.set_font("Arial", 'B', 10)
+            self.set_fill_color(200, 220, 255)
+            for title, width, _ in RECAP_COLUMNS[:-1]:
+                self.cell(width, 10, title, 1, 0, 'C', 1)
+            title, width, _ = RECAP_COLUMNS[-1]
+            self.cell(width, 10, title, 1, 1, 'C', 1)
+            self.set_font("Arial", size=9)
+
+    return _RecapPDF
+
+
+@timed
+def generate_recap_pdf(df, start_date, end_date, jenis_surat):
+    """
+    Recap table of df for one period. All display columns are precomputed before rendering,
+    rows are plain tuples, and the table header repeats after every automatic page break.
+    """
+    # Format periode tanggal dd-mm-yy
+    if isinstance(start_date, date):
+        start_str = start_date.strftime('%d-%m-%y')
+    else:
+        start_str = str(start_date)
+    if isinstance(end_date, date):
+        end_str = end_date.strftime('%d-%m-%y')
+    else:
+        end_str = str(end_date)
+
+    rows = recap_display_columns(df) if len(df) else []
+
+    pdf = _recap_pdf_class()(len(rows))
+    pdf.add_page()
+    pdf.letterhead(jenis_surat, start_str, end_str)
+    pdf.table_header()
+    pdf.in_table = True
+
+    widths = [(width, align) for _, width, align in RECAP_COLUMNS]
+    last = len(widths) - 1
+    h = RECAP_ROW_HEIGHT
+    for row in rows:
+        if pdf.get_y() + h > pdf.page_break_trigger:
+            pdf.add_page()
+        for i, text in enumerate(row):
+            width, align = widths[i]
+            pdf.cell(width, h, text, 1, 1 if i == last else 0, align)
+        pdf.page_rows += 1
+
+    pdf.in_table = False
+    pdf.set_font("Arial", 'B', 9)
+    pdf.cell(0, h, f"Total: {len(rows)} dokumen", 0, 1, 'R')
+
+    return pdf.output(dest='S').encode('latin-1', 'replace')
+
+
+# Jumlah proses untuk render PDF massal; 0/kosong berarti sebanyak jumlah CPU
+PDF_WORKERS = int(os.environ.get('PENOMORAN_PDF_WORKERS') or 0) or os.cpu_count() or 1
+
+
+def _text(value):
+    return "" if pd.isna(value) else str(value)
+
+
+def _proof_entry(row):
+    """Worker: render one proof PDF; returns (archive name, bytes)."""
+    tahun, no, nomor, perihal, tanggal, kepada, keterangan, jenis = row
+    # Nomor_Surat memuat '/', dan Masuk/Keluar berbagi format: awali dengan tahun & nomor urut
+    name = f"{tahun}_{int(no):03d}_{re.sub(r'[^A-Za-z0-9._-]+', '_', nomor)}.pdf"
+    return name, generate_single_pdf(nomor, perihal, tanggal, kepada, keterangan, jenis)
+
+
+def proof_rows(chunks):
+    """Turn letter DataFrame chunks into the argument tuples consumed by write_proofs_zip."""
+    for chunk in chunks:
+        for r in chunk.itertuples(index=False):
+            yield (int(r.Tahun), int(r.No), _text(r.Nomor_Surat), _text(r.Perihal), r.Tanggal,
+                   _text(r.Kepada), _text(r.Keterangan), r.Jenis)
+
+
+# Tugas render yang boleh menunggu di antrean pool per worker; baris berikutnya baru dibaca setelah ada hasil
+PROOF_WINDOW_PER_WORKER = 4
+
+
+def _pool_context():
+    # Server Streamlit bermulti-thread: worker hasil 'fork' bisa mewarisi lock yang sedang dipegang
+    # thread lain (mis. lock metrik) dan macet. 'forkserver' memulai worker dari proses bersih yang
+    # hanya memuat modul ini; _proof_entry diimpor dari sini, bukan dari skrip UI.
+    if 'forkserver' in mp.get_all_start_methods():
+        context = mp.get_context('forkserver')
+        context.set_forkserver_preload(['penomoran.exports'])
+        return context
+    return mp.get_context('spawn')
+
+
+_MAIN_LOCK = threading.Lock()
+
+
+@contextmanager
+def _without_main():
+    """
+    Hide the __main__ script from multiprocessing while workers start. forkserver and spawn
+    children re-import the main path as __mp_main__; under Streamlit that is app_surat.py, so
+    every worker would run the whole app in bare mode.
+    """
+    with _MAIN_LOCK:
+        main = sys.modules['__main__']
+        sys.modules['__main__'] = types.ModuleType('__main__')
+        try:
+            yield
+        finally:
+            sys.modules['__main__'] = main
+
+
+def _windowed(pool, rows, window):
+    """Like pool.imap(_proof_entry, rows) in order, but with at most window rows handed to the pool."""
+    pending = deque()
+    for row in rows:
+        pending.append(pool.apply_async(_proof_entry, (row,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+@timed
+def write_proofs_zip(rows, output, workers=None, progress=None):
+    """
+    Render generate_single_pdf for every row of proof_rows() and stream the PDFs into a ZIP at output.
+    Rendering runs in a process pool of workers processes (default PDF_WORKERS); each PDF is
+    written to the archive as soon as it arrives, and rows are read only as results come back,
+    so only the in-flight documents are in memory. progress(done) is called after each entry.
+    Returns the number of PDFs written. Workers start from a forkserver (or spawn) without
+    importing the calling script.
+    """
+    workers = workers or PDF_WORKERS
+    done = 0
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        if workers <= 1:
+            entries = map(_proof_entry, rows)
+            pool = None
+        else:
+            with _without_main():
+                pool = _pool_context().Pool(workers)
+            entries = _windowed(pool, rows, workers * PROOF_WINDOW_PER_WORKER)
+        try:
+            for name, pdf_bytes in entries:
+                archive.writestr(name, pdf_bytes)
+                done += 1
+                if progress is not None:
+                    progress(done)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+    return done
@@ -0,0 +1,146 @@
+"""
+In-process timing spans and I/O counters, exported as Prometheus text.
+
+    with span('ui.report'):        # time a block
+        ...
+
+    @timed                          # time every call, named <module>.<function>
+    def generate_excel(df): ...
+
+    count('storage_reads_total', file='data_surat.csv')
+
+Every span keeps a count, a running sum and the last WINDOW durations, from which snapshot()
+and prometheus_text() derive p50/p95/max. Everything is process-wide and thread-safe and costs
+a perf_counter call and a deque append per span. The Streamlit app writes prometheus_text() to
+$PENOMORAN_METRICS_FILE after each rerun (for a node_exporter textfile collector) and the local
+HTTP service serves it on GET /metrics.
+"""
+import functools
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Jumlah durasi terakhir per operasi yang dipakai untuk menghitung persentil
+WINDOW = 2048
+
+METRICS_FILE_ENV = 'PENOMORAN_METRICS_FILE'
+
+_lock = threading.Lock()
+_spans = {}
+_counters = {}
+
+
+class _SpanStats:
+    __slots__ = ('count', 'total', 'recent')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+
+def observe(name, seconds):
+    """Record one duration for the operation name."""
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = _SpanStats()
+        stats.count += 1
+        stats.total += seconds
+        stats.recent.append(seconds)
+
+
+@contextmanager
+def span(name):
+    """Time the with-block as one observation of name (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def timed(fn):
+    """Decorator: time every call of fn as '<last module part>.<function name>'."""
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            observe(name, time.perf_counter() - start)
+    return wrapper
+
+
+def count(name, n=1, **labels):
+    """Add n to the counter name with the given labels."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+def _quantile(ordered, q):
+    # Nearest-rank: nilai terkecil yang mencakup sedikitnya q dari seluruh observasi
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)] if ordered else 0.0
+
+
+def snapshot():
+    """
+    ({operation: {'count', 'sum', 'p50', 'p95', 'max'}}, {(counter, labels): value}); durations
+    in seconds, percentiles over the last WINDOW observations.
+    """
+    with _lock:
+        spans = {name: (stats.count, stats.total, sorted(stats.recent)) for name, stats in _spans.items()}
+        counters = dict(_counters)
+    result = {name: {'count': n, 'sum': total, 'p50': _quantile(recent, 0.5), 'p95': _quantile(recent, 0.95),
+                     'max': recent[-1] if recent else 0.0}
+              for name, (n, total, recent) in sorted(spans.items())}
+    return result, counters
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(prefix='penomoran'):
+    """All spans (as one summary with quantiles 0.5 and 0.95) and counters in Prometheus text format."""
+    spans, counters = snapshot()
+    metric = f'{prefix}_operation_duration_seconds'
+    lines = [f'# HELP {metric} Duration of instrumented operations (quantiles over the last {WINDOW} calls).',
+             f'# TYPE {metric} summary']
+    for name, stats in spans.items():
+        op = _label(name)
+        lines += [f'{metric}{{op="{op}",quantile="0.5"}} {stats["p50"]:.6f}',
+                  f'{metric}{{op="{op}",quantile="0.95"}} {stats["p95"]:.6f}',
+                  f'{metric}_sum{{op="{op}"}} {stats["sum"]:.6f}',
+                  f'{metric}_count{{op="{op}"}} {stats["count"]}']
+    for counter in sorted({name for name, _ in counters}):
+        lines += [f'# TYPE {prefix}_{counter} counter']
+        for (name, labels), value in sorted(counters.items()):
+            if name == counter:
+                label_text = ','.join(f'{k}="{_label(v)}"' for k, v in labels)
+                lines.append(f'{prefix}_{name}{{{label_text}}} {value}' if label_text else f'{prefix}_{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics_file(path=None):
+    """Write prometheus_text() to path (default $PENOMORAN_METRICS_FILE) atomically; no-op without a path."""
+    path = path or os.environ.get(METRICS_FILE_ENV)
+    if not path:
+        return
+    # Sesi Streamlit berjalan di thread berbeda; tiap thread memakai file sementara sendiri
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        fh.write(prometheus_text())
+    os.replace(tmp_path, path)
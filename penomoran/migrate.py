@@ -0,0 +1,66 @@
+"""
+One-shot migration of data_surat.csv / skipped_numbers.csv into the SQLite or Parquet engine.
+
+    python -m penomoran.migrate [--csv data_surat.csv] [--skip skipped_numbers.csv] [--db data_surat.db]
+    python -m penomoran.migrate --engine parquet [--dir data_surat_parquet]
+
+The target database must be empty. Rows that would break the unique indexes
+(duplicate Jenis/Tahun/No, or Nomor_Surat within one jenis and year) are listed and nothing is written.
+Afterwards start the app with PENOMORAN_STORAGE=sqlite (or parquet).
+"""
+import argparse
+import sys
+
+from penomoran.storage import DB_FILE, PARQUET_DIR, SKIP_FILE, SQLITE_FILE, CsvStorage, ParquetStorage, SqliteStorage
+
+
+def find_conflicts(df):
+    """Rows that violate the SQLite unique indexes, as a DataFrame."""
+    dup = df.duplicated(['Jenis', 'Tahun', 'No'], keep=False) | df.duplicated(['Nomor_Surat', 'Jenis', 'Tahun'], keep=False)
+    return df.loc[dup].sort_values(['Jenis', 'Tahun', 'No'])
+
+
+def migrate(csv_file=DB_FILE, skip_file=SKIP_FILE, db_file=SQLITE_FILE, target=None):
+    """
+    Copy letters and skipped numbers into target (default: SqliteStorage(db_file));
+    returns (letters, skipped) row counts.
+    """
+    source = CsvStorage(csv_file, skip_file)
+    target = target or SqliteStorage(db_file)
+
+    with source.lock(), target.lock():
+        df = source.load_data()
+        df_skipped = source.load_skipped()
+
+        conflicts = find_conflicts(df)
+        if not conflicts.empty:
+            raise ValueError("Duplicate numbers in source data:\n" + conflicts[['Jenis', 'Tahun', 'No', 'Nomor_Surat']].to_string(index=False))
+        if not target.numbering_rows().empty or not target.load_skipped().empty:
+            raise ValueError("The target storage already contains data; refusing to overwrite it")
+
+        target.save_data(df)
+        target.save_skipped(df_skipped.drop_duplicates(['Jenis', 'Tahun', 'No']))
+    return len(df), len(df_skipped)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DB_FILE)
+    parser.add_argument('--skip', default=SKIP_FILE)
+    parser.add_argument('--db', default=SQLITE_FILE)
+    parser.add_argument('--engine', choices=['sqlite', 'parquet'], default='sqlite')
+    parser.add_argument('--dir', default=PARQUET_DIR, help="target directory for --engine parquet")
+    args = parser.parse_args(argv)
+    target_name = args.dir if args.engine == 'parquet' else args.db
+    try:
+        target = ParquetStorage(args.dir) if args.engine == 'parquet' else SqliteStorage(args.db)
+        letters, skipped = migrate(args.csv, args.skip, target=target)
+    except (ValueError, RuntimeError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    print(f"Migrated {letters} letters and {skipped} skipped numbers into {target_name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
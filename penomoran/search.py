@@ -0,0 +1,201 @@
+"""
+In-memory inverted index for the report search box.
+
+Terms come from Perihal, Kepada, Keterangan and Nomor_Surat (lowercased words and numbers).
+The vocabulary is kept sorted, so a query word matches every term it is a prefix of with a
+bisect; the words of a query are ANDed. Letters are added and removed one at a time, so
+the index follows inserts and deletes without being rebuilt, and record() lets a caller
+find the letters that changed elsewhere. A whole archive is loaded with extend_frame(), which
+tokenizes each distinct column value once and builds the postings with NumPy.
+"""
+import bisect
+import itertools
+import re
+
+import numpy as np
+import pandas as pd
+
+SEARCH_COLUMNS = ['Perihal', 'Kepada', 'Keterangan', 'Nomor_Surat']
+
+_WORD = re.compile(r'\w+')
+
+# Di atas jumlah istilah baru ini, kosakata diurutkan ulang sekali daripada insort satu per satu
+_RESORT_THRESHOLD = 64
+
+
+def tokenize(text):
+    """Lowercased words and numbers of text; empty for missing values."""
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return []
+    return _WORD.findall(str(text).lower())
+
+
+def search_text(df):
+    """The searchable text of every row of df (SEARCH_COLUMNS joined), as a list of str."""
+    parts = [df[col].fillna('').astype(str) for col in SEARCH_COLUMNS]
+    return parts[0].str.cat(parts[1:], sep=' ').tolist()
+
+
+def term_pairs(df):
+    """
+    Distinct (row, term) pairs of the SEARCH_COLUMNS words of df: (rows, term ids, terms), sorted
+    by term id and then row. Each column is factorized and only its distinct values are tokenized.
+    """
+    words, columns = [], []
+    for col in SEARCH_COLUMNS:
+        codes, values = pd.factorize(df[col])
+        tokens = [_WORD.findall(str(v).lower()) for v in values]
+        # Sel kosong (kode -1) menunjuk ke entri terakhir yang tanpa kata
+        lengths = np.array([len(t) for t in tokens] + [0], dtype=np.int64)
+        columns.append((codes, lengths, len(words)))
+        words.extend(itertools.chain.from_iterable(tokens))
+    word_ids, terms = pd.factorize(np.array(words, dtype=object))
+    rows, term_ids = [], []
+    for codes, lengths, base in columns:
+        per_row = lengths[codes]
+        first = np.repeat(base + np.cumsum(lengths)[codes] - per_row, per_row)
+        offset = np.arange(per_row.sum()) - np.repeat(np.cumsum(per_row) - per_row, per_row)
+        rows.append(np.repeat(np.arange(len(df)), per_row))
+        term_ids.append(word_ids[first + offset])
+    n = max(len(df), 1)
+    pairs = np.sort(np.concatenate(term_ids).astype(np.int64) * n + np.concatenate(rows))
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+    return pairs % n, pairs // n, np.asarray(terms, dtype=object)
+
+
+def _field_terms(fields):
+    return set(itertools.chain.from_iterable(map(tokenize, fields)))
+
+
+class InvertedIndex:
+    """
+    Letters of one jenis. Each letter has a caller-chosen key (used to remove it) and a record
+    tuple returned by search(). Internally letters get increasing integer ids, so postings are
+    sets of ints and "newest first" means most recently added.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._terms = []
+        self._ids = {}
+        self._docs = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def keys(self):
+        return list(self._ids)
+
+    def record(self, key):
+        """The record stored for key, or None."""
+        doc_id = self._ids.get(key)
+        return None if doc_id is None else self._docs[doc_id][0]
+
+    def add(self, key, record, text):
+        self.extend([(key, record, text)])
+
+    def extend(self, items):
+        """Add (key, record, text) items; an existing key is replaced."""
+        new_terms = []
+        for key, record, text in items:
+            if key in self._ids:
+                self.remove(key)
+            doc_id = self._next_id
+            self._next_id += 1
+            self._ids[key] = doc_id
+            self._docs[doc_id] = (record, (text,))
+            for term in _field_terms((text,)):
+                posting = self._postings.get(term)
+                if posting is None:
+                    self._postings[term] = {doc_id}
+                    new_terms.append(term)
+                else:
+                    posting.add(doc_id)
+        self._add_terms(new_terms)
+
+    def extend_frame(self, keys, records, df):
+        """
+        Add many letters at once: keys and records as for extend(), df holding their SEARCH_COLUMNS
+        (one row per letter, same order). Equivalent to extend() with search_text(df), but the words
+        are found per distinct column value and the postings are built in bulk.
+        """
+        if len(set(keys)) < len(keys):
+            # Seperti extend(): kunci yang sama dalam satu batch, yang terakhir menang
+            last = {key: i for i, key in enumerate(keys)}
+            keep = sorted(last.values())
+            keys, records, df = [keys[i] for i in keep], [records[i] for i in keep], df.iloc[keep]
+        for key in keys:
+            if key in self._ids:
+                self.remove(key)
+        first_id = self._next_id
+        self._next_id += len(keys)
+        fields = zip(*(df[col].tolist() for col in SEARCH_COLUMNS))
+        self._ids.update(zip(keys, itertools.count(first_id)))
+        self._docs.update(zip(itertools.count(first_id), zip(records, fields)))
+        rows, term_ids, terms = term_pairs(df)
+        ids = (rows + first_id).tolist()
+        bounds = np.flatnonzero(np.r_[True, term_ids[1:] != term_ids[:-1]]) if len(term_ids) else np.array([], np.int64)
+        new_terms = []
+        for start, end, term in zip(bounds.tolist(), bounds[1:].tolist() + [len(ids)], terms[term_ids[bounds]]):
+            posting = self._postings.get(term)
+            if posting is None:
+                self._postings[term] = set(ids[start:end])
+                new_terms.append(term)
+            else:
+                posting.update(ids[start:end])
+        self._add_terms(new_terms)
+
+    def _add_terms(self, new_terms):
+        if len(new_terms) > _RESORT_THRESHOLD:
+            self._terms = sorted(self._postings)
+            return
+        for term in new_terms:
+            # Istilah bisa sudah hilang lagi jika kuncinya diganti dalam batch yang sama
+            i = bisect.bisect_left(self._terms, term)
+            if term in self._postings and (i == len(self._terms) or self._terms[i] != term):
+                self._terms.insert(i, term)
+
+    def remove(self, key):
+        doc_id = self._ids.pop(key, None)
+        if doc_id is None:
+            return
+        _, fields = self._docs.pop(doc_id)
+        for term in _field_terms(fields):
+            posting = self._postings[term]
+            posting.discard(doc_id)
+            if not posting:
+                del self._postings[term]
+                i = bisect.bisect_left(self._terms, term)
+                if i < len(self._terms) and self._terms[i] == term:
+                    del self._terms[i]
+
+    def _prefix_ids(self, prefix):
+        i = bisect.bisect_left(self._terms, prefix)
+        j = bisect.bisect_left(self._terms, prefix + '\uffff')
+        if j - i == 1:
+            return self._postings[self._terms[i]]
+        ids = set()
+        for term in self._terms[i:j]:
+            ids |= self._postings[term]
+        return ids
+
+    def search(self, query, limit=None):
+        """
+        Records of the letters matching every word of query (as a prefix), most recently added
+        first, at most limit of them, together with the total number of matches: (records, total).
+        """
+        words = tokenize(query)
+        if not words:
+            return [], 0
+        matches = None
+        # Kata terpanjang biasanya paling selektif; mulai dari sana
+        for word in sorted(set(words), key=len, reverse=True):
+            ids = self._prefix_ids(word)
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return [], 0
+        # Set int hampir terurut; sorted() jauh lebih cepat daripada heapq.nlargest di sini
+        ordered = sorted(matches)
+        ordered = ordered[::-1] if limit is None else ordered[:-limit - 1:-1]
+        return [self._docs[doc_id][0] for doc_id in ordered], len(matches)
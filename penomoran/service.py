@@ -0,0 +1,303 @@
+"""
+Headless numbering service for other systems: a local HTTP API and a CLI on top of penomoran.core.
+
+    python -m penomoran.service serve [--host 127.0.0.1] [--port 8765]
+    python -m penomoran.service allocate --jenis "Surat Keluar" --kode 800 [--tanggal 2024-05-01] [--mode fill_gaps]
+    python -m penomoran.service reserve --jenis "Surat Keluar" --tahun 2024 [--no 12 [--sampai 20] | --jumlah 5] [--berlaku-hari 30]
+    python -m penomoran.service release --jenis "Surat Keluar" --tahun 2024 --no 12
+    python -m penomoran.service lookup --nomor-surat 800/012-KURIP
+    python -m penomoran.service lookup --jenis "Surat Keluar" --tahun 2024
+
+HTTP endpoints (JSON in, JSON out):
+    POST /allocate  {"jenis", "kode", "tanggal", "kepada", "perihal", "keterangan", "mode", "no"}
+                    or a list of such objects, numbered in list order
+    POST /reserve   {"jenis", "tahun", "no"?, "sampai"?, "jumlah"?, "berlaku_hari"?}
+                    no..sampai, or the next jumlah numbers; expires after berlaku_hari days
+    POST /release   {"jenis", "tahun", "no"}
+    GET  /lookup?nomor_surat=...   or   GET /lookup?jenis=...&tahun=...
+    GET  /metrics                  timings and I/O counters in Prometheus text format
+
+All requests go through one queue. A single worker drains it in batches and runs each batch under
+one storage lock; consecutive allocations share one allocator pass and one storage write.
+The storage engine is chosen with PENOMORAN_STORAGE as in the Streamlit app, and both can run
+against the same data at the same time.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qsl, urlsplit
+
+from penomoran import core
+from penomoran.metrics import prometheus_text, span
+from penomoran.storage import get_storage
+
+# Jumlah permintaan maksimum yang digabung dalam satu batch
+MAX_BATCH = 256
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 422: 'Unprocessable Entity'}
+
+
+def _letter(item):
+    """Map an /allocate JSON object onto the dict accepted by core.issue_letters."""
+    return {
+        "Jenis": item.get("jenis"),
+        "Tanggal": date.fromisoformat(str(item.get("tanggal") or date.today().isoformat())),
+        "Kode_Klasifikasi": str(item.get("kode") or "").strip(),
+        "Kepada": item.get("kepada", "-"),
+        "Perihal": item.get("perihal", ""),
+        "Keterangan": item.get("keterangan", ""),
+        "mode": item.get("mode", "continuous"),
+        "No": None if item.get("no") is None else int(item["no"]),
+    }
+
+
+def _allocated(result):
+    if isinstance(result, str):
+        return {"error": result}
+    return {"nomor_surat": result["Nomor_Surat"], "no": result["No"], "jenis": result["Jenis"],
+            "tahun": result["Tahun"], "tanggal": result["Tanggal"].isoformat()}
+
+
+def _allocate_many(items):
+    """Allocate a list of /allocate objects in one core.issue_letters call; malformed items get an error."""
+    letters, results = [], [None] * len(items)
+    for i, item in enumerate(items):
+        try:
+            letters.append((i, _letter(item)))
+        except (AttributeError, TypeError, ValueError) as exc:
+            results[i] = {"error": f"Permintaan tidak valid: {exc}"}
+    issued = core.issue_letters([letter for _, letter in letters])
+    for (i, _), result in zip(letters, issued):
+        results[i] = _allocated(result)
+    return results
+
+
+def reserve(payload):
+    jenis, tahun = payload["jenis"], int(payload["tahun"])
+    if jenis not in core.JENIS_SURAT:
+        return {"error": "Jenis surat tidak valid"}
+    ttl_days = payload.get("berlaku_hari")
+    if payload.get("no") is not None:
+        no = int(payload["no"])
+        last = int(payload.get("sampai") or no)
+        if last == no and core.get_allocator().series(jenis, tahun).is_used(no):
+            return {"error": f"Nomor {core.format_nomor(no)} sudah dipakai"}
+        added = core.reserve_numbers(jenis, tahun, no, last, ttl_days)
+    else:
+        no, last, added = core.reserve_next_numbers(jenis, tahun, int(payload.get("jumlah") or 1), ttl_days)
+    return {"jenis": jenis, "tahun": tahun, "no": no, "sampai": last, "added": added > 0, "jumlah": added}
+
+
+def release(payload):
+    jenis, tahun, no = payload["jenis"], int(payload["tahun"]), int(payload["no"])
+    with core.storage_lock():
+        reserved = no in core.get_allocator().series(jenis, tahun).reserved
+        if reserved:
+            core.remove_skipped_number(jenis, tahun, no)
+    return {"jenis": jenis, "tahun": tahun, "no": no, "released": reserved}
+
+
+def lookup(payload):
+    if payload.get("nomor_surat"):
+        letters = get_storage().find_letters(payload["nomor_surat"])
+        return {"letters": [{k: (v.strftime('%Y-%m-%d') if isinstance(v, date) else v) for k, v in row.items()}
+                            for row in letters.astype(object).where(letters.notna(), None).to_dict('records')]}
+    jenis, tahun = payload["jenis"], int(payload["tahun"])
+    series = core.get_allocator().series(jenis, tahun)
+    return {"jenis": jenis, "tahun": tahun, "next_continuous": series.next_continuous(),
+            "smallest_free": series.smallest_free(), "reserved": series.reserved_numbers()}
+
+
+_OPERATIONS = {'reserve': reserve, 'release': release, 'lookup': lookup}
+
+
+def execute_batch(requests):
+    """
+    Run a list of (op, payload) under one storage lock and return one result per request.
+    Runs of consecutive single 'allocate' requests are merged into one allocation pass;
+    a list payload is its own batch. Failures are reported per request as {"error": ...}.
+    """
+    results = []
+    with core.storage_lock():
+        i = 0
+        while i < len(requests):
+            op, payload = requests[i]
+            if op == 'allocate':
+                j = i
+                while j < len(requests) and requests[j][0] == 'allocate' and not isinstance(requests[j][1], list):
+                    j += 1
+                group = payload if j == i else [p for _, p in requests[i:j]]
+                try:
+                    issued = _allocate_many(group)
+                except Exception as exc:
+                    issued = [{"error": str(exc)}] * len(group)
+                results.extend([issued] if j == i else issued)
+                i = max(j, i + 1)
+                continue
+            try:
+                results.append(_OPERATIONS[op](payload))
+            except (KeyError, TypeError, ValueError) as exc:
+                results.append({"error": f"Permintaan tidak valid: {exc}"})
+            i += 1
+    return results
+
+
+class NumberingService:
+    """Local asyncio HTTP server; every request is queued for the single batching worker."""
+
+    def __init__(self, max_batch=MAX_BATCH):
+        self.max_batch = max_batch
+        self._queue = None
+        # Satu thread saja: seluruh alokasi berjalan berurutan lewat satu indeks
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='penomoran-alloc')
+
+    async def submit(self, op, payload):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, payload, future))
+        return await future
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self._executor, execute_batch, [(op, p) for op, p, _ in batch])
+            except Exception as exc:
+                results = [{"error": str(exc)}] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        op = url.path.strip('/')
+        if op == 'metrics':
+            if method != 'GET':
+                return 405, {"error": "Gunakan GET"}
+            return 200, prometheus_text()
+        if op == 'lookup':
+            if method != 'GET':
+                return 405, {"error": "Gunakan GET"}
+            payload = dict(parse_qsl(url.query))
+        elif op in ('allocate', 'reserve', 'release'):
+            if method != 'POST':
+                return 405, {"error": "Gunakan POST"}
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                return 400, {"error": "Body bukan JSON yang valid"}
+            if not isinstance(payload, (dict, list)) or (isinstance(payload, list) and op != 'allocate'):
+                return 400, {"error": "Body harus berupa objek JSON"}
+        else:
+            return 404, {"error": f"Endpoint tidak dikenal: {url.path}"}
+        # Termasuk waktu antre: latensi yang dirasakan pemanggil
+        with span(f'service.{op}'):
+            result = await self.submit(op, payload)
+        if isinstance(result, dict) and 'error' in result:
+            return 422, result
+        return 200, result
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self._dispatch(method, target, body)
+                if isinstance(payload, str):
+                    data, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+                else:
+                    data, content_type = json.dumps(payload, default=str).encode('utf-8'), 'application/json'
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                             f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, ready=None):
+        self._queue = asyncio.Queue()
+        worker = asyncio.create_task(self._worker())
+        server = await asyncio.start_server(self._handle, host, port)
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            worker.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('serve', help="jalankan HTTP API lokal")
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+
+    p = sub.add_parser('allocate', help="terbitkan satu nomor surat")
+    p.add_argument('--jenis', required=True, choices=core.JENIS_SURAT)
+    p.add_argument('--kode', required=True)
+    p.add_argument('--tanggal', default=date.today().isoformat())
+    p.add_argument('--kepada', default='-')
+    p.add_argument('--perihal', default='')
+    p.add_argument('--keterangan', default='')
+    p.add_argument('--mode', choices=['continuous', 'fill_gaps'], default='continuous')
+    p.add_argument('--no', type=int)
+
+    for name, help_text in (('reserve', "lewati (reserve) nomor berikutnya atau --no"),
+                            ('release', "lepaskan nomor yang di-reserve")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('--jenis', required=True, choices=core.JENIS_SURAT)
+        p.add_argument('--tahun', type=int, default=date.today().year)
+        p.add_argument('--no', type=int, required=(name == 'release'))
+        if name == 'reserve':
+            p.add_argument('--sampai', type=int)
+            p.add_argument('--jumlah', type=int)
+            p.add_argument('--berlaku-hari', type=int)
+
+    p = sub.add_parser('lookup', help="cari surat per Nomor_Surat, atau status penomoran per jenis/tahun")
+    p.add_argument('--nomor-surat')
+    p.add_argument('--jenis', choices=core.JENIS_SURAT)
+    p.add_argument('--tahun', type=int, default=date.today().year)
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        print(f"Listening on http://{args.host}:{args.port}", file=sys.stderr)
+        try:
+            asyncio.run(NumberingService().serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.command == 'lookup' and not (args.nomor_surat or args.jenis):
+        parser.error("lookup membutuhkan --nomor-surat atau --jenis")
+
+    payload = {k: v for k, v in vars(args).items() if k != 'command' and v is not None}
+    result, = execute_batch([(args.command, payload)])
+    print(json.dumps(result, default=str, indent=2))
+    return 1 if isinstance(result, dict) and 'error' in result else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Materialized letter statistics for the dashboard: letters per (Jenis, Tahun, Bulan), per
+(Jenis, Tahun, Kode_Klasifikasi) and reserved numbers per (Jenis, Tahun).
+
+penomoran.core updates the counters on every issue, delete, reserve and release and saves
+them to stats_surat.json together with the storage signature they belong to (a burst of
+writes is saved once), so the dashboard reads a few hundred counters instead of grouping the
+whole history. When the file is missing or does not match the stored data (changed outside
+the app), the dashboard shows the last saved counters while they are rebuilt from storage in
+the background; the rebuild can also be forced with
+
+    python -m penomoran.stats rebuild
+"""
+import argparse
+import json
+import os
+from collections import Counter
+
+import pandas as pd
+
+from penomoran.storage import _atomic_replace, get_storage
+
+STATS_FILE = 'stats_surat.json'
+
+
+def storage_key(storage):
+    """JSON-comparable identity of the data a set of counters belongs to."""
+    return json.loads(json.dumps([type(storage).__name__, storage.signature()], default=str))
+
+
+def _kode_label(value):
+    # Kode angka bisa terbaca float (mis. 800.0) bila kolomnya memuat sel kosong
+    if value is None or pd.isna(value):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _bump(counter, key, delta):
+    counter[key] += delta
+    if counter[key] <= 0:
+        del counter[key]
+
+
+class LetterStats:
+    """Counters keyed by (Jenis, Tahun, Bulan), (Jenis, Tahun, Kode_Klasifikasi) and (Jenis, Tahun)."""
+
+    def __init__(self):
+        self.months = Counter()
+        self.kodes = Counter()
+        self.reserved = Counter()
+
+    @classmethod
+    def from_frames(cls, df, df_skipped):
+        """Full rebuild from a letters frame and a skipped-numbers frame."""
+        stats = cls()
+        if not df.empty:
+            for (jenis, tahun, bulan), n in df.groupby(['Jenis', 'Tahun', 'Bulan']).size().items():
+                stats.months[(jenis, int(tahun), int(bulan))] = int(n)
+            kode = df['Kode_Klasifikasi'].map(_kode_label)
+            for (jenis, tahun, kode), n in df.groupby([df['Jenis'], df['Tahun'], kode]).size().items():
+                stats.kodes[(jenis, int(tahun), kode)] = int(n)
+        if not df_skipped.empty:
+            # Satu baris per rentang nomor; hitung jumlah nomornya
+            sizes = df_skipped['No_Akhir'] - df_skipped['No'] + 1
+            for (jenis, tahun), n in sizes.groupby([df_skipped['Jenis'], df_skipped['Tahun']]).sum().items():
+                stats.reserved[(jenis, int(tahun))] = int(n)
+        return stats
+
+    def add_letter(self, jenis, tahun, bulan, kode, count=1):
+        _bump(self.months, (jenis, int(tahun), int(bulan)), count)
+        _bump(self.kodes, (jenis, int(tahun), _kode_label(kode)), count)
+
+    def count_letters(self, letters, count=1):
+        """add_letter for each (Jenis, Tahun, Bulan, Kode_Klasifikasi) tuple; count=-1 removes them."""
+        for jenis, tahun, bulan, kode in letters:
+            self.add_letter(jenis, tahun, bulan, kode, count)
+
+    def add_reserved(self, jenis, tahun, count=1):
+        _bump(self.reserved, (jenis, int(tahun)), count)
+
+    def years(self):
+        return sorted({key[1] for key in self.months} | {key[1] for key in self.reserved}, reverse=True)
+
+    def total(self, jenis, tahun):
+        return sum(self.months.get((jenis, int(tahun), bulan), 0) for bulan in range(1, 13))
+
+    def monthly(self, tahun, jenis_list):
+        """Letters per month of one year: index Bulan 1-12, one column per jenis."""
+        return pd.DataFrame({jenis: [self.months.get((jenis, int(tahun), bulan), 0) for bulan in range(1, 13)]
+                             for jenis in jenis_list}, index=pd.RangeIndex(1, 13, name='Bulan'))
+
+    def by_kode(self, tahun, jenis_list):
+        """Letters per Kode_Klasifikasi of one year, one column per jenis plus Total, largest first."""
+        rows = {}
+        for (jenis, year, kode), n in self.kodes.items():
+            if year == int(tahun) and jenis in jenis_list:
+                rows.setdefault(kode, dict.fromkeys(jenis_list, 0))[jenis] = n
+        df = pd.DataFrame.from_dict(rows, orient='index', columns=jenis_list).rename_axis('Kode_Klasifikasi')
+        df['Total'] = df.sum(axis=1)
+        return df.sort_values('Total', ascending=False)
+
+    def to_dict(self):
+        return {'months': [[*key, n] for key, n in self.months.items()],
+                'kodes': [[*key, n] for key, n in self.kodes.items()],
+                'reserved': [[*key, n] for key, n in self.reserved.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name in ('months', 'kodes', 'reserved'):
+            getattr(stats, name).update({tuple(item[:-1]): item[-1] for item in data[name]})
+        return stats
+
+
+def read_stats(path=STATS_FILE):
+    """(counters, key) saved in path, whatever data they belong to; (None, None) if missing or unreadable."""
+    try:
+        with open(path, encoding='utf-8') as fh:
+            data = json.load(fh)
+        return LetterStats.from_dict(data), data.get('key')
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None, None
+
+
+def load_stats(key, path=STATS_FILE):
+    """Counters saved for key, or None if the file is missing, unreadable or for other data."""
+    stats, saved_key = read_stats(path)
+    return stats if saved_key == key else None
+
+
+def save_stats(stats, key, path=STATS_FILE):
+    data = dict(stats.to_dict(), key=key)
+    _atomic_replace(path, lambda fh: json.dump(data, fh, ensure_ascii=False))
+
+
+def rebuild_stats(storage, path=STATS_FILE):
+    """Recount everything from storage and save it; returns the new LetterStats."""
+    with storage.lock():
+        stats = LetterStats.from_frames(storage.load_data(), storage.load_skipped())
+        save_stats(stats, storage_key(storage), path)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Letter statistics maintenance for the numbering app.")
+    parser.add_argument('command', choices=['rebuild'])
+    args = parser.parse_args(argv)
+    if args.command == 'rebuild':
+        stats = rebuild_stats(get_storage())
+        print(f"Rebuilt {os.path.abspath(STATS_FILE)}: {sum(stats.months.values())} letters, "
+              f"{sum(stats.reserved.values())} reserved numbers")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
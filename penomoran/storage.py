@@ -0,0 +1,1199 @@
+"""
+Storage backends for letters (data_surat) and reserved/skipped numbers.
+
+Four engines share one interface:
+  - CsvStorage     : the original data_surat.csv / skipped_numbers.csv files
+  - JournalStorage : the same CSV files as snapshots plus append-only journals, so saves
+                     and deletes append one record instead of rewriting the whole file
+  - SqliteStorage  : data_surat.db with unique indexes on (Jenis, Tahun, No) and
+                     (Nomor_Surat, Jenis, Tahun) and an index on Tanggal, so lookups, range reports and deletes are
+                     indexed queries instead of full-table pandas scans
+  - ParquetStorage : typed Parquet files partitioned by Tahun under data_surat_parquet/, so
+                     current-year forms and reports read one partition (optional, needs pyarrow)
+
+The engine is picked with the PENOMORAN_STORAGE environment variable
+('csv', 'journal', 'sqlite' or 'parquet'). Journals are folded into the snapshots with
+
+    python -m penomoran.storage compact
+"""
+import argparse
+import csv
+import functools
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from penomoran.metrics import count, span
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DB_FILE = 'data_surat.csv'
+SKIP_FILE = 'skipped_numbers.csv'
+SQLITE_FILE = 'data_surat.db'
+PARQUET_DIR = 'data_surat_parquet'
+
+LETTER_COLUMNS = ["No", "Jenis", "Tanggal", "Bulan", "Tahun", "Kode_Klasifikasi", "Kepada", "Perihal", "Keterangan", "Nomor_Surat"]
+# Satu baris per rentang nomor yang di-reserve (No..No_Akhir); Expires kosong berarti tanpa batas waktu
+SKIP_COLUMNS = ['Jenis', 'Tahun', 'No', 'No_Akhir', 'Created', 'Expires']
+# Kolom yang dikembalikan delete_letter: cukup untuk melepas nomor dan mengurangi statistik
+DELETED_COLUMNS = ['Jenis', 'Tahun', 'No', 'Bulan', 'Kode_Klasifikasi']
+
+
+# Locking & atomic write: satu lock per penyimpanan, berlaku lintas proses
+_lock_local = threading.local()
+
+
+def _lock_file(fh):
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(fh):
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _file_lock(lock_path):
+    depths = getattr(_lock_local, 'depths', None)
+    if depths is None:
+        depths = _lock_local.depths = {}
+    if depths.get(lock_path):
+        depths[lock_path] += 1
+        try:
+            yield
+        finally:
+            depths[lock_path] -= 1
+        return
+    with open(lock_path, 'a+') as fh:
+        _lock_file(fh)
+        depths[lock_path] = 1
+        try:
+            yield
+        finally:
+            depths[lock_path] = 0
+            _unlock_file(fh)
+
+
+def _counted(kind, *paths):
+    # Metrik baca/tulis file, dihitung per nama file
+    for path in paths:
+        count(f'storage_{kind}_total', file=os.path.basename(path))
+
+
+def _atomic_replace(path, write, binary=False):
+    """Call write(fh) on a temp file next to path, fsync it, then rename over path."""
+    with span('storage.write_file'):
+        _atomic_replace_now(path, write, binary)
+    _counted('writes', path)
+
+
+def _atomic_replace_now(path, write, binary):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', newline='', encoding='utf-8')) as fh:
+            write(fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _atomic_write_csv(df, path):
+    """Write df to a temp file next to path, fsync it, then rename over path."""
+    _atomic_replace(path, lambda fh: df.to_csv(fh, index=False))
+
+
+def _coerce_letters(df):
+    # Pastikan tipe kolom yang penting benar
+    if 'Tanggal' in df.columns:
+        df['Tanggal'] = pd.to_datetime(df['Tanggal']).dt.date
+    else:
+        df['Tanggal'] = pd.Series(dtype='object')
+    if 'No' in df.columns:
+        # Convert No to numeric (ints) when possible
+        df['No'] = pd.to_numeric(df['No'], errors='coerce').fillna(0).astype(int)
+    else:
+        df['No'] = pd.Series(dtype='int')
+    for col in ['Bulan', 'Tahun']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+        else:
+            df[col] = pd.Series(dtype='int')
+    return df
+
+
+def _coerce_skipped(df):
+    for col in ['No', 'Tahun']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+        else:
+            df[col] = pd.Series(dtype='int')
+    # File lama menyimpan satu nomor per baris: rentangnya No..No
+    last = pd.to_numeric(df['No_Akhir'], errors='coerce') if 'No_Akhir' in df.columns else pd.Series(np.nan, index=df.index)
+    df['No_Akhir'] = last.where(last >= df['No'], df['No']).fillna(0).astype(int)
+    df['Expires'] = df['Expires'].fillna('').astype(str) if 'Expires' in df.columns else ''
+    # ensure columns order
+    for c in SKIP_COLUMNS:
+        if c not in df.columns:
+            df[c] = pd.Series(dtype='object')
+    return df[SKIP_COLUMNS]
+
+
+def expand_skipped(df_skipped):
+    """One row per reserved number (Jenis, Tahun, No, Created, Expires) of a SKIP_COLUMNS range frame."""
+    if 'No_Akhir' not in df_skipped.columns:
+        # Sudah satu nomor per baris (format lama)
+        return df_skipped.reset_index(drop=True)
+    lengths = (df_skipped['No_Akhir'] - df_skipped['No'] + 1).clip(lower=1).to_numpy(dtype='int64')
+    out = df_skipped.iloc[np.repeat(np.arange(len(df_skipped)), lengths)][['Jenis', 'Tahun', 'No', 'Created', 'Expires']]
+    offsets = np.arange(len(out)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    out['No'] = out['No'].to_numpy(dtype='int64') + offsets
+    return out.reset_index(drop=True)
+
+
+def _cut_skipped(df, jenis, tahun, no, last):
+    """
+    Remove numbers no..last of one series from a range frame, splitting ranges that only partly
+    overlap. Returns (remaining frame, rows removed, new rows for the pieces that are kept).
+    """
+    hit = ((df['Jenis'] == jenis) & (df['Tahun'] == int(tahun)) & (df['No'] <= int(last)) & (df['No_Akhir'] >= int(no))).to_numpy()
+    removed = df[hit]
+    pieces = []
+    for row in removed.to_dict('records'):
+        if row['No'] < int(no):
+            pieces.append(dict(row, No_Akhir=int(no) - 1))
+        if row['No_Akhir'] > int(last):
+            pieces.append(dict(row, No=int(last) + 1))
+    kept = df[~hit]
+    if pieces:
+        kept = pd.concat([kept, pd.DataFrame(pieces, columns=SKIP_COLUMNS)], ignore_index=True)
+    return kept, removed, pieces
+
+
+def _skipped_row(jenis, tahun, no, created, last=None, expires=''):
+    return {'Jenis': jenis, 'Tahun': int(tahun), 'No': int(no), 'No_Akhir': int(no if last is None else last),
+            'Created': created, 'Expires': expires or ''}
+
+
+def _range_mask(df, jenis, start, end):
+    """Boolean array over df: rows of jenis with start <= Tanggal <= end."""
+    mask = (df['Jenis'] == jenis).to_numpy()
+    if not mask.any():
+        return mask
+    tanggal = df['Tanggal'][mask]
+    if pd.api.types.is_datetime64_any_dtype(tanggal):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+    mask[mask] = ((tanggal >= start) & (tanggal <= end)).to_numpy()
+    return mask
+
+
+def _in_range(df, jenis, start, end):
+    return df.loc[_range_mask(df, jenis, start, end)]
+
+
+def _no_order(df):
+    """Row positions of df sorted by No, highest first (ties keep storage order)."""
+    return np.argsort(-df['No'].to_numpy(dtype='int64'), kind='stable')
+
+
+class _PageIndex:
+    """
+    The letters table sorted by No (highest first) with Jenis as category codes and Tanggal
+    as datetime64, so a report page is a vectorized filter plus a slice. Kept in the load
+    cache and shared read-only like the frames.
+    """
+
+    def __init__(self, df):
+        self.frame = df.iloc[_no_order(df)].reset_index(drop=True)
+        jenis = pd.Categorical(self.frame['Jenis'])
+        self._codes = jenis.codes
+        self._categories = {value: code for code, value in enumerate(jenis.categories)}
+        self._tanggal = pd.to_datetime(self.frame['Tanggal']).to_numpy(dtype='datetime64[D]')
+
+    def page(self, jenis, start, end, offset, limit):
+        code = self._categories.get(jenis)
+        if code is None:
+            return self.frame.iloc[0:0], 0
+        mask = (self._codes == code) & (self._tanggal >= np.datetime64(start, 'D')) & (self._tanggal <= np.datetime64(end, 'D'))
+        pos = np.flatnonzero(mask)
+        return self.frame.iloc[pos[offset:offset + limit]], len(pos)
+
+
+def _letter_mask(df, nomor_surat, jenis=None, tahun=None):
+    mask = df['Nomor_Surat'] == nomor_surat
+    if jenis is not None:
+        mask &= df['Jenis'] == jenis
+    if tahun is not None:
+        mask &= df['Tahun'] == int(tahun)
+    return mask
+
+
+def _stat_signature(*paths):
+    sig = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            sig.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+class _LoadCache:
+    """
+    Parsed tables keyed by their storage signature, shared by every session in the process.
+    Callers get the cached object itself, without a copy per hit: it must be treated as
+    read-only, and code that wants to change a loaded frame copies it first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def get(self, name, signature, loader):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == signature:
+                self.hits[name] += 1
+                return entry[1]
+            generation = self._generation
+        with span(f"storage.load_{name.split(':')[0]}"):
+            df = loader()
+        with self._lock:
+            self.misses[name] += 1
+            # Jangan simpan hasil baca yang bersamaan dengan penulisan
+            if generation == self._generation:
+                self._entries[name] = (signature, df)
+        return df
+
+    def invalidate(self, *names):
+        with self._lock:
+            self._generation += 1
+            for name in names or list(self._entries):
+                self._entries.pop(name, None)
+
+    def stats(self):
+        with self._lock:
+            return {name: {'hits': self.hits[name], 'misses': self.misses[name]}
+                    for name in sorted(set(self.hits) | set(self.misses))}
+
+
+class Storage:
+    """
+    Interface shared by all engines. Subclasses implement _read_data/_read_skipped and the
+    whole-table saves; load_data/load_skipped serve parsed frames from a per-process cache
+    that is keyed on data_signature()/skipped_signature() and dropped by every write.
+    The row-level methods below fall back to load-modify-save and are overridden where
+    the engine can do better.
+    """
+
+    lock_path = None
+
+    def __init__(self):
+        self._cache = _LoadCache()
+
+    def lock(self):
+        """Exclusive cross-process lock for read-modify-write sequences (re-entrant per thread)."""
+        return _file_lock(self.lock_path)
+
+    def signature(self):
+        """A value that changes whenever the stored data changes."""
+        return self.data_signature(), self.skipped_signature()
+
+    def data_signature(self):
+        raise NotImplementedError
+
+    def skipped_signature(self):
+        raise NotImplementedError
+
+    def cache_stats(self):
+        """Hit/miss counters of the load cache per table."""
+        return self._cache.stats()
+
+    def _invalidate(self, *names):
+        self._cache.invalidate(*names)
+
+    def load_data(self):
+        """All letters (LETTER_COLUMNS). Shared with the load cache: read-only, copy() before changing it."""
+        return self._cache.get('data', self.data_signature(), self._read_data)
+
+    def load_skipped(self):
+        """All reservations (SKIP_COLUMNS). Shared with the load cache: read-only, copy() before changing it."""
+        return self._cache.get('skipped', self.skipped_signature(), self._read_skipped)
+
+    def _read_data(self):
+        raise NotImplementedError
+
+    def _read_skipped(self):
+        raise NotImplementedError
+
+    def save_data(self, df):
+        raise NotImplementedError
+
+    def save_skipped(self, df):
+        raise NotImplementedError
+
+    # True jika data dipartisi per tahun dan numbering_rows(tahun) hanya membaca satu partisi
+    partitioned = False
+
+    def numbering_rows(self, tahun=None):
+        """(Jenis, Tahun, No) of every letter, or of one year, used to build the allocator index."""
+        df = self.load_data()[['Jenis', 'Tahun', 'No']]
+        return df if tahun is None else df[df['Tahun'] == int(tahun)]
+
+    def letters_between(self, jenis, start, end):
+        """Letters of one jenis with start <= Tanggal <= end."""
+        return _in_range(self.load_data(), jenis, start, end)
+
+    def find_letters(self, nomor_surat):
+        """Letters with this Nomor_Surat (one per jenis/year at most)."""
+        df = self.load_data()
+        return df[df['Nomor_Surat'] == nomor_surat]
+
+    def letters_page(self, jenis, start, end, offset, limit):
+        """
+        Rows offset..offset+limit of letters_between sorted by No, highest first, and the total
+        number of letters in range: (DataFrame, total). The No order of the whole table is
+        computed once per data version, so a page costs one range filter and no sort.
+        """
+        index = self._cache.get('pages', self.data_signature(), lambda: _PageIndex(self.load_data()))
+        return index.page(jenis, start, end, offset, limit)
+
+    def iter_letters_between(self, jenis, start, end, chunksize=5000):
+        """Same rows as letters_between, yielded as DataFrame chunks of at most chunksize rows."""
+        df = self.letters_between(jenis, start, end)
+        for i in range(0, len(df), chunksize):
+            yield df.iloc[i:i + chunksize]
+
+    def insert_letter(self, row):
+        with self.lock():
+            new_data = _coerce_letters(pd.DataFrame([row], columns=LETTER_COLUMNS))
+            self.save_data(pd.concat([self.load_data(), new_data], ignore_index=True))
+
+    def insert_letters(self, df):
+        """Append all rows of df (LETTER_COLUMNS) in one write."""
+        with self.lock():
+            new_data = _coerce_letters(df[LETTER_COLUMNS].copy())
+            current = self.load_data()
+            self.save_data(new_data if current.empty else pd.concat([current, new_data], ignore_index=True))
+
+    def delete_letter(self, nomor_surat, jenis=None, tahun=None):
+        """
+        Delete rows with this Nomor_Surat, optionally only of one jenis and/or year;
+        returns their DELETED_COLUMNS.
+        """
+        with self.lock():
+            df = self.load_data()
+            to_delete = _letter_mask(df, nomor_surat, jenis, tahun)
+            removed = df.loc[to_delete, DELETED_COLUMNS]
+            self.save_data(df[~to_delete])
+        return removed
+
+    def add_skipped(self, jenis, tahun, no, created, last=None, expires=''):
+        """Store one reservation of numbers no..last (default just no); expires is an ISO date or ''."""
+        with self.lock():
+            new = pd.DataFrame([_skipped_row(jenis, tahun, no, created, last, expires)], columns=SKIP_COLUMNS)
+            current = self.load_skipped()
+            self.save_skipped(new if current.empty else pd.concat([current, new], ignore_index=True))
+
+    def remove_skipped(self, jenis, tahun, no, last=None):
+        """Release numbers no..last (default just no), splitting the ranges they belong to."""
+        with self.lock():
+            kept, removed, _ = _cut_skipped(self.load_skipped(), jenis, tahun, no, no if last is None else last)
+            if not removed.empty:
+                self.save_skipped(kept)
+
+
+class CsvStorage(Storage):
+    """The original flat files; every operation parses or rewrites the full CSV."""
+
+    def __init__(self, db_file=DB_FILE, skip_file=SKIP_FILE):
+        super().__init__()
+        self.db_file = db_file
+        self.skip_file = skip_file
+        self.lock_path = db_file + '.lock'
+
+    def data_signature(self):
+        return _stat_signature(self.db_file)
+
+    def skipped_signature(self):
+        return _stat_signature(self.skip_file)
+
+    def _read_data(self):
+        if not os.path.exists(self.db_file):
+            return pd.DataFrame(columns=LETTER_COLUMNS)
+        _counted('reads', self.db_file)
+        return _coerce_letters(pd.read_csv(self.db_file))
+
+    def save_data(self, df):
+        try:
+            _atomic_write_csv(df, self.db_file)
+        finally:
+            self._invalidate('data')
+
+    def _read_skipped(self):
+        if not os.path.exists(self.skip_file):
+            return pd.DataFrame(columns=SKIP_COLUMNS)
+        _counted('reads', self.skip_file)
+        return _coerce_skipped(pd.read_csv(self.skip_file))
+
+    def save_skipped(self, df):
+        try:
+            _atomic_write_csv(df, self.skip_file)
+        finally:
+            self._invalidate('skipped')
+
+
+# Kunci unik satu surat pada journal (sama dengan unique index SQLite)
+LETTER_KEY = ['Nomor_Surat', 'Jenis', 'Tahun']
+
+
+def _journal_path(path):
+    root, ext = os.path.splitext(path)
+    return root + '.journal' + ext
+
+
+def _journal_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _append_journal(path, columns, records):
+    """Append (op, record) pairs (op 'I' insert or 'D' tombstone) and fsync once."""
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+    _counted('writes', path)
+    with span('storage.append_journal'), open(path, 'a', newline='', encoding='utf-8') as fh:
+        writer = csv.writer(fh)
+        if is_new:
+            writer.writerow(['Op'] + columns + ['End'])
+        # Kolom End ditulis terakhir: baris yang terpotong saat crash dikenali dan diabaikan
+        writer.writerows([op] + [_journal_value(record.get(c)) for c in columns] + [1] for op, record in records)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+# Setiap record journal diakhiri kolom End=1 dan pemisah baris csv.writer
+_RECORD_END = b',1\r\n'
+
+
+def _journal_end(path):
+    """
+    Byte length of the journal up to its last complete record. A crash during an append can
+    leave a partial last record, possibly ending inside a quoted field; it is everything after
+    the last record that has all columns, End=1 and a line break.
+    """
+    with open(path, 'rb') as fh:
+        size = fh.seek(0, os.SEEK_END)
+        fh.seek(max(0, size - len(_RECORD_END)))
+        if fh.read() == _RECORD_END:
+            return size
+        fh.seek(0)
+        state = {'pos': 0, 'terminated': False}
+
+        def lines():
+            for line in fh:
+                state['pos'] += len(line)
+                state['terminated'] = line.endswith(b'\n')
+                yield line.decode('utf-8', 'replace')
+
+        end = 0
+        width = None
+        try:
+            for row in csv.reader(lines()):
+                if not state['terminated']:
+                    break
+                if width is None:
+                    width = len(row)
+                    end = state['pos']
+                elif len(row) == width and row[-1] == '1':
+                    end = state['pos']
+        except csv.Error:
+            # Tanda kutip tidak ditutup sampai akhir file: record terakhir terpotong
+            pass
+    return end
+
+
+def _trim_journal(path):
+    """Cut a partial last record off the journal, so the next append starts on a fresh line."""
+    if not os.path.exists(path):
+        return
+    end = _journal_end(path)
+    if end < os.path.getsize(path):
+        with open(path, 'r+b') as fh:
+            fh.truncate(end)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+
+def _journal_header(path):
+    """Column names of an existing journal, or None if there is none yet."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, newline='', encoding='utf-8') as fh:
+        return next(csv.reader(fh), None)
+
+
+def _read_journal(path, columns):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return pd.DataFrame(columns=['Op'] + columns)
+    _counted('reads', path)
+    end = _journal_end(path)
+    if end == 0:
+        return pd.DataFrame(columns=['Op'] + columns)
+    source = path
+    if end < os.path.getsize(path):
+        # Record terakhir terpotong (crash saat menulis): baca hanya record yang lengkap
+        with open(path, 'rb') as fh:
+            source = io.StringIO(fh.read(end).decode('utf-8'))
+    journal = pd.read_csv(source, on_bad_lines='skip')
+    journal = journal[(journal['End'] == 1) & journal['Op'].isin(['I', 'D'])]
+    return journal.drop(columns=['End']).reset_index(drop=True)
+
+
+def _key_strings(col):
+    # Kolom angka bisa terbaca float bila ada sel kosong; samakan "2024.0" dengan "2024"
+    if pd.api.types.is_float_dtype(col):
+        col = col.astype('Int64')
+    return col.astype(str)
+
+
+def _row_keys(df, key):
+    if len(key) == 1:
+        return pd.Index(_key_strings(df[key[0]]))
+    return pd.MultiIndex.from_frame(pd.DataFrame({k: _key_strings(df[k]) for k in key}))
+
+
+def _replay(snapshot, journal, key):
+    """
+    Fold the journal into the snapshot. The last record per key wins: an insert replaces
+    every snapshot row with that key, a tombstone removes them. Replaying the same journal
+    twice gives the same result, so a crash between writing the snapshot and truncating the
+    journal during compaction is harmless.
+    """
+    if journal.empty:
+        return snapshot
+    last = journal.drop_duplicates(key, keep='last')
+    base = snapshot[~_row_keys(snapshot, key).isin(_row_keys(last, key))]
+    inserted = last.loc[last['Op'] == 'I', list(snapshot.columns)]
+    if base.empty or inserted.empty:
+        return (inserted if base.empty else base).reset_index(drop=True)
+    return pd.concat([base, inserted], ignore_index=True)
+
+
+class JournalStorage(CsvStorage):
+    """
+    CSV snapshot plus an append-only journal per file (data_surat.journal.csv,
+    skipped_numbers.journal.csv). Inserts append one record and deletes append a
+    tombstone, so a save costs O(1) I/O; loads replay the journal tail over the snapshot.
+    compact() folds the journal into the snapshot; it also runs in a background thread
+    once the journal grows past half the snapshot size. Compaction rewrites the files but not
+    the data, so within the process the signatures keep their pre-compaction value until the
+    next write, and caches and indexes keyed on them stay valid.
+    """
+
+    compact_min_bytes = 256 * 1024
+
+    def __init__(self, db_file=DB_FILE, skip_file=SKIP_FILE):
+        super().__init__(db_file, skip_file)
+        self.db_journal = _journal_path(db_file)
+        self.skip_journal = _journal_path(skip_file)
+        self._compactor = None
+        # name -> (signature file sesudah kompaksi, signature sebelum kompaksi)
+        self._compacted = {}
+
+    def _logical(self, name, sig):
+        entry = self._compacted.get(name)
+        return entry[1] if entry is not None and entry[0] == sig else sig
+
+    def data_signature(self):
+        return self._logical('data', _stat_signature(self.db_file, self.db_journal))
+
+    def skipped_signature(self):
+        return self._logical('skipped', _stat_signature(self.skip_file, self.skip_journal))
+
+    def _snapshot(self, path, columns):
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=columns)
+        _counted('reads', path)
+        return pd.read_csv(path)
+
+    def _read_data(self):
+        snapshot = self._snapshot(self.db_file, LETTER_COLUMNS)
+        journal = _read_journal(self.db_journal, LETTER_COLUMNS)
+        # Nomor_Surat Masuk/Keluar tidak memuat jenis maupun tahun, jadi kuncinya harus lengkap
+        return _coerce_letters(_replay(snapshot, journal, LETTER_KEY))
+
+    def _read_skipped(self):
+        snapshot = _coerce_skipped(self._snapshot(self.skip_file, SKIP_COLUMNS))
+        journal = _read_journal(self.skip_journal, SKIP_COLUMNS)
+        if not journal.empty:
+            journal = pd.concat([journal[['Op']], _coerce_skipped(journal)], axis=1)
+        return _replay(snapshot, journal, ['Jenis', 'Tahun', 'No']).reset_index(drop=True)
+
+    def save_data(self, df):
+        with self.lock():
+            super().save_data(df)
+            if os.path.exists(self.db_journal):
+                os.remove(self.db_journal)
+            self._invalidate('data')
+
+    def save_skipped(self, df):
+        with self.lock():
+            super().save_skipped(df)
+            if os.path.exists(self.skip_journal):
+                os.remove(self.skip_journal)
+            self._invalidate('skipped')
+
+    def _append(self, name, op, *records):
+        path, columns = (self.db_journal, LETTER_COLUMNS) if name == 'data' else (self.skip_journal, SKIP_COLUMNS)
+        _trim_journal(path)
+        if _journal_header(path) not in (None, ['Op'] + columns + ['End']):
+            # Journal dari versi lama dengan kolom lain: lipat dulu ke snapshot sebelum menambah baris
+            self.compact()
+        try:
+            _append_journal(path, columns, [(op, record) for record in records])
+        finally:
+            self._invalidate(name)
+
+    def insert_letter(self, row):
+        with self.lock():
+            self._append('data', 'I', row)
+        self._maybe_compact()
+
+    def insert_letters(self, df):
+        with self.lock():
+            self._append('data', 'I', *df.to_dict('records'))
+        self._maybe_compact()
+
+    def delete_letter(self, nomor_surat, jenis=None, tahun=None):
+        with self.lock():
+            df = self.load_data()
+            removed = df.loc[_letter_mask(df, nomor_surat, jenis, tahun), DELETED_COLUMNS]
+            if not removed.empty:
+                self._append('data', 'D', *({'Nomor_Surat': nomor_surat, 'Jenis': jenis, 'Tahun': int(tahun)}
+                                            for jenis, tahun in removed[['Jenis', 'Tahun']].drop_duplicates().itertuples(index=False)))
+        self._maybe_compact()
+        return removed
+
+    def add_skipped(self, jenis, tahun, no, created, last=None, expires=''):
+        with self.lock():
+            self._append('skipped', 'I', _skipped_row(jenis, tahun, no, created, last, expires))
+
+    def remove_skipped(self, jenis, tahun, no, last=None):
+        with self.lock():
+            _, removed, pieces = _cut_skipped(self.load_skipped(), jenis, tahun, no, no if last is None else last)
+            if removed.empty:
+                return
+            # Rentang dikenali dari nomor awalnya; sisa potongan ditulis setelah tombstone agar menang saat replay
+            self._append('skipped', 'D', *removed.to_dict('records'))
+            if pieces:
+                self._append('skipped', 'I', *pieces)
+
+    def compact(self):
+        """Fold both journals into their snapshots; the data and its signatures stay the same."""
+        with self.lock():
+            for name, snapshot, journal, load, signature in (
+                    ('data', self.db_file, self.db_journal, self.load_data, self.data_signature),
+                    ('skipped', self.skip_file, self.skip_journal, self.load_skipped, self.skipped_signature)):
+                if os.path.exists(journal):
+                    before = signature()
+                    _atomic_write_csv(load(), snapshot)
+                    # Sesudah journal dihapus, file menunjukkan data yang sama dengan sebelum kompaksi
+                    self._compacted[name] = (_stat_signature(snapshot) + (None,), before)
+                    os.remove(journal)
+
+    def _maybe_compact(self):
+        try:
+            journal_size = os.path.getsize(self.db_journal)
+        except FileNotFoundError:
+            return
+        snapshot_size = os.path.getsize(self.db_file) if os.path.exists(self.db_file) else 0
+        if journal_size < max(self.compact_min_bytes, snapshot_size // 2):
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name='penomoran-compact', daemon=True)
+        self._compactor.start()
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS surat (
+    id INTEGER PRIMARY KEY,
+    No INTEGER NOT NULL,
+    Jenis TEXT NOT NULL,
+    Tanggal TEXT NOT NULL,
+    Bulan INTEGER NOT NULL,
+    Tahun INTEGER NOT NULL,
+    Kode_Klasifikasi TEXT,
+    Kepada TEXT,
+    Perihal TEXT,
+    Keterangan TEXT,
+    Nomor_Surat TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_surat_jenis_tahun_no ON surat (Jenis, Tahun, No);
+-- Format Surat Masuk & Keluar sama dan tanpa tahun, sedangkan nomor reset tiap tahun:
+-- Nomor_Surat hanya unik per jenis & tahun
+DROP INDEX IF EXISTS ux_surat_nomor_surat;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_surat_nomor_surat_jenis_tahun ON surat (Nomor_Surat, Jenis, Tahun);
+CREATE INDEX IF NOT EXISTS ix_surat_tanggal ON surat (Tanggal);
+-- Halaman laporan diurutkan per No; Tanggal ikut di indeks agar filter periode tidak membaca tabel
+CREATE INDEX IF NOT EXISTS ix_surat_jenis_no ON surat (Jenis, No, Tanggal);
+-- Satu baris per rentang No..No_Akhir, dikenali dari nomor awalnya
+CREATE TABLE IF NOT EXISTS skipped (
+    Jenis TEXT NOT NULL,
+    Tahun INTEGER NOT NULL,
+    No INTEGER NOT NULL,
+    No_Akhir INTEGER,
+    Created TEXT,
+    Expires TEXT,
+    PRIMARY KEY (Jenis, Tahun, No)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0), ('skipped_version', 0);
+"""
+
+_LETTER_SELECT = "SELECT " + ", ".join(LETTER_COLUMNS) + " FROM surat"
+_SKIP_INSERT = f"INSERT OR IGNORE INTO skipped ({', '.join(SKIP_COLUMNS)}) VALUES ({', '.join('?' * len(SKIP_COLUMNS))})"
+
+
+def _sql_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        # numpy scalar -> python
+        return value.item()
+    return value
+
+
+class SqliteStorage(Storage):
+    """
+    SQLite engine. Writes run in a single transaction and bump meta.data_version or
+    meta.skipped_version, which serve as change signatures for caches and the allocator index.
+    """
+
+    def __init__(self, path=SQLITE_FILE):
+        super().__init__()
+        self.path = path
+        self.lock_path = path + '.lock'
+        conn = self._connect()
+        try:
+            # WAL tersimpan di file database, cukup diatur sekali
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SQLITE_SCHEMA)
+            # Database lama: tabel skipped belum punya kolom rentang & kedaluwarsa
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(skipped)")}
+            for col, sql_type in (('No_Akhir', 'INTEGER'), ('Expires', 'TEXT')):
+                if col not in existing:
+                    conn.execute(f"ALTER TABLE skipped ADD COLUMN {col} {sql_type}")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @contextmanager
+    def _transaction(self, table):
+        _counted('writes', self.path)
+        conn = self._connect()
+        try:
+            with span('storage.sqlite_write'):
+                conn.execute('BEGIN IMMEDIATE')
+                yield conn
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (f'{table}_version',))
+                conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+            self._invalidate(table)
+
+    def _query(self, sql, params=()):
+        _counted('reads', self.path)
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def _version(self, table):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT value FROM meta WHERE key = ?", (f'{table}_version',)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def signature(self):
+        # Satu koneksi untuk kedua versi: dipanggil pada setiap pencarian nomor
+        conn = self._connect()
+        try:
+            versions = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('data_version', 'skipped_version')"))
+        finally:
+            conn.close()
+        return versions['data_version'], versions['skipped_version']
+
+    def data_signature(self):
+        return self._version('data')
+
+    def skipped_signature(self):
+        return self._version('skipped')
+
+    def _read_data(self):
+        return _coerce_letters(self._query(_LETTER_SELECT + " ORDER BY id"))
+
+    def save_data(self, df):
+        rows = [tuple(_sql_value(v) for v in row) for row in df[LETTER_COLUMNS].itertuples(index=False)]
+        with self._transaction('data') as conn:
+            conn.execute("DELETE FROM surat")
+            conn.executemany(f"INSERT INTO surat ({', '.join(LETTER_COLUMNS)}) VALUES ({', '.join('?' * len(LETTER_COLUMNS))})", rows)
+
+    def _read_skipped(self):
+        return _coerce_skipped(self._query(f"SELECT {', '.join(SKIP_COLUMNS)} FROM skipped ORDER BY rowid"))
+
+    def save_skipped(self, df):
+        rows = [tuple(_sql_value(v) for v in row) for row in df[SKIP_COLUMNS].itertuples(index=False)]
+        with self._transaction('skipped') as conn:
+            conn.execute("DELETE FROM skipped")
+            conn.executemany(_SKIP_INSERT, rows)
+
+    def numbering_rows(self, tahun=None):
+        # Covered by ux_surat_jenis_tahun_no, tidak perlu membaca tabel utama
+        if tahun is None:
+            return self._query("SELECT Jenis, Tahun, No FROM surat")
+        return self._query("SELECT Jenis, Tahun, No FROM surat WHERE Tahun = ?", (int(tahun),))
+
+    def letters_between(self, jenis, start, end):
+        df = self._query(_LETTER_SELECT + " WHERE Jenis = ? AND Tanggal BETWEEN ? AND ? ORDER BY id",
+                         (jenis, start.isoformat(), end.isoformat()))
+        return _coerce_letters(df)
+
+    def find_letters(self, nomor_surat):
+        return _coerce_letters(self._query(_LETTER_SELECT + " WHERE Nomor_Surat = ? ORDER BY id", (nomor_surat,)))
+
+    def letters_page(self, jenis, start, end, offset, limit):
+        # Dilayani oleh ix_surat_jenis_no: hanya baris halaman yang dibaca dari tabel
+        params = (jenis, start.isoformat(), end.isoformat())
+        _counted('reads', self.path)
+        conn = self._connect()
+        try:
+            total = conn.execute("SELECT COUNT(*) FROM surat WHERE Jenis = ? AND Tanggal BETWEEN ? AND ?", params).fetchone()[0]
+            df = pd.read_sql_query(_LETTER_SELECT + " WHERE Jenis = ? AND Tanggal BETWEEN ? AND ? ORDER BY No DESC, id"
+                                   " LIMIT ? OFFSET ?", conn, params=params + (int(limit), int(offset)))
+        finally:
+            conn.close()
+        return _coerce_letters(df), total
+
+    def iter_letters_between(self, jenis, start, end, chunksize=5000):
+        # Dibaca bertahap dari cursor, tidak pernah memuat seluruh periode sekaligus
+        _counted('reads', self.path)
+        conn = self._connect()
+        try:
+            chunks = pd.read_sql_query(_LETTER_SELECT + " WHERE Jenis = ? AND Tanggal BETWEEN ? AND ? ORDER BY id", conn,
+                                       params=(jenis, start.isoformat(), end.isoformat()), chunksize=chunksize)
+            for chunk in chunks:
+                yield _coerce_letters(chunk)
+        finally:
+            conn.close()
+
+    def insert_letter(self, row):
+        with self._transaction('data') as conn:
+            conn.execute(f"INSERT INTO surat ({', '.join(LETTER_COLUMNS)}) VALUES ({', '.join('?' * len(LETTER_COLUMNS))})",
+                         tuple(_sql_value(row[c]) for c in LETTER_COLUMNS))
+
+    def insert_letters(self, df):
+        rows = [tuple(_sql_value(v) for v in row) for row in df[LETTER_COLUMNS].itertuples(index=False)]
+        with self._transaction('data') as conn:
+            conn.executemany(f"INSERT INTO surat ({', '.join(LETTER_COLUMNS)}) VALUES ({', '.join('?' * len(LETTER_COLUMNS))})", rows)
+
+    def delete_letter(self, nomor_surat, jenis=None, tahun=None):
+        where, params = "Nomor_Surat = ?", [nomor_surat]
+        if jenis is not None:
+            where, params = where + " AND Jenis = ?", params + [jenis]
+        if tahun is not None:
+            where, params = where + " AND Tahun = ?", params + [int(tahun)]
+        with self._transaction('data') as conn:
+            removed = conn.execute(f"SELECT {', '.join(DELETED_COLUMNS)} FROM surat WHERE " + where, params).fetchall()
+            conn.execute("DELETE FROM surat WHERE " + where, params)
+        return pd.DataFrame(removed, columns=DELETED_COLUMNS)
+
+    def add_skipped(self, jenis, tahun, no, created, last=None, expires=''):
+        row = _skipped_row(jenis, tahun, no, created, last, expires)
+        with self._transaction('skipped') as conn:
+            conn.execute(_SKIP_INSERT, tuple(row[c] for c in SKIP_COLUMNS))
+
+    def remove_skipped(self, jenis, tahun, no, last=None):
+        last = int(no if last is None else last)
+        where = "Jenis = ? AND Tahun = ? AND No <= ? AND COALESCE(No_Akhir, No) >= ?"
+        params = (jenis, int(tahun), last, int(no))
+        with self._transaction('skipped') as conn:
+            found = pd.DataFrame(conn.execute(f"SELECT {', '.join(SKIP_COLUMNS)} FROM skipped WHERE " + where, params).fetchall(),
+                                 columns=SKIP_COLUMNS)
+            _, _, pieces = _cut_skipped(_coerce_skipped(found), jenis, tahun, no, last)
+            conn.execute("DELETE FROM skipped WHERE " + where, params)
+            conn.executemany(_SKIP_INSERT, [tuple(_sql_value(piece[c]) for c in SKIP_COLUMNS) for piece in pieces])
+
+
+@functools.lru_cache(maxsize=None)
+def _arrow():
+    """
+    (pyarrow, pyarrow.parquet, letters schema), imported on first use: only the Parquet engine
+    needs them, and loading pyarrow costs every other process startup time for nothing.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:  # mesin Parquet bersifat opsional
+        raise RuntimeError("The parquet storage engine needs pyarrow (pip install pyarrow)") from None
+    schema = pa.schema([
+        ('No', pa.int32()), ('Jenis', pa.string()), ('Tanggal', pa.date32()), ('Bulan', pa.int8()),
+        ('Tahun', pa.int16()), ('Kode_Klasifikasi', pa.string()), ('Kepada', pa.string()), ('Perihal', pa.string()),
+        ('Keterangan', pa.string()), ('Nomor_Surat', pa.string()),
+    ])
+    return pa, pq, schema
+
+
+def _parquet_letters_table(df):
+    """Typed Arrow table for a letters frame (date32 Tanggal, small ints, nullable strings)."""
+    pa, _, schema = _arrow()
+    df = df[LETTER_COLUMNS]
+    columns = {
+        'No': pd.to_numeric(df['No'], errors='coerce').fillna(0).astype('int32'),
+        'Jenis': df['Jenis'].astype('string'),
+        'Tanggal': pd.to_datetime(df['Tanggal']).values.astype('datetime64[D]'),
+        'Bulan': pd.to_numeric(df['Bulan'], errors='coerce').fillna(0).astype('int8'),
+        'Tahun': pd.to_numeric(df['Tahun'], errors='coerce').fillna(0).astype('int16'),
+    }
+    for col in ['Kode_Klasifikasi', 'Kepada', 'Perihal', 'Keterangan', 'Nomor_Surat']:
+        columns[col] = df[col].astype('string')
+    return pa.Table.from_pandas(pd.DataFrame(columns), schema=schema, preserve_index=False)
+
+
+def _parquet_frame(table):
+    # Tanggal sebagai datetime64 native, bukan objek date per baris; teks tetap object seperti mesin lain
+    return table.to_pandas(date_as_object=False, ignore_metadata=True)
+
+
+class ParquetStorage(Storage):
+    """
+    Letters in one typed Parquet file per Tahun under PARQUET_DIR (2024.parquet, 2025.parquet, ...),
+    sorted by Jenis and No so row-group statistics let Jenis filters skip data; skipped numbers
+    in PARQUET_DIR/skipped.parquet. Tanggal loads as datetime64 and No/Bulan/Tahun as ints, with
+    no per-load coercion. Reads for one year (forms, reports, the allocator index) open only that
+    partition and are cached per partition; a write rewrites only the partitions it touches.
+    Requires pyarrow.
+    """
+
+    partitioned = True
+    row_group_size = 8192
+
+    def __init__(self, directory=PARQUET_DIR):
+        # Tanpa pyarrow gagal di sini, bukan pada baca/tulis pertama
+        _arrow()
+        super().__init__()
+        self.directory = directory
+        self.skip_file = os.path.join(directory, 'skipped.parquet')
+        self.lock_path = directory + '.lock'
+        os.makedirs(directory, exist_ok=True)
+
+    def _partition(self, tahun):
+        return os.path.join(self.directory, f"{int(tahun)}.parquet")
+
+    def years(self):
+        """Years that have a partition, ascending."""
+        names = [n[:-len('.parquet')] for n in os.listdir(self.directory) if n.endswith('.parquet')]
+        return sorted(int(n) for n in names if n.isdigit())
+
+    def data_signature(self):
+        return tuple((tahun, _stat_signature(self._partition(tahun))) for tahun in self.years())
+
+    def skipped_signature(self):
+        return _stat_signature(self.skip_file)
+
+    def _read_year(self, tahun):
+        path = self._partition(tahun)
+        _, pq, schema = _arrow()
+        if not os.path.exists(path):
+            return _parquet_frame(schema.empty_table())
+        _counted('reads', path)
+        return _parquet_frame(pq.read_table(path))
+
+    def load_year(self, tahun):
+        """Letters of one year from its partition only (cached per partition)."""
+        return self._cache.get(f'data:{int(tahun)}', _stat_signature(self._partition(tahun)),
+                               lambda: self._read_year(tahun))
+
+    def _read_data(self):
+        frames = [self.load_year(tahun) for tahun in self.years()]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return self._read_year(0)
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def _write_year(self, tahun, df):
+        path = self._partition(tahun)
+        try:
+            if df.empty:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            table = _parquet_letters_table(df).sort_by([('Jenis', 'ascending'), ('No', 'ascending')])
+            _atomic_replace(path, lambda fh: _arrow()[1].write_table(table, fh, row_group_size=self.row_group_size), binary=True)
+        finally:
+            self._invalidate('data', f'data:{int(tahun)}')
+
+    def save_data(self, df):
+        with self.lock():
+            years = set(pd.to_numeric(df['Tahun'], errors='coerce').fillna(0).astype(int))
+            for tahun in set(self.years()) - years:
+                self._write_year(tahun, df.iloc[0:0])
+            for tahun, part in df.groupby(pd.to_numeric(df['Tahun'], errors='coerce').fillna(0).astype(int)):
+                self._write_year(tahun, part)
+
+    def numbering_rows(self, tahun=None):
+        if tahun is not None:
+            return self.load_year(tahun)[['Jenis', 'Tahun', 'No']]
+        paths = [self._partition(t) for t in self.years()]
+        if not paths:
+            return pd.DataFrame(columns=['Jenis', 'Tahun', 'No'])
+        # Hanya tiga kolom yang dibaca dari setiap partisi
+        _counted('reads', *paths)
+        return _arrow()[1].read_table(paths, columns=['Jenis', 'Tahun', 'No']).to_pandas()
+
+    def letters_between(self, jenis, start, end):
+        frames = [_in_range(self.load_year(tahun), jenis, start, end) for tahun in range(start.year, end.year + 1)
+                  if os.path.exists(self._partition(tahun))]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return self._read_year(0)
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def letters_page(self, jenis, start, end, offset, limit):
+        # Partisi ditulis terurut per (Jenis, No), jadi satu tahun cukup dibalik; antar-tahun diurutkan ulang
+        df = self.letters_between(jenis, start, end)
+        order = np.arange(len(df))[::-1] if start.year == end.year else _no_order(df)
+        return df.iloc[order[offset:offset + limit]], len(df)
+
+    def find_letters(self, nomor_surat):
+        paths = [self._partition(t) for t in self.years()]
+        if not paths:
+            return self._read_year(0)
+        _, pq, schema = _arrow()
+        _counted('reads', *paths)
+        return _parquet_frame(pq.read_table(paths, filters=[('Nomor_Surat', '=', nomor_surat)], schema=schema))
+
+    def insert_letter(self, row):
+        self.insert_letters(pd.DataFrame([row], columns=LETTER_COLUMNS))
+
+    def insert_letters(self, df):
+        with self.lock():
+            for tahun, part in df.groupby(pd.to_numeric(df['Tahun']).astype(int)):
+                current = self.load_year(tahun)
+                self._write_year(tahun, part if current.empty else pd.concat([current, part], ignore_index=True))
+
+    def delete_letter(self, nomor_surat, jenis=None, tahun=None):
+        with self.lock():
+            found = self.find_letters(nomor_surat) if tahun is None else self.load_year(tahun)
+            removed = found.loc[_letter_mask(found, nomor_surat, jenis, tahun), DELETED_COLUMNS]
+            for year in removed['Tahun'].unique():
+                current = self.load_year(year)
+                self._write_year(year, current[~_letter_mask(current, nomor_surat, jenis, year)])
+        return removed.reset_index(drop=True)
+
+    def _read_skipped(self):
+        if not os.path.exists(self.skip_file):
+            return pd.DataFrame(columns=SKIP_COLUMNS)
+        _counted('reads', self.skip_file)
+        return _coerce_skipped(_arrow()[1].read_table(self.skip_file).to_pandas())
+
+    def save_skipped(self, df):
+        pa, pq, _ = _arrow()
+        table = pa.Table.from_pandas(_coerce_skipped(df[SKIP_COLUMNS].copy()).astype({'Created': 'string', 'Expires': 'string'}),
+                                     preserve_index=False)
+        try:
+            _atomic_replace(self.skip_file, lambda fh: pq.write_table(table, fh), binary=True)
+        finally:
+            self._invalidate('skipped')
+
+
+BACKENDS = {
+    'csv': CsvStorage,
+    'journal': JournalStorage,
+    'sqlite': SqliteStorage,
+    'parquet': ParquetStorage,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_storage(backend=None):
+    """
+    Return the process-wide storage engine. backend defaults to $PENOMORAN_STORAGE or 'csv'.
+    Instances are keyed by the working directory as well, because the default paths are relative.
+    """
+    backend = backend or os.environ.get('PENOMORAN_STORAGE', 'csv')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r}; choose one of {', '.join(BACKENDS)}")
+    key = (backend, os.getcwd())
+    with _instances_lock:
+        if key not in _instances:
+            _instances[key] = BACKENDS[backend]()
+        return _instances[key]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Storage maintenance for the numbering app.")
+    parser.add_argument('command', choices=['compact'])
+    args = parser.parse_args(argv)
+    if args.command == 'compact':
+        storage = JournalStorage()
+        storage.compact()
+        print(f"Compacted {storage.db_journal} and {storage.skip_journal}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,510 @@
+"""
+Streamlit UI of the numbering app. app_surat.py only sets up the page and calls render_app();
+this module is imported once per process, so the functions, the export cache and the import
+of the numbering core are not redone on every rerun.
+"""
+import functools
+import io
+import os
+import tempfile
+import time
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+
+from penomoran.audit import AUDIT_SHEETS, audit_excel, run_audit
+from penomoran.core import (IMPORT_COLUMNS, JENIS_SURAT, MAX_RESERVE_RANGE, delete_letter, format_nomor, get_allocator,
+                            get_next_number, get_stats, import_letters, load_letters_between, load_letters_page,
+                            proof_renderer, process_form, read_import_file, rebuild_letter_stats,
+                            release_expired_reservations, reserve_next_numbers, search_letters, warm_search_index)
+from penomoran.exports import generate_recap_pdf, proof_rows, write_excel_stream, write_proofs_zip
+from penomoran.metrics import observe, prometheus_text, snapshot, span, write_metrics_file
+from penomoran.storage import get_storage
+
+# Jumlah hasil ekspor yang disimpan; entri paling lama tidak dipakai dibuang lebih dulu
+EXPORT_CACHE_SIZE = 16
+
+# Pilihan jumlah baris per halaman laporan
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Batas kandidat pada pencarian di zona hapus
+DELETE_PICKER_LIMIT = 50
+
+# ZIP bukti PDF disimpan di sini; file yang lebih tua dari batas ini dihapus saat ZIP baru dibuat
+PROOFS_ZIP_DIR = os.path.join(tempfile.gettempdir(), 'penomoran_bukti')
+PROOFS_ZIP_MAX_AGE = 6 * 3600
+
+# Mode label map (dipakai ulang di setiap form untuk konsistensi)
+mode_label_map = {
+    'Lanjutkan (nomor baru bertambah terus)': 'continuous',
+    'Isi Nomor Kosong (mengisi celah nomor yang terlewat)': 'fill_gaps'
+}
+
+
+@st.cache_data(max_entries=EXPORT_CACHE_SIZE, show_spinner="Menyiapkan file...")
+def build_export(kind, jenis, start_d, end_d, data_version):
+    """
+    Build the Excel ('excel'), recap PDF ('pdf') or all-jenis Excel ('excel_all', one sheet
+    per jenis; jenis is ignored) export for one period.
+    Memoized per (kind, jenis, start_d, end_d, data_version); data_version is the storage
+    signature, so any write to the letters yields a fresh export.
+    """
+    storage = get_storage()
+    if kind == 'excel':
+        output = io.BytesIO()
+        write_excel_stream([('Data Surat', storage.iter_letters_between(jenis, start_d, end_d))], output)
+        return output.getvalue()
+    if kind == 'excel_all':
+        # Satu sheet per jenis surat dalam satu workbook
+        output = io.BytesIO()
+        write_excel_stream([(j, storage.iter_letters_between(j, start_d, end_d)) for j in JENIS_SURAT], output)
+        return output.getvalue()
+    return generate_recap_pdf(load_letters_between(jenis, start_d, end_d), start_d, end_d, jenis)
+
+
+def render_form_for_type(container, jenis_label, jenis_internal, key_prefix):
+    """
+    Helper to render form for each jenis surat to avoid duplicate code.
+    key_prefix: unique key per form to avoid Streamlit key collision.
+    """
+    with container:
+        with st.container(border=True):
+            st.markdown(f"### {jenis_label}")
+            if "Keputusan" in jenis_label:
+                st.caption("Format: Kode Klasifikasi/SK-NomorSurat/KURIP/Tahun")
+            elif "Perjanjian" in jenis_label:
+                st.caption("Format: Kode Klasifikasi/NomorSurat/KURIP/Tahun")
+            else:
+                st.caption("Format: Kode Klasifikasi/NomorSurat-KURIP")
+
+            # Use clear_on_submit=True to reset form fields after successful submit
+            with st.form(f"form_{key_prefix}", clear_on_submit=True):
+                kode = st.text_input("Kode Klasifikasi", placeholder="Cth: 005, ADM", key=f"kode_{key_prefix}")
+                tanggal = st.date_input("Tanggal", key=f"tgl_{key_prefix}")
+                kepada = st.text_input("Kepada / Tujuan", key=f"kepada_{key_prefix}")
+                perihal = st.text_input("Perihal", key=f"perihal_{key_prefix}")
+                keterangan = st.text_area("Keterangan", height=80, key=f"keterangan_{key_prefix}")
+
+                # Mode per jenis
+                selected_mode_label = st.selectbox("Mode Penomoran", list(mode_label_map.keys()), index=0, key=f"mode_{key_prefix}")
+                mode = mode_label_map[selected_mode_label]
+
+                # Show available skipped numbers for this jenis & year
+                tahun = tanggal.year
+                skipped_for_type = get_allocator().series(jenis_internal, tahun).reserved_numbers()
+                skipped_options = ["-- Pilih nomor kosong --"] + [format_nomor(n) for n in skipped_for_type]
+                selected_skipped = st.selectbox("Pakai nomor kosong yang sudah dilewati (jika ada):", skipped_options, key=f"selected_skipped_{key_prefix}")
+
+                # Option to skip/reserve the next number(s)
+                st.markdown("---")
+                st.markdown("Lewati nomor (reserve nomor kosong) — jika ingin melewatkan nomor berikutnya dan menggunakannya nanti.")
+                c_jml, c_ttl = st.columns(2)
+                with c_jml:
+                    jumlah_lewati = st.number_input("Jumlah nomor", min_value=1, max_value=MAX_RESERVE_RANGE, value=1, step=1, key=f"jumlah_lewati_{key_prefix}")
+                with c_ttl:
+                    berlaku_hari = st.number_input("Berlaku (hari, 0 = tanpa batas)", min_value=0, value=0, step=1, key=f"berlaku_{key_prefix}",
+                                                   help="Setelah lewat masa berlaku, nomor dilepas kembali dan dapat diisi otomatis")
+                lewati_btn = st.form_submit_button("Lewati Nomor (Reserve)", key=f"btn_lewati_{key_prefix}")
+                # Preview next number (continuous mode for previewing skip)
+                calon_no_preview = get_next_number(None, tanggal, jenis_internal, mode='continuous')
+                st.info(f"Preview Next Number jika dilewati/diisi otomatis: **{format_nomor(calon_no_preview)}**")
+
+                st.markdown("---")
+                submit_btn = st.form_submit_button("Simpan Surat", key=f"btn_simpan_{key_prefix}")
+
+                # Handle skip action
+                if lewati_btn:
+                    # Determine next number(s) to reserve (continuous) and reserve them in one locked step
+                    first_no, last_no, added = reserve_next_numbers(jenis_internal, tanggal.year, int(jumlah_lewati), int(berlaku_hari))
+                    rentang = format_nomor(first_no) if first_no == last_no else f"{format_nomor(first_no)}–{format_nomor(last_no)}"
+                    if added:
+                        st.success(f"Nomor {rentang} berhasil dilewati (reserved). Anda dapat memilihnya saat menyimpan surat selanjutnya.")
+                    else:
+                        st.warning(f"Nomor {rentang} sudah dalam daftar nomor dilewati.")
+
+                # Handle save action
+                if submit_btn:
+                    # If user selected a skipped number, use it
+                    forced_no = None
+                    if selected_skipped != "-- Pilih nomor kosong --":
+                        # map back to int
+                        try:
+                            forced_no = int(selected_skipped)
+                        except Exception:
+                            forced_no = int(selected_skipped.lstrip('0') or '0')
+                    nomor, error, _ = process_form(jenis_internal, kode, tanggal, kepada, perihal, keterangan, None, mode=mode, forced_no=forced_no)
+                    if error:
+                        st.error(error)
+                    else:
+                        st.success(f"Tersimpan: {nomor}")
+                        st.session_state.last_saved[key_prefix] = {'nomor': nomor, 'pdf_args': (nomor, perihal, tanggal, kepada, keterangan, jenis_internal)}
+
+            # Download last saved for this type
+            if key_prefix in st.session_state.last_saved:
+                data = st.session_state.last_saved[key_prefix]
+                # PDF dibuat di latar belakang; ambil dari cache (atau tunggu sebentar bila belum selesai)
+                pdf_future = proof_renderer().render(*data['pdf_args'])
+                try:
+                    with st.spinner("Menyiapkan PDF bukti..."):
+                        pdf_bytes = pdf_future.result()
+                except Exception as exc:
+                    st.error(f"PDF bukti gagal dibuat: {exc}")
+                else:
+                    st.download_button("Download Bukti PDF", pdf_bytes, f"{key_prefix.upper()}_{data['nomor'].replace('/', '_')}.pdf", "application/pdf", key=f"dl_{key_prefix}")
+
+
+def render_forms():
+    col1, col2 = st.columns(2)
+    with col1, span('ui.form.sm'):
+        render_form_for_type(col1, "Surat Masuk", "Surat Masuk", "sm")
+    with col2, span('ui.form.sk'):
+        render_form_for_type(col2, "Surat Keluar", "Surat Keluar", "sk")
+
+    col3, col4 = st.columns(2)
+    with col3, span('ui.form.skep'):
+        render_form_for_type(col3, "Surat Keputusan (SK)", "Surat Keputusan (SK)", "skep")
+    with col4, span('ui.form.mou'):
+        render_form_for_type(col4, "Perjanjian Kerjasama (MOU)", "Perjanjian Kerjasama (MOU)", "mou")
+
+
+def render_import():
+    # --- IMPOR MASSAL dari CSV/XLSX ---
+    with st.expander("📥 Impor Surat dari File (CSV/XLSX)"):
+        st.caption(f"Kolom wajib: {', '.join(IMPORT_COLUMNS)}. Tanggal: YYYY-MM-DD atau DD/MM/YYYY. Nomor dibagikan berurutan menurut tanggal per jenis dan tahun; nomor yang dilewati tidak dipakai.")
+        uploaded = st.file_uploader("Pilih file", type=["csv", "xlsx"], key="import_file")
+        import_mode_label = st.selectbox("Mode Penomoran", list(mode_label_map.keys()), index=0, key="mode_import")
+        if uploaded is not None and st.button("Impor Surat", key="btn_import"):
+            try:
+                df_upload = read_import_file(uploaded)
+            except Exception as exc:
+                st.error(f"File tidak dapat dibaca: {exc}")
+            else:
+                imported, rejected = import_letters(df_upload, mode=mode_label_map[import_mode_label])
+                if not imported.empty:
+                    st.success(f"{len(imported)} surat berhasil diimpor.")
+                    st.dataframe(imported[["Baris", "Jenis", "Tanggal", "Nomor_Surat", "Perihal"]], hide_index=True)
+                if not rejected.empty:
+                    st.warning(f"{len(rejected)} baris ditolak.")
+                    st.dataframe(rejected, hide_index=True)
+                    st.download_button("Unduh Laporan Baris Ditolak", rejected.to_csv(index=False).encode('utf-8'),
+                                       file_name="impor_ditolak.csv", mime="text/csv", key="dl_import_rejected")
+
+
+def render_export_button(kind, label, jenis, start_d, end_d, data_version, file_name, mime, key):
+    """
+    Show a "Siapkan" button; once clicked for the current period and data version, build the
+    export through build_export and offer it for download. After any write the data version
+    changes and the user has to ask again, so saves never rebuild exports in the background.
+    """
+    requested_key = f"export_requested_{key}"
+    request = (start_d, end_d, data_version)
+    if st.button(f"Siapkan {label}", key=f"prep_{key}"):
+        st.session_state[requested_key] = request
+    if st.session_state.get(requested_key) == request:
+        data = build_export(kind, jenis, start_d, end_d, data_version)
+        st.download_button(f"Download {label}", data, file_name, mime, key=key)
+
+
+# FUNGSI UNTUK MENAMPILKAN DAN MENGHAPUS DATA
+def _read_file(path):
+    with open(path, 'rb') as fh:
+        return fh.read()
+
+
+def _remove_stale_proofs():
+    """Delete proof ZIPs older than PROOFS_ZIP_MAX_AGE, e.g. left behind by sessions that ended."""
+    cutoff = time.time() - PROOFS_ZIP_MAX_AGE
+    try:
+        entries = list(os.scandir(PROOFS_ZIP_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.name.endswith('.zip') and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def render_proofs_zip(jenis, start_d, end_d, total, file_name, key):
+    """
+    Bulk "download all proofs": render every proof PDF of the period into a ZIP on request.
+    The archive is streamed into a file under PROOFS_ZIP_DIR and its path is kept per period
+    in session_state. The file is only read when the download button is clicked, and it is
+    deleted as soon as the period or the data changes.
+    """
+    state_key = f"proofs_zip_{key}"
+    request = (start_d, end_d, get_storage().data_signature())
+    built = st.session_state.get(state_key)
+    if built is not None and built[0] != request:
+        # Periode atau data berubah: ZIP lama tidak berlaku lagi
+        del st.session_state[state_key]
+        if os.path.exists(built[1]):
+            os.remove(built[1])
+        built = None
+    if st.button(f"Buat ZIP Semua Bukti PDF ({total} dokumen)", key=f"prep_{key}"):
+        if built is not None and os.path.exists(built[1]):
+            os.remove(built[1])
+        _remove_stale_proofs()
+        bar = st.progress(0.0, text="Membuat PDF bukti...")
+        step = max(1, total // 100)
+
+        def _progress(done):
+            if done % step == 0 or done == total:
+                bar.progress(min(done / total, 1.0), text=f"Membuat PDF bukti... {done}/{total}")
+
+        os.makedirs(PROOFS_ZIP_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix='bukti_', suffix='.zip', dir=PROOFS_ZIP_DIR)
+        with os.fdopen(fd, 'wb') as archive:
+            write_proofs_zip(proof_rows(get_storage().iter_letters_between(jenis, start_d, end_d)), archive, progress=_progress)
+        bar.empty()
+        built = st.session_state[state_key] = (request, path)
+
+    if built is not None and os.path.exists(built[1]):
+        # Isi ZIP baru dibaca saat tombol diklik, bukan pada setiap rerun
+        st.download_button("Download ZIP Bukti PDF", functools.partial(_read_file, built[1]), file_name=file_name,
+                           mime='application/zip', key=key)
+
+
+def format_tanggal_column(df):
+    """Format kolom Tanggal untuk tampilan dd-mm-yy."""
+    if 'Tanggal' in df.columns:
+        df['Tanggal'] = df['Tanggal'].apply(lambda x: x.strftime('%d-%m-%y') if pd.notnull(x) and isinstance(x, date) else (str(x) if pd.notnull(x) else ''))
+    return df
+
+
+def render_search(jenis_filter, key_suffix):
+    # Pencarian lewat indeks kata (semua periode), tidak memindai tabel
+    query = st.text_input("🔍 Cari surat (Perihal, Kepada, Keterangan, Nomor Surat)", key=f"search_{key_suffix}",
+                          placeholder="mis. undangan rapat, 800/012")
+    if not query.strip():
+        return
+    results, total = search_letters(jenis_filter, query)
+    if total == 0:
+        st.caption("Tidak ada surat yang cocok.")
+        return
+    st.caption(f"{total} hasil" + (f", menampilkan {len(results)} terbaru" if total > len(results) else ""))
+    st.dataframe(format_tanggal_column(results.drop(columns=['Tahun'])), use_container_width=True, hide_index=True)
+
+
+def render_report_tab(tab_name, jenis_filter, key_suffix):
+    st.subheader(f"Laporan {tab_name}")
+    render_search(jenis_filter, key_suffix)
+
+    today = date.today()
+    c1, c2 = st.columns(2)
+    with c1:
+        start_d = st.date_input("Dari Tanggal", value=today.replace(day=1), key=f"start_{key_suffix}")
+    with c2:
+        end_d = st.date_input("Sampai Tanggal", value=today, key=f"end_{key_suffix}")
+
+    # Hanya satu halaman yang dibaca, diformat, dan dikirim ke browser
+    page_size = st.session_state.get(f"page_size_{key_suffix}", PAGE_SIZES[0])
+    page_key = f"page_{key_suffix}"
+    page = st.session_state.get(page_key, 1)
+    df_page, total = load_letters_page(jenis_filter, start_d, end_d, (page - 1) * page_size, page_size)
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        # Periode dipersempit atau data terhapus: kembali ke halaman terakhir yang ada
+        page = st.session_state[page_key] = pages
+        df_page, total = load_letters_page(jenis_filter, start_d, end_d, (page - 1) * page_size, page_size)
+
+    st.info(f"Menampilkan **{total}** dokumen")
+
+    # Format tanggal string untuk nama file dd-mm-yy
+    start_str = start_d.strftime('%d-%m-%y')
+    end_str = end_d.strftime('%d-%m-%y')
+
+    # Ekspor hanya dibuat setelah diminta, lalu disimpan di cache per periode & versi data
+    c_exp1, c_exp2 = st.columns(2)
+    if total:
+        data_version = get_storage().data_signature()
+        with c_exp1:
+            render_export_button('excel', "Excel", jenis_filter, start_d, end_d, data_version,
+                                 f'{key_suffix}_{start_str}_{end_str}.xlsx',
+                                 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', f"xl_{key_suffix}")
+        with c_exp2:
+            render_export_button('pdf', "PDF Rekap", jenis_filter, start_d, end_d, data_version,
+                                 f'{key_suffix}_{start_str}_{end_str}.pdf', 'application/pdf', f"pdf_{key_suffix}")
+        render_proofs_zip(jenis_filter, start_d, end_d, total,
+                          f'bukti_{key_suffix}_{start_str}_{end_str}.zip', f"zip_{key_suffix}")
+
+    # --- TABEL DATA ---
+    if total:
+        display_df = format_tanggal_column(df_page.copy())
+        display_df = display_df.drop(columns=['Bulan', 'Tahun', 'Keterangan'], errors='ignore')
+        st.dataframe(display_df, use_container_width=True, hide_index=True)
+
+        c_p1, c_p2, c_p3 = st.columns([1, 1, 2])
+        with c_p1:
+            st.selectbox("Baris per halaman", PAGE_SIZES, key=f"page_size_{key_suffix}")
+        with c_p2:
+            st.number_input(f"Halaman (dari {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+        with c_p3:
+            first = (page - 1) * page_size + 1
+            st.caption(f"Baris {first}–{first + len(df_page) - 1} dari {total}, diurutkan dari nomor terbesar")
+
+        # --- FITUR HAPUS DATA ---
+        st.markdown("### 🗑️ Zona Hapus Data")
+        with st.expander(f"Buka untuk menghapus data {tab_name}"):
+            st.warning("⚠️ Perhatian: Data yang dihapus tidak dapat dikembalikan.")
+
+            # Tanpa kata kunci, pilihan diambil dari halaman tabel di atas; dengan kata kunci, dari indeks pencarian
+            del_query = st.text_input("Cari surat yang ingin dihapus (nomor, perihal, tujuan):", key=f"del_q_{key_suffix}")
+            if del_query.strip():
+                candidates, found = search_letters(jenis_filter, del_query, limit=DELETE_PICKER_LIMIT)
+                if found > len(candidates):
+                    st.caption(f"{found} surat cocok, menampilkan {len(candidates)} terbaru. Perjelas kata kuncinya.")
+            else:
+                candidates = df_page
+
+            # Format: [Nomor Surat] ([Tahun]) | [Perihal]; tahun perlu karena nomor Masuk/Keluar berulang tiap tahun
+            delete_options = {f"{nomor} ({tahun}) | {perihal}": (nomor, tahun)
+                              for nomor, tahun, perihal in zip(candidates['Nomor_Surat'], candidates['Tahun'], candidates['Perihal'])}
+
+            selected_option = st.selectbox("Pilih surat yang ingin dihapus:", ["-- Pilih Surat --"] + list(delete_options), key=f"del_sel_{key_suffix}")
+
+            if selected_option in delete_options:
+                nomor_to_delete, tahun_to_delete = delete_options[selected_option]
+
+                if st.button(f"Hapus Permanen {nomor_to_delete}", type="primary", key=f"btn_del_{key_suffix}"):
+                    # Hanya surat jenis & tahun ini yang dihapus
+                    delete_letter(nomor_to_delete, jenis_filter, tahun_to_delete)
+                    st.success(f"Data {nomor_to_delete} berhasil dihapus!")
+                    st.rerun()
+
+
+def render_stats_tab():
+    # Dibaca dari agregat yang diperbarui setiap simpan/hapus/lewati nomor, bukan dari seluruh data;
+    # hitung ulang penuh hanya lewat tombol di bawah, CLI, atau latar belakang (get_stats)
+    st.subheader("Statistik Surat")
+    stats, current = get_stats()
+    if stats is None:
+        st.info("Statistik sedang dihitung di latar belakang. Muat ulang halaman sebentar lagi.")
+        return
+    if not current:
+        st.caption("Data diubah di luar aplikasi; angka di bawah dari penyimpanan terakhir "
+                   "dan sedang dihitung ulang di latar belakang.")
+    tahun = st.selectbox("Tahun", stats.years() or [date.today().year], key="stats_tahun")
+
+    index = get_allocator()
+    for col, jenis in zip(st.columns(len(JENIS_SURAT)), JENIS_SURAT):
+        with col:
+            st.metric(jenis, stats.total(jenis, tahun))
+            st.caption(f"Di-reserve: {stats.reserved.get((jenis, tahun), 0)} · "
+                       f"Nomor kosong: {index.series(jenis, tahun).unused_count()}")
+
+    st.markdown("**Jumlah surat per bulan**")
+    st.bar_chart(stats.monthly(tahun, JENIS_SURAT))
+
+    st.markdown("**Jumlah surat per Kode Klasifikasi**")
+    st.dataframe(stats.by_kode(tahun, JENIS_SURAT), use_container_width=True)
+
+    if st.button("Hitung Ulang Statistik", key="stats_rebuild", help="Hitung ulang dari seluruh data jika angka tidak sesuai"):
+        rebuild_letter_stats()
+        st.rerun()
+
+    render_audit()
+
+
+def render_audit():
+    # Audit membaca seluruh arsip sekali; hasilnya disimpan di session_state sampai dijalankan lagi
+    st.markdown("**Audit Penomoran**")
+    st.caption("Memeriksa celah nomor, nomor ganda, reservasi usang, dan format Nomor Surat di semua jenis dan tahun.")
+    if st.button("Jalankan Audit", key="audit_run"):
+        with st.spinner("Mengaudit seluruh data..."):
+            report = run_audit()
+            st.session_state.audit_report = report
+            st.session_state.audit_xlsx = audit_excel(report)
+    report = st.session_state.get('audit_report')
+    if report is None:
+        return
+    for col, name in zip(st.columns(len(AUDIT_SHEETS) - 1), AUDIT_SHEETS[1:]):
+        with col:
+            st.metric(name, len(report[name]))
+    for name in AUDIT_SHEETS:
+        with st.expander(f"{name} ({len(report[name])})", expanded=name == 'Ringkasan'):
+            st.dataframe(report[name], use_container_width=True, hide_index=True)
+    st.download_button("Download Laporan Audit", st.session_state.audit_xlsx,
+                       f"audit_penomoran_{date.today().strftime('%d-%m-%y')}.xlsx",
+                       'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', key="audit_dl")
+
+
+def render_export_all():
+    # --- EKSPOR GABUNGAN: satu workbook, satu sheet per jenis surat ---
+    today = date.today()
+    st.markdown("### Ekspor Gabungan Semua Jenis")
+    c_all1, c_all2 = st.columns(2)
+    with c_all1:
+        start_all = st.date_input("Dari Tanggal", value=today.replace(month=1, day=1), key="start_all")
+    with c_all2:
+        end_all = st.date_input("Sampai Tanggal", value=today, key="end_all")
+    render_export_button('excel_all', "Excel Semua Jenis", None, start_all, end_all, get_storage().data_signature(),
+                         f"semua_{start_all.strftime('%d-%m-%y')}_{end_all.strftime('%d-%m-%y')}.xlsx",
+                         'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', "xl_all")
+
+
+def render_cache_stats():
+    # Statistik cache: memastikan rerun tidak membaca ulang file yang tidak berubah
+    with st.sidebar.expander("Statistik Cache Data"):
+        for table, counts in get_storage().cache_stats().items():
+            st.caption(f"{table}: {counts['hits']} hit / {counts['misses']} miss")
+
+
+def render_admin_panel():
+    # Durasi per operasi (p50/p95 dari pemanggilan terakhir) dan jumlah baca/tulis file di proses ini
+    spans, counters = snapshot()
+    with st.sidebar.expander("⏱️ Metrik Kinerja"):
+        if spans:
+            st.dataframe(pd.DataFrame([{'Operasi': name, 'Jumlah': stats['count'], 'p50 (ms)': stats['p50'] * 1e3,
+                                        'p95 (ms)': stats['p95'] * 1e3, 'Maks (ms)': stats['max'] * 1e3}
+                                       for name, stats in spans.items()]).round(2), hide_index=True)
+        for (name, labels), value in sorted(counters.items()):
+            st.caption(f"{name} {' '.join(v for _, v in labels)}: {value}")
+        st.download_button("Unduh Metrik (Prometheus)", prometheus_text(), "penomoran_metrics.prom", "text/plain", key="metrics_dl")
+
+
+def render_app():
+    """Render the whole page below the title; called by app_surat.py on every rerun."""
+    # Waktu satu rerun penuh dicatat di akhir (metrik ui.rerun)
+    rerun_start = time.perf_counter()
+
+    # Inisialisasi Session State
+    if 'last_saved' not in st.session_state:
+        st.session_state.last_saved = {}
+
+    # Reservasi yang masa berlakunya habis dilepas sebelum daftar nomor kosong ditampilkan
+    release_expired_reservations()
+    # Indeks pencarian dibangun/diselaraskan di latar belakang sementara halaman dirender
+    warm_search_index()
+
+    render_forms()
+    render_import()
+
+    st.markdown("---")
+    st.header("Laporan & Ekspor Data")
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Surat Masuk", "Surat Keluar", "Surat Keputusan (SK)", "Perjanjian Kerjasama (MOU)", "📊 Statistik"])
+    with tab1, span('ui.report.sm'):
+        render_report_tab("Surat Masuk", "Surat Masuk", "sm")
+    with tab2, span('ui.report.sk'):
+        render_report_tab("Surat Keluar", "Surat Keluar", "sk")
+    with tab3, span('ui.report.skep'):
+        render_report_tab("Surat Keputusan", "Surat Keputusan (SK)", "skep")
+    with tab4, span('ui.report.mou'):
+        render_report_tab("MOU", "Perjanjian Kerjasama (MOU)", "mou")
+    with tab5, span('ui.stats'):
+        render_stats_tab()
+
+    render_export_all()
+    render_cache_stats()
+
+    # Panel admin hanya tampil dengan ?admin=1 atau PENOMORAN_ADMIN=1
+    if os.environ.get('PENOMORAN_ADMIN') == '1' or st.query_params.get('admin') == '1':
+        render_admin_panel()
+
+    st.caption("*Setiap jenis surat memiliki penomoran terpisah. Nomor reset ke 001 setiap awal tahun. Mode penomoran kini dapat diatur per jenis surat (Lanjutkan atau Isi Nomor Kosong). Fitur 'lewati nomor' tersedia per form dan Anda dapat menggunakan kembali nomor kosong yang sudah dilewati.*")
+
+    observe('ui.rerun', time.perf_counter() - rerun_start)
+    write_metrics_file()
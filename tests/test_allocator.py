@@ -0,0 +1,133 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from penomoran import core
+from penomoran.allocator import AllocatorIndex, _SeriesIndex, _allocator_invalidate
+from penomoran.storage import SKIP_COLUMNS, expand_skipped
+
+
+def _free(series):
+    return list(zip(series._starts, series._ends))
+
+
+def test_series_builds_free_intervals():
+    series = _SeriesIndex(used=[1, 2, 2, 5, 9], reserved=[3, 12])
+    assert series.high == 12
+    assert _free(series) == [(4, 4), (6, 8), (10, 11)]
+    assert series.smallest_free() == 4
+    assert series.next_continuous() == 13
+    assert series.unused_count() == 6
+    assert series.is_used(2) and series.is_taken(3) and not series.is_used(3)
+
+
+def test_take_splits_and_shrinks_intervals():
+    series = _SeriesIndex(used=[10])
+    assert _free(series) == [(1, 9)]
+    series.add_used(5)
+    assert _free(series) == [(1, 4), (6, 9)]
+    series.add_reserved(1)
+    series.add_used(9)
+    assert _free(series) == [(2, 4), (6, 8)]
+    series.add_used(6)
+    series.add_used(7)
+    series.add_used(8)
+    assert _free(series) == [(2, 4)]
+    # Di atas high-water mark: celah baru di ujung
+    series.add_used(14)
+    assert _free(series) == [(2, 4), (11, 13)]
+    assert series.high == 14
+
+
+def test_free_merges_intervals_and_lowers_high():
+    series = _SeriesIndex(used=[1, 2, 3, 4, 5, 6])
+    series.remove_used(2)
+    series.remove_used(4)
+    assert _free(series) == [(2, 2), (4, 4)]
+    series.remove_used(3)
+    assert _free(series) == [(2, 4)]
+    series.remove_used(5)
+    assert _free(series) == [(2, 5)]
+    # Nomor tertinggi dilepas: high-water mark turun melewati celah yang menempel
+    series.remove_used(6)
+    assert series.high == 1 and _free(series) == []
+    assert series.next_continuous() == 2
+
+
+def test_duplicates_and_reservations_keep_number_taken():
+    series = _SeriesIndex(used=[1, 2, 2, 3])
+    series.remove_used(2)
+    assert series.is_taken(2) and _free(series) == []
+    series.add_reserved(2)
+    series.remove_used(2)
+    assert series.is_taken(2) and not series.is_used(2)
+    series.remove_reserved(2)
+    assert _free(series) == [(2, 2)]
+    assert series.unused_count() == 1
+    # Melepas nomor yang tidak dipakai tidak mengubah apa pun
+    series.remove_used(2)
+    series.remove_reserved(7)
+    assert _free(series) == [(2, 2)] and series.high == 3
+
+
+def test_index_expands_reserved_ranges():
+    df = pd.DataFrame({'Jenis': ['Surat Keluar'] * 2, 'Tahun': [2024, 2024], 'No': [1, 8]})
+    skipped = pd.DataFrame([['Surat Keluar', 2024, 3, 5, '2024-01-01', ''],
+                            ['Surat Masuk', 2023, 2, 2, '2024-01-01', '']], columns=SKIP_COLUMNS)
+    index = AllocatorIndex(df, skipped)
+    series = index.series('Surat Keluar', 2024)
+    assert series.reserved_numbers() == [3, 4, 5]
+    assert _free(series) == [(2, 2), (6, 7)]
+    assert index.series('Surat Masuk', 2023).smallest_free() == 1
+    assert index.series('Surat Keputusan (SK)', 2024).next_continuous() == 1
+
+
+@pytest.fixture(params=['csv', 'journal', 'sqlite', 'parquet'])
+def engine(request, workdir, monkeypatch):
+    monkeypatch.setenv('PENOMORAN_STORAGE', request.param)
+    return request.param
+
+
+def _reserved(jenis='Surat Keluar', tahun=2024):
+    return core.get_skipped_numbers(core.load_skipped(), jenis, tahun)
+
+
+def test_reservation_ranges(engine):
+    assert core.reserve_numbers('Surat Keluar', 2024, 3, 7) == 5
+    skipped = core.load_skipped()
+    assert len(skipped) == 1 and skipped['No_Akhir'].iloc[0] == 7
+
+    # Nomor di tengah rentang dilepas: rentang terbelah dua
+    core.remove_skipped_number('Surat Keluar', 2024, 5)
+    assert _reserved() == [3, 4, 6, 7]
+    ranges = core.load_skipped().sort_values('No')
+    assert list(zip(ranges['No'], ranges['No_Akhir'])) == [(3, 4), (6, 7)]
+
+    # Hanya nomor yang masih bebas yang ikut di-reserve
+    assert core.reserve_numbers('Surat Keluar', 2024, 1, 8) == 4
+    assert _reserved() == list(range(1, 9))
+    assert core.get_next_number(None, date(2024, 5, 1), 'Surat Keluar') == 9
+    assert core.reserve_next_numbers('Surat Keluar', 2024, 3) == (9, 11, 3)
+
+    core.get_storage().remove_skipped('Surat Keluar', 2024, 2, 10)
+    _allocator_invalidate()
+    assert _reserved() == [1, 11]
+    assert core.get_allocator().series('Surat Keluar', 2024).smallest_free() == 2
+
+
+def test_reserve_rejects_bad_ranges(engine):
+    with pytest.raises(ValueError):
+        core.reserve_numbers('Surat Keluar', 2024, 5, 4)
+    with pytest.raises(ValueError):
+        core.reserve_numbers('Surat Keluar', 2024, 0)
+    with pytest.raises(ValueError):
+        core.reserve_numbers('Surat Keluar', 2024, 1, core.MAX_RESERVE_RANGE + 1)
+
+
+def test_expand_skipped():
+    ranges = pd.DataFrame([['Surat Keluar', 2024, 3, 5, '2024-01-01', '2024-02-01'],
+                           ['Surat Masuk', 2024, 9, 9, '2024-01-01', '']], columns=SKIP_COLUMNS)
+    out = expand_skipped(ranges)
+    assert list(zip(out['Jenis'], out['No'])) == [('Surat Keluar', 3), ('Surat Keluar', 4), ('Surat Keluar', 5), ('Surat Masuk', 9)]
+    assert out['Expires'].tolist() == ['2024-02-01'] * 3 + ['']
@@ -0,0 +1,38 @@
+from datetime import date
+
+import pandas as pd
+
+from penomoran.audit import audit_numbering
+from penomoran.storage import LETTER_COLUMNS, SKIP_COLUMNS
+
+
+def _letters(rows):
+    df = pd.DataFrame([dict(zip(['Jenis', 'Tahun', 'No', 'Kode_Klasifikasi', 'Nomor_Surat'], row)) for row in rows])
+    df['Tanggal'], df['Bulan'] = date(2024, 1, 1), 1
+    for col in LETTER_COLUMNS:
+        if col not in df:
+            df[col] = '-'
+    return df[LETTER_COLUMNS]
+
+
+def test_format_check():
+    df = _letters([
+        ('Surat Keluar', 2024, 1, '005', '005/001-KURIP'),
+        ('Surat Keluar', 2024, 2, 5, '005/002-KURIP'),        # nol di depan hilang di CSV
+        ('Surat Keluar', 2024, 3, 5, '0000005/003-KURIP'),    # terlalu banyak nol
+        ('Surat Keluar', 2024, 1234, '005', '005/1234-KURIP'),
+        ('Surat Keluar', 2024, 5, '005', '005/005-KURlP'),
+        ('Surat Keputusan (SK)', 2024, 1, '800', '800/SK-001/KURIP/2024'),
+        ('Surat Keputusan (SK)', 2024, 2, '800', '800/SK-002/KURIP/2023'),
+        ('Surat Keputusan (SK)', 2024, 3, None, '/SK-003/KURIP/2024'),
+        ('Nota Dinas', 2024, 1, '005', '005/001-KURIP'),
+        ('Surat Masuk', 2024, 1, '005', '005/001-KURIP é'),
+    ])
+    report = audit_numbering(df, pd.DataFrame(columns=SKIP_COLUMNS))
+    bad = report['Format Tidak Sesuai']
+    assert sorted(bad['Nomor_Surat']) == sorted(['0000005/003-KURIP', '005/005-KURlP', '800/SK-002/KURIP/2023',
+                                                 '005/001-KURIP', '005/001-KURIP é'])
+    expected = dict(zip(bad['Nomor_Surat'], bad['Seharusnya']))
+    assert expected['0000005/003-KURIP'] == '5/003-KURIP'
+    assert expected['800/SK-002/KURIP/2023'] == '800/SK-002/KURIP/2024'
+    assert expected['005/001-KURIP'] == ''
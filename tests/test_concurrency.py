@@ -0,0 +1,51 @@
+"""Several processes issue and reserve numbers in one data directory at the same time."""
+import multiprocessing as mp
+import os
+import random
+from datetime import date
+
+import pytest
+
+from penomoran.storage import expand_skipped
+
+JENIS = ["Surat Keluar", "Surat Keputusan (SK)"]
+REQUESTS = 80
+WORKERS = 4
+
+
+def _init_worker(data_dir):
+    os.chdir(data_dir)
+
+
+def _issue(i):
+    from penomoran import core
+    rnd = random.Random(i)
+    jenis = rnd.choice(JENIS)
+    tanggal = date(2024, rnd.randint(1, 12), rnd.randint(1, 28))
+    if rnd.random() < 0.15:
+        no, added = core.reserve_next_number(jenis, tanggal.year)
+        return 'reserve', jenis, no, added
+    mode = rnd.choice(['continuous', 'fill_gaps'])
+    nomor, error, _ = core.process_form(jenis, '005', tanggal, "Penerima", f"Perihal {i}", "-", None, mode=mode)
+    return 'issue', jenis, nomor, error
+
+
+@pytest.mark.parametrize('backend', ['csv', 'sqlite'])
+def test_processes_never_share_a_number(backend, workdir, monkeypatch):
+    monkeypatch.setenv('PENOMORAN_STORAGE', backend)
+    with mp.get_context('spawn').Pool(WORKERS, initializer=_init_worker, initargs=(str(workdir),)) as pool:
+        results = pool.map(_issue, range(REQUESTS), chunksize=1)
+
+    from penomoran import core
+    df = core.load_data()
+    df_skipped = expand_skipped(core.load_skipped())
+    issued = [r[2] for r in results if r[0] == 'issue']
+    assert [r[3] for r in results if r[0] == 'issue' and r[3] is not None] == []
+    assert sorted(df['Nomor_Surat']) == sorted(issued)
+    assert not df.duplicated(['Jenis', 'Tahun', 'No']).any()
+    assert len(df_skipped) == sum(1 for r in results if r[0] == 'reserve' and r[3])
+    assert not set(zip(df['Jenis'], df['No'])) & set(zip(df_skipped['Jenis'], df_skipped['No']))
+    # Nomor berlanjut tanpa celah: setiap nomor terbit atau di-reserve tepat sekali
+    for jenis in JENIS:
+        taken = sorted(df.loc[df['Jenis'] == jenis, 'No'].tolist() + df_skipped.loc[df_skipped['Jenis'] == jenis, 'No'].tolist())
+        assert taken == list(range(1, len(taken) + 1))
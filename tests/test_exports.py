@@ -0,0 +1,48 @@
+import sys
+import types
+import zipfile
+from datetime import date
+
+from penomoran.exports import write_proofs_zip
+
+
+def _rows(n):
+    for no in range(1, n + 1):
+        yield 2024, no, f"005/{no:03d}-KURIP", "Rapat", date(2024, 3, 1), "Dinas", "-", "Surat Keluar"
+
+
+def test_proof_workers_do_not_import_the_main_script(tmp_path, monkeypatch):
+    # Seperti di bawah Streamlit: __main__ menunjuk ke skrip aplikasi
+    marker = tmp_path / 'imported'
+    script = tmp_path / 'app_surat.py'
+    script.write_text(f"open({str(marker)!r}, 'w').close()\n")
+    main = types.ModuleType('__main__')
+    main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, '__main__', main)
+
+    output = tmp_path / 'bukti.zip'
+    with open(output, 'wb') as fh:
+        assert write_proofs_zip(_rows(20), fh, workers=2) == 20
+    assert not marker.exists()
+    assert sys.modules['__main__'] is main
+    with zipfile.ZipFile(output) as archive:
+        assert archive.namelist() == [f"2024_{no:03d}_005_{no:03d}-KURIP.pdf" for no in range(1, 21)]
+
+
+def test_proof_rows_are_read_as_results_come_back(tmp_path):
+    read = []
+
+    def rows():
+        for row in _rows(40):
+            read.append(row[1])
+            yield row
+
+    seen = []
+
+    def progress(done):
+        # Dengan 2 worker paling banyak 8 baris menunggu di pool
+        seen.append(len(read) - done)
+
+    with open(tmp_path / 'bukti.zip', 'wb') as fh:
+        write_proofs_zip(rows(), fh, workers=2, progress=progress)
+    assert max(seen) <= 8
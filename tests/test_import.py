@@ -0,0 +1,17 @@
+from datetime import date
+
+import pandas as pd
+
+from penomoran.core import _validate_import
+
+
+def _upload(*tanggal):
+    return pd.DataFrame({"Jenis": "Surat Masuk", "Tanggal": list(tanggal), "Kode_Klasifikasi": "005",
+                         "Kepada": "-", "Perihal": "Rapat", "Keterangan": "-"})
+
+
+def test_strict_date_formats():
+    valid, rejected = _validate_import(_upload("2024-03-05", "05/03/2024", "2024-03-05 00:00:00", "2024-13-01", "31/02/2024", "5 Mar 2024"))
+    assert valid["Tanggal"].tolist() == [date(2024, 3, 5)] * 3
+    assert rejected["Baris"].tolist() == [5, 6, 7]
+    assert rejected["Alasan"].str.startswith("Tanggal tidak valid").all()
@@ -0,0 +1,78 @@
+import os
+from datetime import date
+
+from penomoran.storage import JournalStorage
+
+
+def _letter(no, keterangan='-'):
+    return {'No': no, 'Jenis': 'Surat Keluar', 'Tanggal': date(2024, 3, 1), 'Bulan': 3, 'Tahun': 2024,
+            'Kode_Klasifikasi': '005', 'Kepada': 'Dinas', 'Perihal': 'Rapat', 'Keterangan': keterangan,
+            'Nomor_Surat': f'005/{no:03d}-KURIP'}
+
+
+def _numbers(storage):
+    return sorted(JournalStorage(storage.db_file, storage.skip_file).load_data()['No'].tolist())
+
+
+def _crash_during_append(storage, tail):
+    # Sisa tulisan yang terpotong di tengah record, tanpa pemisah baris
+    with open(storage.db_journal, 'a', newline='', encoding='utf-8') as fh:
+        fh.write(tail)
+
+
+def test_replay_inserts_and_tombstones(workdir):
+    storage = JournalStorage()
+    for no in (1, 2, 3):
+        storage.insert_letter(_letter(no, keterangan='baris "satu"\nbaris dua'))
+    storage.delete_letter('005/002-KURIP', 'Surat Keluar', 2024)
+    assert _numbers(storage) == [1, 3]
+    df = JournalStorage().load_data()
+    assert df.loc[df['No'] == 1, 'Keterangan'].item() == 'baris "satu"\nbaris dua'
+
+
+def test_partial_record_inside_quotes_is_skipped(workdir):
+    storage = JournalStorage()
+    storage.insert_letter(_letter(1))
+    _crash_during_append(storage, 'I,2,Surat Keluar,2024-03-01,3,2024,005,Dinas,Rapat,"catatan yang')
+    assert _numbers(storage) == [1]
+
+    storage.insert_letter(_letter(2))
+    assert _numbers(storage) == [1, 2]
+
+
+def test_partial_record_without_newline_does_not_swallow_next_append(workdir):
+    storage = JournalStorage()
+    storage.insert_letter(_letter(1))
+    _crash_during_append(storage, 'I,9,Surat Keluar,2024-03')
+    assert _numbers(storage) == [1]
+
+    storage.insert_letter(_letter(2))
+    assert _numbers(storage) == [1, 2]
+    storage.compact()
+    assert _numbers(storage) == [1, 2]
+
+
+def test_compaction_keeps_indexes_and_stats(workdir, monkeypatch):
+    from penomoran import core
+
+    monkeypatch.setenv('PENOMORAN_STORAGE', 'journal')
+    for _ in range(3):
+        core.process_form('Surat Keluar', '005', date(2024, 3, 1), 'Dinas', 'Rapat', '-', None)[2].result()
+    index = core.get_allocator()
+    core.warm_stats().join()
+    stats, current = core.get_stats()
+    assert current
+    core.search_letters('Surat Keluar', 'rapat')
+
+    rebuilds = []
+    monkeypatch.setattr(core, '_search_sync', rebuilds.append)
+    core.get_storage().compact()
+    assert not os.path.exists(core.get_storage().db_journal)
+    assert core.get_allocator() is index
+    assert core.get_stats() == (stats, True)
+    assert core.search_letters('Surat Keluar', 'rapat')[1] == 3
+    assert not rebuilds
+
+    core.process_form('Surat Keluar', '005', date(2024, 3, 2), 'Dinas', 'Rapat', '-', None)[2].result()
+    assert core.get_next_number(None, date(2024, 3, 2), 'Surat Keluar') == 5
+    assert _numbers(core.get_storage()) == [1, 2, 3, 4]
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from penomoran import core
+from penomoran.search import InvertedIndex, search_text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Penulis lain (mis. layanan API) di proses terpisah dengan direktori kerja yang sama
+_WRITER = '''
+import sys
+from datetime import date
+sys.path.insert(0, {root!r})
+from penomoran import core
+core.delete_letter(sys.argv[1])
+core.process_form('Surat Keluar', '005', date(2024, 3, 5), 'Dinas', sys.argv[2], '-', None, forced_no=1)[2].result()
+'''
+
+
+def _issue(perihal, day):
+    return core.process_form('Surat Keluar', '005', date(2024, 3, day), 'Dinas', perihal, '-', None)[0]
+
+
+def _outside_write(nomor, perihal):
+    subprocess.run([sys.executable, '-c', _WRITER.format(root=ROOT), nomor, perihal], check=True)
+
+
+def _synced():
+    thread = core.warm_search_index()
+    if thread is not None:
+        thread.join()
+
+
+def test_extend_frame_matches_extend():
+    df = pd.DataFrame({'Perihal': ['Rapat anggaran', 'Rapat', None, 'Undangan rapat'],
+                       'Kepada': ['Dinas', 'BPJS', 'Dinas', 'RSUD Cibinong'],
+                       'Keterangan': ['-', np.nan, 'mendesak', 3.0],
+                       'Nomor_Surat': ['005/001-KURIP', '005/002-KURIP', '800/SK-003/KURIP/2024', '005/001-KURIP']})
+    keys = [1, 2, 3, 1]
+    one, bulk = InvertedIndex(), InvertedIndex()
+    one.extend(zip(keys, keys, search_text(df)))
+    bulk.extend_frame(keys, keys, df)
+    assert len(bulk) == 3
+    for query in ['rapat', 'dinas', '005', 'kurip 2024', 'mendesak', '3', 'und', 'x']:
+        assert bulk.search(query) == one.search(query)
+    bulk.remove(1)
+    assert bulk.search('rapat') == ([2], 1)
+
+
+def test_unchanged_storage_is_not_synced(workdir, monkeypatch):
+    _issue('Rapat anggaran', 1)
+    assert core.search_letters('Surat Keluar', 'rapat')[1] == 1
+    calls = []
+    monkeypatch.setattr(core, '_search_sync', calls.append)
+    _issue('Rapat koordinasi', 2)
+    for _ in range(3):
+        assert core.search_letters('Surat Keluar', 'rapat')[1] == 2
+    assert calls == []
+
+
+def test_outside_write_is_synced_in_background(workdir, monkeypatch):
+    first = _issue('Rapat anggaran', 1)
+    _issue('Rapat koordinasi', 2)
+    assert core.search_letters('Surat Keluar', 'rapat')[1] == 2
+    index = core._SEARCH['indexes']['Surat Keluar']
+
+    _outside_write(first, 'Pelatihan perawat')
+    added = []
+    extend_frame = InvertedIndex.extend_frame
+    monkeypatch.setattr(InvertedIndex, 'extend_frame',
+                        lambda self, keys, records, df: added.extend(keys) or extend_frame(self, keys, records, df))
+    # Indeks lama tetap menjawab selama penyelarasan berjalan
+    core.search_letters('Surat Keluar', 'rapat')
+    _synced()
+    assert core.search_letters('Surat Keluar', 'rapat')[1] == 1
+    result, total = core.search_letters('Surat Keluar', 'pelatihan')
+    assert total == 1 and result['No'].tolist() == [1]
+    assert added == [(2024, 1, first)]
+    assert core._SEARCH['indexes']['Surat Keluar'] is index
+
+
+def test_own_write_after_outside_write_keeps_both(workdir):
+    first = _issue('Rapat anggaran', 1)
+    assert core.search_letters('Surat Keluar', 'rapat')[1] == 1
+    _outside_write(first, 'Pelatihan perawat')
+    _issue('Pelatihan bidan', 6)
+    _synced()
+    assert core.search_letters('Surat Keluar', 'pelatihan')[1] == 2
+    assert core.search_letters('Surat Keluar', 'rapat')[1] == 0
@@ -0,0 +1,24 @@
+from datetime import date
+
+import pytest
+
+from penomoran import core
+from penomoran.service import execute_batch
+
+
+def _item(**extra):
+    return dict({"jenis": "Surat Keluar", "kode": "800", "tanggal": "2024-05-01", "perihal": "Rapat"}, **extra)
+
+
+def test_bad_item_in_merged_run_only_fails_itself(workdir):
+    results = execute_batch([('allocate', _item()), ('allocate', _item(no="x")), ('allocate', _item())])
+    assert [r.get("no") for r in results] == [1, None, 2]
+    assert "error" in results[1]
+    assert core.get_next_number(None, date(2024, 5, 1), "Surat Keluar") == 3
+
+
+def test_failed_batch_does_not_burn_numbers(workdir):
+    good = {"Jenis": "Surat Keluar", "Tanggal": date(2024, 5, 1), "Kode_Klasifikasi": "800"}
+    with pytest.raises(AttributeError):
+        core.issue_letters([good, dict(good, Tanggal="2024-05-01")])
+    assert core.get_next_number(None, date(2024, 5, 1), "Surat Keluar") == 1
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+from datetime import date
+
+from penomoran import core
+from penomoran.stats import STATS_FILE, read_stats, storage_key
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Proses lain (mis. layanan API) yang menerbitkan satu surat lalu berakhir
+_WRITER = '''
+import sys
+from datetime import date
+sys.path.insert(0, {root!r})
+from penomoran import core
+core.process_form('Surat Keluar', '005', date(2024, 3, 9), 'Dinas', 'Rapat', '-', None)[2].result()
+'''
+
+
+def _issue(day):
+    return core.process_form('Surat Keluar', '005', date(2024, 3, day), 'Dinas', 'Rapat', '-', None)[0]
+
+
+def test_counter_saves_are_coalesced(workdir, monkeypatch):
+    monkeypatch.setattr(core, 'STATS_SAVE_DELAY', 60)
+    core.rebuild_letter_stats()
+    saves = []
+    save_stats = core.save_stats
+    monkeypatch.setattr(core, 'save_stats', lambda *args: saves.append(args) or save_stats(*args))
+
+    for day in range(1, 6):
+        _issue(day)
+    assert not saves
+    core.flush_stats()
+    assert len(saves) == 1
+    stats, key = read_stats()
+    assert stats.total('Surat Keluar', 2024) == 5
+    assert key == storage_key(core.get_storage())
+
+
+def test_stale_stats_are_shown_and_rebuilt_in_background(workdir, monkeypatch):
+    nomor = _issue(1)
+    _issue(2)
+    core.rebuild_letter_stats()
+    # Perubahan di luar penghitung (mis. file data diedit tangan)
+    core.get_storage().delete_letter(nomor, 'Surat Keluar', 2024)
+
+    rebuilds = []
+    warm_stats = core.warm_stats
+    monkeypatch.setattr(core, 'warm_stats', lambda: rebuilds.append(1))
+    stats, current = core.get_stats()
+    assert not current and rebuilds
+    assert stats.total('Surat Keluar', 2024) == 2
+
+    warm_stats().join()
+    stats, current = core.get_stats()
+    assert current
+    assert stats.total('Surat Keluar', 2024) == 1
+
+
+def test_other_process_saves_its_counters_at_exit(workdir):
+    _issue(1)
+    core.rebuild_letter_stats()
+    subprocess.run([sys.executable, '-c', _WRITER.format(root=ROOT)], check=True)
+    assert os.path.exists(STATS_FILE)
+
+    stats, current = core.get_stats()
+    assert current
+    assert stats.total('Surat Keluar', 2024) == 2
@@ -0,0 +1,32 @@
+from datetime import date
+
+import pytest
+
+from penomoran import core
+
+
+@pytest.fixture(params=['csv', 'journal', 'sqlite', 'parquet'])
+def engine(request, workdir, monkeypatch):
+    monkeypatch.setenv('PENOMORAN_STORAGE', request.param)
+    return request.param
+
+
+def _issue(day):
+    return core.process_form('Surat Keluar', '005', date(2024, 3, day), 'Dinas', 'Rapat', '-', None)[0]
+
+
+def test_cached_frames_are_shared_and_never_changed_by_writes(engine):
+    first = _issue(1)
+    _issue(2)
+    core.reserve_numbers('Surat Keluar', 2024, 5, 7)
+    storage = core.get_storage()
+    df, df_skipped = storage.load_data(), storage.load_skipped()
+    assert storage.load_data() is df and storage.load_skipped() is df_skipped
+    before, skipped_before = df.copy(), df_skipped.copy()
+
+    _issue(3)
+    core.delete_letter(first, 'Surat Keluar', 2024)
+    core.remove_skipped_number('Surat Keluar', 2024, 6)
+    assert df.equals(before) and df_skipped.equals(skipped_before)
+    assert sorted(storage.load_data()['No']) == [2, 8]
+    assert sorted(storage.load_skipped()['No']) == [5, 7]
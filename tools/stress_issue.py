@@ -0,0 +1,94 @@
+"""
+Stress test for concurrent number issuance.
+
+Fires many process_form calls from several processes against one temporary data directory
+and checks that every successful call got a unique number and that no row was lost.
+
+    python tools/stress_issue.py --requests 400 --workers 16
+
+Set PENOMORAN_STORAGE=sqlite to stress the SQLite engine instead of the CSV files.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+from datetime import date
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JENIS = ["Surat Masuk", "Surat Keluar", "Surat Keputusan (SK)", "Perjanjian Kerjasama (MOU)"]
+
+_app = None
+
+
+def _init_worker(data_dir):
+    global _app
+    # penyimpanan memakai path relatif, jadi cukup pindah ke direktori data sementara
+    os.chdir(data_dir)
+    sys.path.insert(0, REPO_DIR)
+    from penomoran import core
+    _app = core
+
+
+def _issue(i):
+    rnd = random.Random(i)
+    jenis = rnd.choice(JENIS)
+    tanggal = date(2024 + rnd.randint(0, 1), rnd.randint(1, 12), rnd.randint(1, 28))
+    if rnd.random() < 0.1:
+        no, added = _app.reserve_next_number(jenis, tanggal.year)
+        return 'reserve', jenis, tanggal.year, no, added
+    mode = rnd.choice(['continuous', 'fill_gaps'])
+    nomor, error, _ = _app.process_form(jenis, f"{i:03d}", tanggal, "Penerima", f"Perihal {i}", "-", None, mode=mode)
+    return 'issue', jenis, tanggal.year, nomor, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='stress_penomoran_')
+    ctx = mp.get_context('spawn')
+    with ctx.Pool(args.workers, initializer=_init_worker, initargs=(data_dir,)) as pool:
+        results = pool.map(_issue, range(args.requests), chunksize=1)
+
+    _init_worker(data_dir)
+    from penomoran.storage import expand_skipped
+    df = _app.load_data()
+    df_skipped = expand_skipped(_app.load_skipped())
+
+    issued = [r[3] for r in results if r[0] == 'issue' and r[4] is None]
+    errors = [r[4] for r in results if r[0] == 'issue' and r[4] is not None]
+    reserved = [r for r in results if r[0] == 'reserve']
+
+    failures = []
+    if errors:
+        failures.append(f"{len(errors)} process_form calls failed, e.g. {errors[0]}")
+    if len(df) != len(issued):
+        failures.append(f"lost rows: {len(issued)} issued but {len(df)} stored")
+    if df.duplicated(['Jenis', 'Tahun', 'No']).any():
+        failures.append("duplicate (Jenis, Tahun, No) in data")
+    if df['Nomor_Surat'].duplicated().any():
+        failures.append("duplicate Nomor_Surat in data")
+    if set(df['Nomor_Surat']) != set(issued):
+        failures.append("stored Nomor_Surat differ from the ones returned to callers")
+    if len(df_skipped) != sum(1 for r in reserved if r[4]):
+        failures.append(f"reservations: {sum(1 for r in reserved if r[4])} added but {len(df_skipped)} stored")
+    # Nomor yang dipakai dan nomor yang di-reserve tidak boleh bertabrakan
+    used = set(zip(df['Jenis'], df['Tahun'], df['No']))
+    if used & set(zip(df_skipped['Jenis'], df_skipped['Tahun'], df_skipped['No'])):
+        failures.append("a reserved number was also issued")
+
+    print(f"data dir   : {data_dir}")
+    print(f"issued     : {len(issued)} letters, {len(reserved)} reservations, {args.workers} workers")
+    if failures:
+        for f in failures:
+            print(f"FAIL: {f}")
+        sys.exit(1)
+    print("OK: no duplicates, no lost rows")
+
+
+if __name__ == '__main__':
+    main()